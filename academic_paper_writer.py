@@ -14,6 +14,7 @@ Academic Paper Writer -
 import os
 import re
 import json
+import time
 import subprocess
 from pathlib import Path
 from datetime import datetime
@@ -21,6 +22,32 @@ from typing import Dict, List, Optional, Tuple
 import urllib.request
 import zipfile
 import shutil
+import csv
+import hashlib
+import io
+from concurrent.futures import Executor
+from contextlib import nullcontext, redirect_stdout
+
+from analysis_cache import AnalysisCache
+from instrumentation import StageProfiler, append_trace, format_summary
+from code_scanner import IgnoreRules, ProjectSnapshot, create_executor, run_pool, scan_project
+from key_files import declared_entry_modules, rank_key_sources, read_preview, readme_preview, source_preview
+from language_stats import LANGUAGE_BY_SUFFIX, file_line_stats, summarize_languages
+from bibtex_index import load_bib_index
+from latex_review import paper_fingerprint, review_latex
+from latex_build import BUILD_ENGINES, LatexBuilder
+from latex_render import (latex_escape, render_section, replace_generated, section_fingerprint,
+                          section_slug, wrap_generated)
+from python_model import PythonProjectModel, summarize_python_file
+from template_fetch import DEFAULT_FETCH_JOBS, prefetch_templates
+from template_kits import KitCache, find_kit_archive, ingest_kit
+from template_store import LINK_MODES, TemplateStore, sha256_file, write_atomic
+from workflow_pipeline import Pipeline, Stage, StageCache
+from write_batch import WriteBatch
+
+
+# full_workflow 的阶段（按拓扑顺序），用于 --from-stage / --only-stage
+WORKFLOW_STAGES = ("analyze", "template", "outline", "latex", "review", "build")
 
 
 class AcademicPaperWriter:
@@ -32,6 +59,16 @@ class AcademicPaperWriter:
         self.output_dir.mkdir(exist_ok=True)
         self.templates_dir = self.workspace / "templates"
         self.templates_dir.mkdir(exist_ok=True)
+        self.cache_dir = self.workspace / ".cache"
+        self.template_store = TemplateStore(self.templates_dir / ".store")
+        # 本地模板包（author kit）目录：<name>.zip 或下载地址中的文件名
+        self.kits_dir = self.templates_dir / "kits"
+        # 论文目录中模板文件的生成方式（auto/reflink/hardlink/copy）
+        self.link_mode = "auto"
+        # 本地编译方式（auto/pdflatex/latexmk/none），没有 TeX 环境时编译阶段跳过
+        self.latex_engine = "auto"
+        # 最近一次代码分析的扫描规模（文件数、目录数、文件总字节数），供工作流计量使用
+        self.last_scan: Dict = {}
         
         # /
         self.supported_templates = {
@@ -73,12 +110,24 @@ class AcademicPaperWriter:
             }
         }
     
-    def analyze_code(self, project_path: str) -> Dict:
+    def analyze_code(self, project_path: str, exclude: List[str] = None,
+                     use_gitignore: bool = True, use_cache: bool = True,
+                     jobs: int = 1, use_processes: bool = False,
+                     max_file_size: Optional[int] = None, smart_previews: bool = False,
+                     executor: Executor = None) -> Dict:
         """
         
         
         Args:
             project_path: 
+            exclude: 额外的排除模式（gitignore 语法），如 ["data/", "*.min.js"]
+            use_gitignore: 是否遵循项目的 .gitignore 和 .git/info/exclude
+            use_cache: 是否使用工作区下的增量分析缓存（未变化的文件不再读取）
+            jobs: 文件扫描的并发数，1 为串行，<= 0 为 CPU 核数
+            use_processes: 使用进程池而不是线程池
+            max_file_size: 参与行数统计的最大文件字节数，None 表示不限制
+            smart_previews: 关键文件预览提取 README 核心章节和源码的文档字符串/签名，而不是开头原文
+            executor: 共享的执行器（批量分析时复用同一个线程/进程池），忽略 jobs 和 use_processes
             
         Returns:
             Dict: 
@@ -90,17 +139,36 @@ class AcademicPaperWriter:
         
         print(f" : {project_path}")
         
+        # 一次遍历，各阶段共享快照
+        ignore_rules = IgnoreRules(project_path, exclude=exclude, use_gitignore=use_gitignore)
+        snapshot = scan_project(project_path, ignore_rules)
+        self.last_scan = {
+            "files_scanned": len(snapshot.files),
+            "dirs_scanned": len(snapshot.dirs),
+            "bytes_scanned": sum(entry.size for entry in snapshot.files),
+        }
+        cache = AnalysisCache.for_project(self.cache_dir, project_path) if use_cache else None
+        
+        # Python 模块的 AST 模型（导入图）
+        python_model = self._build_python_model(snapshot, cache, jobs, use_processes, max_file_size, executor)
+        
         # 1. 
-        project_type = self._detect_project_type(project_path)
+        project_type = self._detect_project_type(snapshot, python_model)
         
         # 2. 
-        code_stats = self._analyze_code_structure(project_path)
+        code_stats = self._analyze_code_structure(snapshot, cache, jobs, use_processes, max_file_size, executor)
+        code_stats["main_modules"] = python_model.rank_modules()
+        code_stats["python"] = python_model.stats()
         
         # 3. 
-        key_files = self._extract_key_files(project_path)
+        key_files = self._extract_key_files(snapshot, cache, smart_previews, python_model)
+        
+        if cache is not None:
+            cache.save()
         
         # 4. 
-        innovations = self._generate_innovations(project_type, code_stats, key_files)
+        innovations = self._generate_innovations(project_type, code_stats, key_files,
+                                                 python_model.innovation_hints() + self._language_hints(code_stats))
         
         return {
             "project_type": project_type,
@@ -110,18 +178,85 @@ class AcademicPaperWriter:
             "suggested_keywords": self._generate_keywords(project_type, innovations)
         }
     
-    def _detect_project_type(self, project_path: Path) -> str:
+    def _build_python_model(self, snapshot: ProjectSnapshot, cache: AnalysisCache = None,
+                            jobs: int = 1, use_processes: bool = False,
+                            max_file_size: Optional[int] = None,
+                            executor: Executor = None) -> PythonProjectModel:
+        """
+        用 ast 解析所有 Python 文件并构建导入图
+        
+        未变化的文件直接使用缓存的摘要；mtime 变化但内容哈希相同的文件也不会重新解析
+        """
+        summaries = {}
+        pending = []
+        for entry in snapshot.files_with_suffix(".py"):
+            if max_file_size is not None and entry.size >= max_file_size:
+                continue
+            record = cache.get(entry) if cache else None
+            if record is not None and "ast" in record:
+                summaries[entry.rel_path] = record["ast"]
+            else:
+                pending.append(entry)
+        
+        previous = [cache.peek(entry) if cache else None for entry in pending]
+        tasks = [(entry.path, old.get("sha1") if old else None) for entry, old in zip(pending, previous)]
+        results = run_pool(summarize_python_file, tasks, jobs, use_processes, executor)
+        
+        for entry, old, result in zip(pending, previous, results):
+            if result is None:
+                continue
+            summary = result["summary"] if result["summary"] is not None else old["ast"]
+            summaries[entry.rel_path] = summary
+            if cache:
+                cache.put(entry, {"sha1": result["sha1"], "ast": summary})
+        
+        return PythonProjectModel(summaries)
+    
+    def analyze_many(self, project_paths: List[str], jobs: int = 1, use_processes: bool = False,
+                     **analysis_options) -> List[Dict]:
+        """
+        批量分析多个项目，所有项目共享同一个线程/进程池
+        
+        Args:
+            project_paths: 项目路径列表
+            jobs: 共享池的并发数
+            use_processes: 使用进程池
+            **analysis_options: 传给 analyze_code 的其他参数（exclude、max_file_size 等）
+            
+        Returns:
+            List[Dict]: 每个项目的 {"project", "seconds", "analysis"}，顺序与输入一致
+        """
+        results = []
+        executor = create_executor(jobs, use_processes)
+        try:
+            for project_path in project_paths:
+                start = time.perf_counter()
+                analysis = self.analyze_code(project_path, executor=executor, **analysis_options)
+                results.append({
+                    "project": str(project_path),
+                    "seconds": round(time.perf_counter() - start, 3),
+                    "analysis": analysis
+                })
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        return results
+    
+    def _detect_project_type(self, snapshot: ProjectSnapshot, python_model: PythonProjectModel = None) -> str:
         """"""
-        files = list(project_path.rglob("*"))
-        file_names = [f.name.lower() for f in files]
+        file_names = snapshot.names()
         
-        if any("model" in f or "train" in f for f in file_names):
-            if any(f.endswith('.py') for f in file_names):
-                return "Deep Learning / AI"
-            elif any(f.endswith('.ipynb') for f in file_names):
+        # 优先根据 Python 导入的技术栈判断
+        if python_model is not None:
+            detected = python_model.detect_project_type()
+            if detected:
+                return detected
+        
+        if any(f.endswith('.ipynb') for f in file_names):
+            if any("model" in f or "train" in f for f in file_names):
                 return "ML Research / Jupyter"
         
-        if "requirements.txt" in file_names or "setup.py" in file_names:
+        if "requirements.txt" in file_names or "setup.py" in file_names or "pyproject.toml" in file_names:
             return "Python Project"
         
         if any(f.endswith('.cpp') or f.endswith('.c') for f in file_names):
@@ -129,7 +264,10 @@ class AcademicPaperWriter:
         
         return "General Software"
     
-    def _analyze_code_structure(self, project_path: Path) -> Dict:
+    def _analyze_code_structure(self, snapshot: ProjectSnapshot, cache: AnalysisCache = None,
+                                jobs: int = 1, use_processes: bool = False,
+                                max_file_size: Optional[int] = None,
+                                executor: Executor = None) -> Dict:
         """"""
         stats = {
             "total_files": 0,
@@ -138,67 +276,135 @@ class AcademicPaperWriter:
             "main_modules": []
         }
         
-        for file_path in project_path.rglob("*"):
-            if file_path.is_file() and file_path.stat().st_size < 1024*1024:  # 1MB
-                try:
-                    suffix = file_path.suffix.lower()
-                    if suffix in ['.py', '.cpp', '.c', '.h', '.java', '.js', '.ts']:
-                        stats["total_files"] += 1
-                        stats["languages"][suffix] = stats["languages"].get(suffix, 0) + 1
-                        
-                        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                            lines = len(f.readlines())
-                            stats["total_lines"] += lines
-                            
-                        # 
-                        if suffix == '.py' and file_path.stat().st_size > 1000:
-                            stats["main_modules"].append(file_path.name)
-                except:
-                    continue
+        sources = [
+            entry for entry in snapshot.files
+            if entry.suffix in LANGUAGE_BY_SUFFIX
+            and (max_file_size is None or entry.size < max_file_size)
+        ]
+        
+        # 只读取缓存未命中的文件；按快照顺序合并，结果与串行一致
+        file_stats = {}
+        pending = []
+        for entry in sources:
+            record = cache.get(entry) if cache else None
+            if record is not None and "code" in record:
+                file_stats[entry.rel_path] = record
+            else:
+                pending.append(entry)
+        
+        tasks = [(entry.path, entry.suffix, entry.size) for entry in pending]
+        counted = run_pool(file_line_stats, tasks, jobs, use_processes, executor)
+        for entry, result in zip(pending, counted):
+            if result is None:
+                continue
+            file_stats[entry.rel_path] = result
+            if cache:
+                cache.put(entry, dict(result, language=LANGUAGE_BY_SUFFIX[entry.suffix]))
+        
+        per_language = []
+        for entry in sources:
+            if entry.rel_path not in file_stats:
+                continue
+            suffix = entry.suffix
+            stats["total_files"] += 1
+            stats["languages"][suffix] = stats["languages"].get(suffix, 0) + 1
+            stats["total_lines"] += file_stats[entry.rel_path]["lines"]
+            per_language.append((LANGUAGE_BY_SUFFIX[suffix], file_stats[entry.rel_path]))
+        
+        # 按语言区分代码行、注释行和空行
+        stats["language_stats"] = summarize_languages(per_language)
+        stats["code_lines"] = sum(s["code"] for s in stats["language_stats"].values())
+        stats["comment_lines"] = sum(s["comment"] for s in stats["language_stats"].values())
+        stats["blank_lines"] = sum(s["blank"] for s in stats["language_stats"].values())
+        written = stats["code_lines"] + stats["comment_lines"]
+        stats["comment_ratio"] = round(stats["comment_lines"] / written, 3) if written else 0.0
         
         return stats
     
-    def _extract_key_files(self, project_path: Path) -> List[Dict]:
+    def _language_hints(self, code_stats: Dict) -> List[str]:
+        """从多语言统计中提取创新点线索"""
+        hints = []
+        language_stats = code_stats.get("language_stats", {})
+        code_lines = code_stats.get("code_lines", 0)
+        
+        if language_stats.get("CUDA", {}).get("code"):
+            hints.append("GPU acceleration with custom CUDA kernels")
+        
+        # 占代码量 5% 以上的语言才算作实现语言
+        major = [
+            name for name, s in language_stats.items()
+            if code_lines and s["code"] / code_lines >= 0.05
+        ]
+        if len(major) > 1:
+            hints.append(f"Cross-language implementation ({', '.join(major[:3])})")
+        
+        return hints
+    
+    def _extract_key_files(self, snapshot: ProjectSnapshot, cache: AnalysisCache = None,
+                           smart: bool = False, python_model: PythonProjectModel = None) -> List[Dict]:
         """"""
         key_files = []
         
         #  README
-        readme_files = list(project_path.glob("README*"))
+        readme_files = [f for f in snapshot.top_level_files() if f.name.startswith("README")]
         if readme_files:
             try:
-                with open(readme_files[0], 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()[:2000]
-                    key_files.append({
-                        "type": "readme",
-                        "name": readme_files[0].name,
-                        "content_preview": content
-                    })
+                content = self._read_preview(readme_files[0], 2000, cache, readme_preview if smart else None)
+                key_files.append({
+                    "type": "readme",
+                    "name": readme_files[0].name,
+                    "content_preview": content
+                })
             except:
                 pass
         
-        #  main 
-        main_files = [
-            f for f in project_path.rglob("*.py")
-            if 'main' in f.name.lower() or 'train' in f.name.lower()
-        ][:3]
+        # 按入口声明、__main__、导入中心度等打分，取前 3 个
+        main_files = rank_key_sources(
+            snapshot.files_with_suffix(".py"),
+            declared_entry_modules(snapshot),
+            python_model,
+            k=3
+        )
         
         for f in main_files:
             try:
-                with open(f, 'r', encoding='utf-8', errors='ignore') as file:
-                    content = file.read()[:1500]
-                    key_files.append({
-                        "type": "source",
-                        "name": f.name,
-                        "content_preview": content
-                    })
+                content = self._read_preview(f, 1500, cache, source_preview if smart else None)
+                key_files.append({
+                    "type": "source",
+                    "name": f.name,
+                    "content_preview": content
+                })
             except:
                 pass
         
         return key_files
     
-    def _generate_innovations(self, project_type: str, code_stats: Dict, key_files: List) -> List[str]:
+    def _read_preview(self, entry, max_chars: int, cache: AnalysisCache = None, extractor=None) -> str:
+        """
+        读取文件预览，只读取所需的字符预算；命中缓存时不再读取文件
+        
+        Args:
+            entry: 文件条目
+            max_chars: 预览最大字符数
+            cache: 分析缓存
+            extractor: 智能预览函数（readme_preview/source_preview），None 表示读取开头原文
+        """
+        preview_key = f"{extractor.__name__ if extractor else 'raw'}:{max_chars}"
+        record = cache.get(entry) if cache else None
+        if record and record.get("preview_key") == preview_key:
+            return record["preview"]
+        
+        content = (extractor or read_preview)(entry.path, max_chars)
+        
+        if cache:
+            cache.put(entry, {"preview": content, "preview_key": preview_key})
+        return content
+    
+    def _generate_innovations(self, project_type: str, code_stats: Dict, key_files: List,
+                              code_hints: List[str] = None) -> List[str]:
         """"""
-        innovations = []
+        # 从代码结构中提取的线索最具体，放在最前面
+        innovations = list(code_hints or [])
         
         if "Deep Learning" in project_type or "ML" in project_type:
             innovations.extend([
@@ -230,6 +436,10 @@ class AcademicPaperWriter:
         
         if "Deep Learning" in project_type:
             keywords.extend(["Deep Learning", "Neural Networks", "Machine Learning"])
+        elif "ML" in project_type:
+            keywords.extend(["Machine Learning", "Data Science"])
+        elif "Scientific" in project_type:
+            keywords.extend(["Scientific Computing", "Numerical Methods"])
         elif "System" in project_type:
             keywords.extend(["System Design", "Software Engineering"])
         
@@ -273,7 +483,8 @@ class AcademicPaperWriter:
                             "2.1 Problem Formulation",
                             "2.2 Proposed Approach",
                             "2.3 Implementation Details"
-                        ]
+                        ],
+                        "content_points": self._implementation_points(code_analysis.get("code_stats", {}))
                     },
                     {
                         "title": "3. Experiments",
@@ -313,6 +524,22 @@ class AcademicPaperWriter:
         
         return outline
     
+    def _implementation_points(self, code_stats: Dict) -> List[str]:
+        """根据代码统计生成实现细节要点"""
+        points = []
+        language_stats = code_stats.get("language_stats", {})
+        if language_stats:
+            languages = ", ".join(list(language_stats)[:3])
+            points.append(f"Implementation: {code_stats.get('code_lines', 0):,} lines of code "
+                          f"in {code_stats.get('total_files', 0)} files ({languages})")
+            points.append(f"Documentation: {code_stats.get('comment_ratio', 0):.0%} of non-blank lines are comments")
+        
+        python = code_stats.get("python", {})
+        if python.get("modules"):
+            points.append(f"Code structure: {python['modules']} Python modules, "
+                          f"{python['classes']} classes, {python['functions']} functions")
+        return points
+    
     def download_template(self, template_name: str) -> Path:
         """
          LaTeX 
@@ -333,38 +560,105 @@ class AcademicPaperWriter:
         template_dir = self.templates_dir / template_name
         template_dir.mkdir(exist_ok=True)
         
-        # 
-        # 
+        # 本地模板包：首次导入时流式解压到模板仓库，之后按压缩包哈希直接使用索引
+        kit_files = {}
+        archive = find_kit_archive(self.kits_dir, template_name, template_info.get("url"))
+        if archive is not None:
+            kit = ingest_kit(self.template_store, archive, template_name)
+        else:
+            kit = KitCache(self.template_store).assigned(template_name)
+        if kit is not None:
+            kit_files = kit["files"]
+            status = "cached" if kit.get("cached", True) else "imported"
+            print(f"  Kit: {kit['archive']} ({len(kit_files)} files, {status})")
+            if kit["classes"]:
+                print(f"  Classes: {', '.join(sorted(kit['classes']))}")
         
         #  LaTeX 
-        self._create_basic_latex_structure(template_dir, template_name)
+        self._create_basic_latex_structure(template_dir, template_name, kit_files)
+        
+        # 有 pdflatex 时预编译模板导言区的格式文件，由该模板生成的论文首次编译即可直接使用
+        fmt = LatexBuilder(self.template_store.formats_dir, engine=self.latex_engine,
+                           format_dir=self.template_store.formats_dir).precompile(template_dir)
+        if fmt is not None:
+            print(f"  Format: {fmt['name']} ({fmt['status']}, {fmt['seconds']:.2f}s)")
         
         print(f" : {template_dir}")
         return template_dir
     
-    def _create_basic_latex_structure(self, template_dir: Path, template_name: str):
-        """ LaTeX """
+    def import_template(self, template_name: str, archive: str) -> Path:
+        """
+        导入本地模板包并准备模板目录
+        
+        Args:
+            template_name: 模板名称（supported_templates 之一）
+            archive: 模板包路径（.zip）
+            
+        Returns:
+            Path: 模板目录
+        """
+        if template_name not in self.supported_templates:
+            raise ValueError(f"Unsupported template: {template_name}. "
+                           f"Supported: {list(self.supported_templates.keys())}")
+        kit = ingest_kit(self.template_store, archive, template_name)
+        print(f"  Imported {kit['archive']}: {len(kit['files'])} files, "
+              f"{len(kit['classes'])} classes, {len(kit['styles'])} styles, {len(kit['bibstyles'])} bibstyles")
+        return self.download_template(template_name)
+    
+    def prefetch_templates(self, template_names: List[str] = None, jobs: int = DEFAULT_FETCH_JOBS,
+                           transport=None, force: bool = False) -> List[Dict]:
+        """
+        并发下载模板包到本地模板包目录，之后 download_template 不再需要网络
         
-        # main.tex
-        main_tex = template_dir / "main.tex"
-        with open(main_tex, 'w', encoding='utf-8') as f:
-            f.write(self._get_main_tex_template(template_name))
+        Args:
+            template_names: 模板名称，默认全部
+            jobs: 并发下载数
+            transport: 传输层（测试时可替换）
+            force: 重新下载本地已有的模板包
+            
+        Returns:
+            List[Dict]: 每个模板的结果
+        """
+        results = prefetch_templates(self.supported_templates, self.kits_dir, self.template_store,
+                                     names=template_names, jobs=jobs, transport=transport, force=force)
+        for result in results:
+            detail = result.get("error") or result.get("reason") or result.get("path", "")
+            print(f"  [{result['status']}] {result['name']}: {detail}")
+        return results
+    
+    def _create_basic_latex_structure(self, template_dir: Path, template_name: str,
+                                      kit_files: Dict[str, str] = None):
+        """
+         LaTeX 
+        
+        模板内容先提交到模板仓库（内容未变化时不产生任何写入），再检出到模板目录：
+        只写入内容不同的文件，用户修改过的文件保留不覆盖
         
-        # sections 
-        sections_dir = template_dir / "sections"
-        sections_dir.mkdir(exist_ok=True)
+        Args:
+            template_dir: 模板目录
+            template_name: 模板名称
+            kit_files: 已导入的模板包清单（相对路径 -> 哈希）；同名时生成的骨架文件优先
+        """
+        files = {"main.tex": self._get_main_tex_template(template_name).encode("utf-8")}
         
         # 
         sections = ["introduction", "method", "experiments", "discussion", "conclusion"]
         for section in sections:
-            section_file = sections_dir / f"{section}.tex"
-            with open(section_file, 'w', encoding='utf-8') as f:
-                f.write(f"% {section.capitalize()} section\n\\section{{{section.capitalize()}}}\n\n")
+            files[f"sections/{section}.tex"] = (
+                f"% {section.capitalize()} section\n\\section{{{section.capitalize()}}}\n\n"
+            ).encode("utf-8")
         
         # references.bib
-        bib_file = template_dir / "references.bib"
-        with open(bib_file, 'w', encoding='utf-8') as f:
-            f.write("% References\n")
+        files["references.bib"] = b"% References\n"
+        
+        manifest = dict(kit_files or {})
+        manifest.update((rel_path, self.template_store.put_bytes(data)) for rel_path, data in files.items())
+        version = self.template_store.commit_manifest(template_name, manifest)
+        results = self.template_store.checkout(self.template_store.manifest(template_name, version),
+                                               template_dir)
+        for rel_path, status in sorted(results.items()):
+            if status == "kept":
+                print(f"  [Keep] {rel_path} (customized)")
     
     def _get_main_tex_template(self, template_name: str) -> str:
         """ LaTeX """
@@ -376,6 +670,8 @@ class AcademicPaperWriter:
 \usepackage{graphicx}
 \usepackage{textcomp}
 \usepackage{xcolor}
+% Everything above this line is precompiled into a format file for local builds
+\csname endofdump\endcsname
 
 \title{[Your Paper Title]}
 \author{
@@ -411,6 +707,8 @@ class AcademicPaperWriter:
 """,
             "acm": r"""\documentclass[sigconf]{acmart}
 \usepackage{booktabs}
+% Everything above this line is precompiled into a format file for local builds
+\csname endofdump\endcsname
 
 \title{[Your Paper Title]}
 \author{[Author Name]}
@@ -442,6 +740,8 @@ class AcademicPaperWriter:
 \usepackage[utf8]{inputenc}
 \usepackage{graphicx}
 \usepackage{amsmath}
+% Everything above this line is precompiled into a format file for local builds
+\csname endofdump\endcsname
 \usepackage{hyperref}
 
 \title{[Your Paper Title]}
@@ -480,132 +780,292 @@ class AcademicPaperWriter:
         
         return templates.get(template_name, templates["default"])
     
-    def generate_latex(self, outline: Dict, template_dir: Path, output_dir: Path) -> Path:
+    def _new_paper_dir(self, output_dir: Path) -> Path:
+        """新论文目录的路径（尚未创建）"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        paper_dir = output_dir / f"paper_{timestamp}"
+        # 同一秒内生成多篇（批量模式）时追加序号，避免互相覆盖
+        suffix = 1
+        while paper_dir.exists():
+            paper_dir = output_dir / f"paper_{timestamp}_{suffix}"
+            suffix += 1
+        return paper_dir
+    
+    def generate_latex(self, outline: Dict, template_dir: Path, output_dir: Path,
+                       batch: WriteBatch = None) -> Path:
         """
          LaTeX 
         
+        所有文件先写入暂存目录，完成后整个论文目录一次原子 rename 出现
+        
         Args:
             outline: 
             template_dir: 
             output_dir: 
+            batch: 调用方的写入批次（full_workflow 把审稿和报告一起提交），为空时自行提交
             
         Returns:
             Path: 
         """
         print("  LaTeX ...")
         
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        paper_dir = output_dir / f"paper_{timestamp}"
-        paper_dir.mkdir(exist_ok=True)
-        
-        # 
-        for item in template_dir.iterdir():
-            if item.is_dir():
-                shutil.copytree(item, paper_dir / item.name, dirs_exist_ok=True)
-            else:
-                shutil.copy2(item, paper_dir / item.name)
-        
-        #  main.tex 
-        main_tex = paper_dir / "main.tex"
-        if main_tex.exists():
-            with open(main_tex, 'r', encoding='utf-8') as f:
-                content = f.read()
+        with (WriteBatch(self._new_paper_dir(output_dir)) if batch is None else nullcontext(batch)) as batch:
+            stage = batch.root
             
-            content = content.replace("[Your Paper Title]", outline.get("title", "Untitled Paper"))
+            # 从模板仓库生成论文目录：模板目录中未变化的文件不会重新哈希；
+            # 不可变的模板文件链接到仓库 blob，之后会被改写的章节文件和每篇论文各自的参考文献生成独立副本
+            manifest = self.template_store.snapshot_dir(template_dir)
+            used = self.template_store.materialize(manifest, stage, skip={"main.tex", "meta.json"},
+                                                   mode=self.link_mode, copy=("sections/*.tex", "*.bib"))
+            if used:
+                print("  Template files: " + ", ".join(f"{n} {m}" for m, n in sorted(used.items())))
             
-            with open(main_tex, 'w', encoding='utf-8') as f:
-                f.write(content)
-        
-        # 
-        self._generate_section_content(paper_dir / "sections", outline)
+            #  main.tex 
+            if "main.tex" in manifest:
+                content = self.template_store.read_blob(manifest["main.tex"]).decode("utf-8")
+                content = content.replace("[Your Paper Title]", latex_escape(outline.get("title", "Untitled Paper")))
+                batch.write_text("main.tex", content)
+            
+            # 
+            fingerprints = self._generate_section_content(stage / "sections", outline)
+            
+            # 
+            meta = {
+                "title": outline.get("title"),
+                "created_at": datetime.now().isoformat(),
+                "template": template_dir.name,
+                "template_version": TemplateStore.manifest_version(manifest),
+                "keywords": outline.get("keywords", []),
+                "sections": [s["title"] for s in outline.get("sections", [])],
+                "section_fingerprints": fingerprints
+            }
+            batch.write_json("meta.json", meta)
         
-        # 
-        meta = {
-            "title": outline.get("title"),
-            "created_at": datetime.now().isoformat(),
-            "template": template_dir.name,
-            "keywords": outline.get("keywords", []),
-            "sections": [s["title"] for s in outline.get("sections", [])]
-        }
+        print(f" LaTeX : {batch.target}")
+        return batch.target
+    
+    def _generate_section_content(self, sections_dir: Path, outline: Dict) -> Dict[str, str]:
+        """
         
-        with open(paper_dir / "meta.json", 'w', encoding='utf-8') as f:
-            json.dump(meta, f, indent=2, ensure_ascii=False)
         
-        print(f" LaTeX : {paper_dir}")
-        return paper_dir
-    
-    def _generate_section_content(self, sections_dir: Path, outline: Dict):
-        """"""
+        每个章节由预编译的模板渲染为完整文本后一次写入，内容放在生成区域标记之间；
+        章节标题映射到模板中已有的章节文件（1. Introduction -> introduction.tex，2. Methodology -> method.tex）
         
-        sections = outline.get("sections", [])
+        Returns:
+            Dict[str, str]: 已写入的章节文件名 -> 输入指纹
+        """
+        fingerprints = {}
         
-        for i, section in enumerate(sections, 1):
-            section_name = section["title"].lower().replace(" ", "_").replace(".", "")
-            section_file = sections_dir / f"{section_name}.tex"
+        for section in outline.get("sections", []):
+            slug = section_slug(section["title"])
+            section_file = sections_dir / f"{slug}.tex"
             
             if section_file.exists():
                 with open(section_file, 'w', encoding='utf-8') as f:
-                    f.write(f"% {section['title']}\n")
-                    f.write(f"\\section{{{section['title'].split('. ', 1)[-1]}}}\n\n")
-                    
-                    # 
-                    for subsection in section.get("subsections", []):
-                        f.write(f"\\subsection{{{subsection}}}\n\n")
-                        f.write("[Content to be added...]\n\n")
-                    
-                    # 
-                    if "content_points" in section:
-                        f.write("\\textbf{Key Points}:\n")
-                        f.write("\\begin{itemize}\n")
-                        for point in section["content_points"]:
-                            f.write(f"    \\item {point}\n")
-                        f.write("\\end{itemize}\n\n")
-    
-    def review_paper(self, paper_dir: Path) -> Dict:
+                    f.write(wrap_generated(slug, render_section(section)))
+                fingerprints[slug] = section_fingerprint(section)
+        
+        return fingerprints
+    
+    def update_latex(self, outline: Dict, paper_dir: Path, batch: WriteBatch = None) -> Dict[str, List[str]]:
+        """
+        增量更新已有论文目录
+        
+        与 meta.json 中记录的章节指纹比较，只重写输入发生变化的章节；
+        只替换生成区域标记之间的内容，标记之外的用户内容保持不变，没有标记的章节文件不做修改
+        
+        Args:
+            outline: 新的大纲
+            paper_dir: generate_latex 生成的论文目录
+            batch: 写入批次，为空时自行提交
+            
+        Returns:
+            Dict: written / unchanged / kept（缺少标记而保留）的章节文件名
+        """
+        print(f"  Updating {paper_dir} ...")
+        
+        meta_file = paper_dir / "meta.json"
+        try:
+            with open(meta_file, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            raise ValueError(f"Not a generated paper directory (missing meta.json): {paper_dir}")
+        
+        old_fingerprints = meta.get("section_fingerprints", {})
+        fingerprints = {}
+        changes = {"written": [], "unchanged": [], "kept": []}
+        
+        with (WriteBatch(paper_dir) if batch is None else nullcontext(batch)) as batch:
+            for section in outline.get("sections", []):
+                slug = section_slug(section["title"])
+                section_file = paper_dir / "sections" / f"{slug}.tex"
+                if not section_file.exists():
+                    continue
+                
+                fingerprint = section_fingerprint(section)
+                if old_fingerprints.get(slug) == fingerprint:
+                    fingerprints[slug] = fingerprint
+                    changes["unchanged"].append(slug)
+                    continue
+                
+                with open(section_file, 'r', encoding='utf-8') as f:
+                    existing = f.read()
+                content = replace_generated(existing, slug, render_section(section))
+                if content is None:
+                    if slug in old_fingerprints:
+                        fingerprints[slug] = old_fingerprints[slug]
+                    changes["kept"].append(slug)
+                    continue
+                
+                fingerprints[slug] = fingerprint
+                if content == existing:
+                    changes["unchanged"].append(slug)
+                    continue
+                batch.write_text(f"sections/{slug}.tex", content)
+                changes["written"].append(slug)
+            
+            # 标题变化时只替换 main.tex 中的 \title{...}
+            title = outline.get("title", "Untitled Paper")
+            if meta.get("title") and title != meta["title"]:
+                main_tex = paper_dir / "main.tex"
+                if main_tex.exists():
+                    with open(main_tex, 'r', encoding='utf-8') as f:
+                        content = f.read()
+                    old_title = f"\\title{{{latex_escape(meta['title'])}}}"
+                    if old_title in content:
+                        batch.write_text("main.tex", content.replace(old_title, f"\\title{{{latex_escape(title)}}}", 1))
+                        changes["written"].append("main")
+            
+            sections = [s["title"] for s in outline.get("sections", [])]
+            if changes["written"] or fingerprints != old_fingerprints or sections != meta.get("sections") \
+                    or outline.get("keywords", []) != meta.get("keywords"):
+                meta.update({
+                    "title": title,
+                    "updated_at": datetime.now().isoformat(),
+                    "keywords": outline.get("keywords", []),
+                    "sections": sections,
+                    "section_fingerprints": fingerprints
+                })
+                batch.write_json("meta.json", meta)
+        
+        for status in ("written", "kept"):
+            if changes[status]:
+                print(f"  {status.capitalize()}: {', '.join(changes[status])}")
+        print(f"  Unchanged: {len(changes['unchanged'])} sections")
+        return changes
+    
+    def review_paper(self, paper_dir: Path, batch: WriteBatch = None) -> Dict:
         """
          - 
         
         Args:
             paper_dir: 
+            batch: 尚未提交的写入批次；提供时从暂存目录读取，审稿意见加入该批次
             
         Returns:
             Dict: 
         """
         print(" ...")
+        if batch is not None:
+            paper_dir = batch.root
         
         review = {
             "overall_score": 0,
             "strengths": [],
             "weaknesses": [],
             "suggestions": [],
-            "detailed_comments": {}
+            "detailed_comments": {},
+            # 审稿时论文输入文件的指纹，review-all 据此跳过未变化的论文
+            "inputs": paper_fingerprint(paper_dir)
         }
         
+        # .bib 索引按文件内容哈希缓存，参考文献未变化时再次审稿不需要重新解析
+        bib_cache = self.cache_dir / "bibtex"
+        bib_indexes = {}
+        
+        def load_index(path: Path):
+            if path not in bib_indexes:
+                bib_indexes[path] = load_bib_index(path, bib_cache)
+            return bib_indexes[path]
+        
         # 
         main_tex = paper_dir / "main.tex"
         if not main_tex.exists():
             review["weaknesses"].append("Missing main.tex file")
         else:
-            review["strengths"].append("LaTeX structure is complete")
-        
-        # 
-        sections_dir = paper_dir / "sections"
-        if sections_dir.exists():
-            section_files = list(sections_dir.glob("*.tex"))
-            if len(section_files) >= 4:
-                review["strengths"].append(f"Paper has {len(section_files)} sections")
+            # 单遍扫描 main.tex 及其 \input 的所有文件
+            latex = review_latex(main_tex, load_index)
+            review["latex"] = {key: latex[key] for key in ("words", "figures", "tables", "labels", "files")}
+            review["latex"]["citations"] = len(latex["citations"])
+            
+            if latex["missing_inputs"]:
+                review["weaknesses"].append(
+                    f"Missing input files: {', '.join(m.get('input', m.get('file', '')) for m in latex['missing_inputs'])}")
+            else:
+                review["strengths"].append("LaTeX structure is complete")
+            
+            sections = [section for section in latex["sections"] if section["level"] <= 1
+                        and section["title"] != "Abstract"]
+            if len(sections) >= 4:
+                review["strengths"].append(f"Paper has {len(sections)} sections")
             else:
                 review["weaknesses"].append("Paper structure might be incomplete")
+            
+            if latex["placeholders"]:
+                first = latex["placeholders"][0]
+                review["weaknesses"].append(
+                    f"{len(latex['placeholders'])} placeholder(s) left in the text "
+                    f"(first: {first['text']} at {first['file']}:{first['line']})")
+            if latex["unresolved_refs"]:
+                keys = sorted({ref["key"] for ref in latex["unresolved_refs"]})
+                review["weaknesses"].append(f"Unresolved references: {', '.join(keys)}")
+            if latex["unresolved_citations"]:
+                keys = sorted({cite["key"] for cite in latex["unresolved_citations"]})
+                review["weaknesses"].append(f"Citations missing from the bibliography: {', '.join(keys)}")
+            if latex["missing_bibliographies"]:
+                review["weaknesses"].append(
+                    f"Missing bibliography files: {', '.join(latex['missing_bibliographies'])}")
+            for bib, info in latex["bibliography"].items():
+                if info["duplicates"]:
+                    keys = sorted({d["key"] for d in info["duplicates"]})
+                    review["weaknesses"].append(f"Duplicate keys in {bib}: {', '.join(keys)}")
+                if info["incomplete"]:
+                    review["weaknesses"].append(
+                        f"{len(info['incomplete'])} entries in {bib} are missing required fields "
+                        f"(first: {info['incomplete'][0]['key']}: {', '.join(info['incomplete'][0]['missing'])})")
+                if info["errors"]:
+                    review["weaknesses"].append(
+                        f"{len(info['errors'])} entries in {bib} could not be parsed "
+                        f"(first at line {info['errors'][0]['line']})")
+                if info["uncited"]:
+                    review["suggestions"].append(
+                        f"Cite or remove {len(info['uncited'])} unused entries in {bib}")
+            
+            for section in latex["sections"]:
+                title = section["title"]
+                if title in review["detailed_comments"]:
+                    title = f"{title} ({section['file']}:{section['line']})"
+                review["detailed_comments"][title] = {
+                    "level": section["level"],
+                    "file": section["file"],
+                    "line": section["line"],
+                    "words": section["words"],
+                    "placeholders": section["placeholders"],
+                }
+            review["placeholders"] = latex["placeholders"]
+            review["unresolved_refs"] = latex["unresolved_refs"]
+            review["unresolved_citations"] = latex["unresolved_citations"]
+            # 未引用条目只记录数量，大型综述的参考文献会有上千个
+            review["bibliography"] = {bib: dict(info, uncited=len(info["uncited"]))
+                                      for bib, info in latex["bibliography"].items()}
         
         # 
         bib_file = paper_dir / "references.bib"
         if bib_file.exists():
-            with open(bib_file, 'r', encoding='utf-8') as f:
-                bib_content = f.read()
-                if len(bib_content) > 100:
-                    review["strengths"].append("References file is present")
-                else:
-                    review["weaknesses"].append("References need to be added")
+            if load_index(bib_file).entries:
+                review["strengths"].append("References file is present")
+            else:
+                review["weaknesses"].append("References need to be added")
         
         # 
         score = 5  # 
@@ -620,78 +1080,409 @@ class AcademicPaperWriter:
             "Improve the clarity of figures and tables",
             "Expand the related work section",
             "Add ablation studies if applicable"
-        ]
+        ] + review["suggestions"]
         
         # 
-        review_file = paper_dir / "review_comments.json"
-        with open(review_file, 'w', encoding='utf-8') as f:
-            json.dump(review, f, indent=2, ensure_ascii=False)
+        # 增量更新时审稿意见未变化则不重写
+        previous = None
+        if batch is None:
+            try:
+                with open(paper_dir / "review_comments.json", 'r', encoding='utf-8') as f:
+                    previous = json.load(f)
+            except (OSError, ValueError):
+                pass
+        if previous != review:
+            with (WriteBatch(paper_dir) if batch is None else nullcontext(batch)) as batch:
+                batch.write_json("review_comments.json", review)
         
         print(f" : {review['overall_score']}/10")
         return review
     
-    def full_workflow(self, project_path: str, template_name: str = "ieee", paper_type: str = "conference"):
+    def build_paper(self, paper_dir: Path, batch: WriteBatch = None, force: bool = False) -> Dict:
         """
+        在本地编译论文
         
+        每篇论文在工作区有一个持久的编译目录，保留 .aux/.bbl；预编译的导言区格式文件放在模板仓库中，
+        由同一模板生成的论文共享。编译成功后 main.pdf 复制到论文目录
+        
+        Args:
+            paper_dir: 论文目录
+            batch: 尚未提交的写入批次；提供时编译暂存目录，main.pdf 加入该批次
+            force: 忽略上次的结果重新编译
+            
+        Returns:
+            Dict: 编译结果：status(ok/failed/up-to-date/unavailable)/seconds/passes/errors/...
+        """
+        target = batch.target if batch is not None else Path(paper_dir)
+        source = batch.root if batch is not None else Path(paper_dir)
+        key = hashlib.sha1(str(target.resolve()).encode("utf-8")).hexdigest()[:8]
+        builder = LatexBuilder(self.cache_dir / "builds" / f"{target.name}-{key}", engine=self.latex_engine,
+                               format_dir=self.template_store.formats_dir)
+        result = builder.build(source, force=force)
+        
+        if result.get("pdf") and (result["status"] == "ok" or not (source / "main.pdf").exists()):
+            with (WriteBatch(source) if batch is None else nullcontext(batch)) as pdf_batch:
+                shutil.copyfile(result["pdf"], pdf_batch.path("main.pdf"))
+        
+        if result["status"] == "unavailable":
+            print(f"  LaTeX build skipped: {result['reason']}")
+        elif result["status"] == "failed":
+            print(f"  LaTeX build failed in {result['seconds']:.2f}s:")
+            for error in result["errors"][:5]:
+                location = f"{error['file']}:{error['line']}: " if error.get("file") else ""
+                print(f"    {location}{error['message']}")
+        else:
+            print(f"  LaTeX build {result['status']} in {result['seconds']:.2f}s ({len(result['passes'])} passes)")
+        return result
+    
+    def full_workflow(self, project_path: str, template_name: str = "ieee", paper_type: str = "conference",
+                      exclude: List[str] = None, jobs: int = 1, use_processes: bool = False,
+                      max_file_size: Optional[int] = None, executor: Executor = None,
+                      template_dir: Path = None, paper_dir: Path = None,
+                      from_stage: str = None, only_stage: str = None, profile: bool = False):
+        """
+        
+        
+        工作流按阶段 DAG 执行：analyze 与 template 并发，然后 outline -> latex -> review；
+        各阶段的输出按输入哈希缓存在工作区，输入未变化的 outline 阶段（以及增量模式下的 latex 阶段）直接复用
         
         Args:
             project_path: 
             template_name: 
             paper_type: 
+            exclude: 代码分析时额外的排除模式
+            jobs: 代码分析的并发数
+            use_processes: 代码分析使用进程池
+            max_file_size: 参与行数统计的最大文件字节数
+            executor: 共享的执行器（批量模式）
+            template_dir: 已准备好的模板目录，提供时跳过模板准备（批量模式）
+            paper_dir: 已有的论文目录，提供时增量更新该目录而不是新建论文
+            from_stage: 只重新执行该阶段及其下游（WORKFLOW_STAGES 之一），其余阶段读取缓存
+            only_stage: 只执行该阶段，上游读取缓存，下游不执行
+            profile: 串行执行各阶段，用 cProfile 记录每个阶段并保存到 .cache/profiles/<运行时间>/
             
         Returns:
-            Path: 
+            Path: 论文目录；只执行 latex 之前的阶段时为 None
         """
         print("=" * 60)
         print("Academic Paper Writer - Full Workflow")
         print("=" * 60)
         
-        # Step 1: 
-        print("\nStep 1: Analyzing code...")
-        analysis = self.analyze_code(project_path)
-        print(f"Project type: {analysis['project_type']}")
-        print(f"Innovations found: {len(analysis['innovations'])}")
+        # 新论文的写入批次：latex 阶段创建，论文、审稿意见和报告在工作流结束时一次提交
+        batch = None
+        
+        def analyze(inputs: Dict) -> Dict:
+            print("\nStep 1: Analyzing code...")
+            analysis = self.analyze_code(inputs["project_path"], exclude=inputs["exclude"], jobs=jobs,
+                                         use_processes=use_processes, max_file_size=inputs["max_file_size"],
+                                         executor=executor)
+            profiler.record("analyze", **self.last_scan)
+            print(f"Project type: {analysis.get('project_type')}")
+            print(f"Innovations found: {len(analysis.get('innovations', []))}")
+            return analysis
+        
+        def prepare_template(inputs: Dict) -> Dict:
+            print("\nStep 3: Downloading template...")
+            directory = Path(inputs["template_dir"]) if inputs["template_dir"] \
+                else self.download_template(inputs["template_name"])
+            manifest = self.template_store.snapshot_dir(directory)
+            return {"template_dir": str(directory), "version": TemplateStore.manifest_version(manifest)}
+        
+        def outline(inputs: Dict) -> Dict:
+            print("\nStep 2: Designing outline...")
+            result = self.design_outline(inputs["analyze"], inputs["paper_type"])
+            print(f"Paper title: {result['title']}")
+            print(f"Sections: {len(result['sections'])}")
+            return result
+        
+        def latex(inputs: Dict) -> Dict:
+            nonlocal batch
+            if inputs["paper_dir"]:
+                # 增量模式：只重写大纲发生变化的章节
+                print("\nStep 4: Updating LaTeX...")
+                self.update_latex(inputs["outline"], Path(inputs["paper_dir"]))
+                return {"paper_dir": inputs["paper_dir"],
+                        "meta_sha256": sha256_file(Path(inputs["paper_dir"]) / "meta.json")}
+            print("\nStep 4: Generating LaTeX...")
+            batch = WriteBatch(self._new_paper_dir(self.output_dir))
+            self.generate_latex(inputs["outline"], Path(inputs["template"]["template_dir"]),
+                                self.output_dir, batch=batch)
+            return {"paper_dir": str(batch.target)}
+        
+        def latex_current(output: Dict) -> bool:
+            # 增量模式下论文目录可能已被其他项目的大纲更新过：meta.json 与缓存时一致才复用
+            paper = Path(output["paper_dir"])
+            if not paper.is_dir():
+                return False
+            if not params["paper_dir"]:
+                return True
+            try:
+                return sha256_file(paper / "meta.json") == output.get("meta_sha256")
+            except OSError:
+                return False
+        
+        def review(inputs: Dict) -> Dict:
+            print("\nStep 5: Reviewing paper...")
+            return self.review_paper(Path(inputs["latex"]["paper_dir"]), batch=batch)
+        
+        def build(inputs: Dict) -> Dict:
+            print("\nStep 6: Building PDF...")
+            return self.build_paper(Path(inputs["latex"]["paper_dir"]), batch=batch)
+        
+        stages = [
+            Stage("analyze", analyze, ("project_path", "exclude", "max_file_size"), memoize=False),
+            Stage("template", prepare_template, ("template_name", "template_dir"), memoize=False),
+            Stage("outline", outline, ("analyze", "paper_type")),
+            # 新论文模式每次都生成新目录；输入包含项目路径，大纲相同的其他项目不会读到本项目的论文
+            Stage("latex", latex, ("outline", "template", "paper_dir", "project_path"),
+                  memoize=paper_dir is not None, validate=latex_current),
+            Stage("review", review, ("latex",), memoize=False),
+            Stage("build", build, ("latex",), memoize=False),
+        ]
+        params = {
+            "project_path": str(Path(project_path).resolve()),
+            "exclude": exclude or [],
+            "max_file_size": max_file_size,
+            "template_name": template_name,
+            "template_dir": str(template_dir) if template_dir else None,
+            "paper_type": paper_type,
+            "paper_dir": str(Path(paper_dir).resolve()) if paper_dir else None,
+        }
+        
+        # 每个阶段的耗时、CPU、读取字节数和内存；profile 模式下串行执行，计量不受并发阶段干扰
+        profile_dir = self.cache_dir / "profiles" / datetime.now().strftime('%Y%m%d_%H%M%S_%f') if profile else None
+        profiler = StageProfiler(profile_dir)
+        pipeline = Pipeline(stages, StageCache(self.cache_dir / "pipeline"), jobs=1 if profile else 2,
+                            runner=profiler.run)
+        try:
+            outputs = pipeline.run(params, from_stage=from_stage, only_stage=only_stage)
+        except BaseException:
+            if batch is not None:
+                batch.abort()
+            raise
+        finally:
+            profiler.close()
+        
+        reused = [e["stage"] for e in pipeline.events if e["status"] != "ran"]
+        if reused:
+            print(f"\nReused cached stages: {', '.join(reused)}")
+        
+        metrics = profiler.summary()
+        print("\nStage metrics:")
+        print(format_summary(metrics))
+        if profile_dir is not None:
+            print(f"Profiles saved to: {profile_dir}")
+        # 每次运行追加一条记录，便于跨运行比较性能回归
+        append_trace(self.cache_dir / "workflow_trace.jsonl", {
+            "timestamp": datetime.now().isoformat(),
+            "project_path": params["project_path"],
+            "template": template_name,
+            "paper_dir": outputs.get("latex", {}).get("paper_dir"),
+            "stages": [dict(event, **metrics["stages"].get(event["stage"], {})) for event in pipeline.events],
+            "total": metrics["total"],
+        })
+        
+        if "latex" not in outputs:
+            print("\n" + "=" * 60)
+            print(f"Complete! Stages run: {', '.join(e['stage'] for e in pipeline.events if e['status'] == 'ran')}")
+            print("=" * 60)
+            return None
+        
+        paper_dir = Path(outputs["latex"]["paper_dir"])
+        if "review" in outputs:
+            # 
+            report = {
+                "workflow": "Academic Paper Writer",
+                "timestamp": datetime.now().isoformat(),
+                "project_path": str(project_path),
+                "template": template_name,
+                "paper_type": paper_type,
+                "analysis": outputs.get("analyze"),
+                "outline": outputs.get("outline"),
+                "review": outputs["review"],
+                "build": outputs.get("build"),
+                "output_dir": str(paper_dir),
+                "stages": pipeline.events,
+                "metrics": metrics
+            }
+            with (batch if batch is not None else WriteBatch(paper_dir)) as report_batch:
+                report_batch.write_json("workflow_report.json", report)
+        elif batch is not None:
+            batch.commit()
         
-        # Step 2: 
-        print("\nStep 2: Designing outline...")
-        outline = self.design_outline(analysis, paper_type)
-        print(f"Paper title: {outline['title']}")
-        print(f"Sections: {len(outline['sections'])}")
+        print("\n" + "=" * 60)
+        print(f"Complete! Paper generated at: {paper_dir}")
+        print("=" * 60)
         
-        # Step 3: 
-        print("\nStep 3: Downloading template...")
-        template_dir = self.download_template(template_name)
+        return paper_dir
+    
+    def batch_workflow(self, project_paths: List[str], template_name: str = "ieee",
+                       paper_type: str = "conference", jobs: int = 1, use_processes: bool = False,
+                       **analysis_options) -> Dict:
+        """
+        批量为多个项目生成论文
         
-        # Step 4:  LaTeX
-        print("\nStep 4: Generating LaTeX...")
-        paper_dir = self.generate_latex(outline, template_dir, self.output_dir)
+        模板只准备一次，所有项目共享同一个线程/进程池；单个项目失败不影响其他项目
         
-        # Step 5: 
-        print("\nStep 5: Reviewing paper...")
-        review = self.review_paper(paper_dir)
+        Args:
+            project_paths: 项目路径列表
+            template_name: 模板名称
+            paper_type: 论文类型
+            jobs: 共享池的并发数
+            use_processes: 使用进程池
+            **analysis_options: 传给 analyze_code 的其他参数
+            
+        Returns:
+            Dict: 批量报告，包含每个项目的耗时和输出目录
+        """
+        batch_start = time.perf_counter()
+        template_dir = self.download_template(template_name)
+        
+        projects = []
+        executor = create_executor(jobs, use_processes)
+        try:
+            for project_path in project_paths:
+                start = time.perf_counter()
+                entry = {"project": str(project_path)}
+                if not Path(project_path).exists():
+                    entry["status"] = "error"
+                    entry["error"] = "Project path does not exist"
+                else:
+                    try:
+                        paper_dir = self.full_workflow(project_path, template_name, paper_type,
+                                                       executor=executor, template_dir=template_dir,
+                                                       **analysis_options)
+                        entry["status"] = "ok"
+                        entry["paper_dir"] = str(paper_dir)
+                    except Exception as e:
+                        entry["status"] = "error"
+                        entry["error"] = str(e)
+                entry["seconds"] = round(time.perf_counter() - start, 3)
+                projects.append(entry)
+        finally:
+            if executor is not None:
+                executor.shutdown()
         
-        # 
         report = {
-            "workflow": "Academic Paper Writer",
+            "workflow": "Academic Paper Writer - Batch",
             "timestamp": datetime.now().isoformat(),
-            "project_path": str(project_path),
             "template": template_name,
             "paper_type": paper_type,
-            "analysis": analysis,
-            "outline": outline,
-            "review": review,
-            "output_dir": str(paper_dir)
+            "total_seconds": round(time.perf_counter() - batch_start, 3),
+            "projects": projects
         }
         
-        report_file = paper_dir / "workflow_report.json"
+        report_file = self.output_dir / f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
         with open(report_file, 'w', encoding='utf-8') as f:
             json.dump(report, f, indent=2, ensure_ascii=False)
         
         print("\n" + "=" * 60)
-        print(f"Complete! Paper generated at: {paper_dir}")
+        print("Batch Summary")
         print("=" * 60)
+        for entry in projects:
+            status = "[OK]" if entry["status"] == "ok" else "[FAIL]"
+            print(f"  {status} {entry['seconds']:>8.2f}s  {entry['project']}")
+        print(f"  Total: {report['total_seconds']:.2f}s, report: {report_file}")
         
-        return paper_dir
+        return report
+    
+    def review_all(self, papers_dir: Path = None, jobs: int = 0, force: bool = False) -> List[Dict]:
+        """
+        审阅论文目录下的所有论文并汇总评分
+        
+        自上次 review_comments.json 以来输入文件（.tex/.bib 等）未变化的论文直接使用已有的审稿意见；
+        其余论文在进程池中并行审阅。汇总表按评分从低到高写入 review_summary.json 和 review_summary.csv
+        
+        Args:
+            papers_dir: 论文目录，默认为工作区的 papers/
+            jobs: 并发进程数，<= 0 为 CPU 核数
+            force: 重新审阅所有论文
+            
+        Returns:
+            List[Dict]: 每篇论文一行：paper/status(reviewed/unchanged/error)/overall_score/...
+        """
+        papers_dir = Path(papers_dir) if papers_dir else self.output_dir
+        papers = sorted(d for d in papers_dir.iterdir()
+                        if d.is_dir() and not d.name.startswith(".") and (d / "main.tex").exists())
+        
+        rows = {}
+        pending = []
+        for paper in papers:
+            previous = None
+            if not force:
+                try:
+                    with open(paper / "review_comments.json", 'r', encoding='utf-8') as f:
+                        previous = json.load(f)
+                except (OSError, ValueError):
+                    pass
+            if previous is not None and previous.get("inputs") == paper_fingerprint(paper):
+                rows[paper.name] = _review_row(paper.name, "unchanged", previous)
+            else:
+                pending.append(paper)
+        
+        print(f"Reviewing {len(pending)} of {len(papers)} papers ({len(papers) - len(pending)} unchanged)")
+        tasks = [(str(self.workspace), str(paper)) for paper in pending]
+        for paper, review, error in run_pool(_review_paper_task, tasks, jobs=jobs, use_processes=True):
+            name = Path(paper).name
+            if error is not None:
+                rows[name] = {"paper": name, "status": "error", "error": error}
+            else:
+                rows[name] = _review_row(name, "reviewed", review)
+        
+        table = sorted(rows.values(), key=lambda row: (row.get("overall_score", -1), row["paper"]))
+        summary = {
+            "timestamp": datetime.now().isoformat(),
+            "papers_dir": str(papers_dir),
+            "papers": table
+        }
+        write_atomic(papers_dir / "review_summary.json",
+                     json.dumps(summary, indent=2, ensure_ascii=False).encode("utf-8"))
+        out = io.StringIO()
+        writer = csv.DictWriter(out, fieldnames=REVIEW_SUMMARY_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(table)
+        write_atomic(papers_dir / "review_summary.csv", out.getvalue().encode("utf-8"))
+        
+        for row in table:
+            score = f"{row['overall_score']:>4}" if "overall_score" in row else " n/a"
+            print(f"  {score}  [{row['status']}] {row['paper']}")
+        print(f"Summary: {papers_dir / 'review_summary.csv'}")
+        return table
+
+
+# review-all 汇总表的列
+REVIEW_SUMMARY_FIELDS = ["paper", "status", "overall_score", "words", "sections", "figures", "tables",
+                         "placeholders", "unresolved_refs", "unresolved_citations", "weaknesses", "error"]
+
+
+def _review_row(paper: str, status: str, review: Dict) -> Dict:
+    """审稿意见 -> 汇总表的一行"""
+    latex = review.get("latex", {})
+    return {
+        "paper": paper,
+        "status": status,
+        "overall_score": review.get("overall_score"),
+        "words": latex.get("words", 0),
+        "sections": sum(1 for title, comment in review.get("detailed_comments", {}).items()
+                        if comment.get("level", 1) <= 1 and title != "Abstract"),
+        "figures": latex.get("figures", 0),
+        "tables": latex.get("tables", 0),
+        "placeholders": len(review.get("placeholders", [])),
+        "unresolved_refs": len(review.get("unresolved_refs", [])),
+        "unresolved_citations": len(review.get("unresolved_citations", [])),
+        "weaknesses": len(review.get("weaknesses", [])),
+    }
+
+
+def _review_paper_task(task: Tuple[str, str]) -> Tuple[str, Optional[Dict], Optional[str]]:
+    """进程池任务：审阅一篇论文，返回 (论文目录, 审稿意见, 错误)"""
+    workspace, paper = task
+    try:
+        with redirect_stdout(io.StringIO()):
+            review = AcademicPaperWriter(workspace).review_paper(Path(paper))
+        return paper, review, None
+    except Exception as e:
+        return paper, None, str(e)
 
 
 def main():
@@ -702,20 +1493,153 @@ def main():
     
     if len(sys.argv) < 2:
         print("Usage:")
-        print("  python academic_paper_writer.py <project_path> [template] [type]")
+        print("  python academic_paper_writer.py <project_path> [template] [type] [options]")
+        print("  python academic_paper_writer.py batch <project_path>... [options]")
+        print("  python academic_paper_writer.py import-template <template> <kit.zip>")
+        print("  python academic_paper_writer.py prefetch-templates [template]... [--jobs n] [--force]")
+        print("  python academic_paper_writer.py review-all [papers_dir] [--jobs n] [--force]")
+        print("  python academic_paper_writer.py build <paper_dir> [--force]")
         print("")
         print("Templates: ieee, acm, aaai, cvpr, icml, neurips")
         print("Types: conference (default), journal")
         print("")
+        print("Options:")
+        print("  --exclude <glob>      Skip matching paths during analysis (repeatable, gitignore syntax)")
+        print("  --jobs <n>            Scan files with n workers (0 = all CPUs, default 1)")
+        print("  --processes           Use a process pool instead of threads for scanning")
+        print("  --max-file-size <n>   Skip source files of n bytes or more (default: no limit)")
+        print("  --link-mode <mode>    How template files enter papers: auto, reflink, hardlink, copy")
+        print("  --update <paper_dir>  Regenerate only the changed sections of an existing paper")
+        print("  --from-stage <stage>  Rerun this stage and its dependents, reuse cached outputs for the rest")
+        print("  --only-stage <stage>  Run a single stage with cached inputs")
+        print(f"                        Stages: {', '.join(WORKFLOW_STAGES)}")
+        print("  --profile             Run stages serially under cProfile, save .prof files per stage")
+        print("  --latex-engine <e>    Local PDF build: auto (default), pdflatex, latexmk, none")
+        print("")
+        print("Batch options:")
+        print("  --template <name>     Template for every project (default: ieee)")
+        print("  --type <type>         Paper type for every project (default: conference)")
+        print("  --list <file>         Read additional project paths from a file, one per line")
+        print("")
         print("Example:")
         print('  python academic_paper_writer.py "./my_project" ieee conference')
+        print('  python academic_paper_writer.py "./my_project" ieee conference --exclude "data/"')
+        print('  python academic_paper_writer.py batch ./repo_a ./repo_b --jobs 8 --template acm')
+        return
+    
+    # 解析参数
+    positional = []
+    exclude = []
+    jobs = None
+    use_processes = False
+    force = False
+    max_file_size = None
+    template = None
+    paper_type = None
+    list_file = None
+    update_dir = None
+    stage_options = {}
+    profile = False
+    
+    args = sys.argv[1:]
+    i = 0
+    while i < len(args):
+        if args[i] == '--exclude' and i + 1 < len(args):
+            exclude.append(args[i + 1])
+            i += 2
+        elif args[i] == '--jobs' and i + 1 < len(args):
+            jobs = int(args[i + 1])
+            i += 2
+        elif args[i] == '--force':
+            force = True
+            i += 1
+        elif args[i] == '--processes':
+            use_processes = True
+            i += 1
+        elif args[i] == '--profile':
+            profile = True
+            i += 1
+        elif args[i] == '--max-file-size' and i + 1 < len(args):
+            max_file_size = int(args[i + 1])
+            i += 2
+        elif args[i] == '--link-mode' and i + 1 < len(args):
+            if args[i + 1] not in LINK_MODES:
+                print(f"Unsupported link mode: {args[i + 1]}. Supported: {', '.join(LINK_MODES)}")
+                return
+            writer.link_mode = args[i + 1]
+            i += 2
+        elif args[i] == '--latex-engine' and i + 1 < len(args):
+            if args[i + 1] not in BUILD_ENGINES:
+                print(f"Unsupported LaTeX engine: {args[i + 1]}. Supported: {', '.join(BUILD_ENGINES)}")
+                return
+            writer.latex_engine = args[i + 1]
+            i += 2
+        elif args[i] == '--template' and i + 1 < len(args):
+            template = args[i + 1]
+            i += 2
+        elif args[i] == '--type' and i + 1 < len(args):
+            paper_type = args[i + 1]
+            i += 2
+        elif args[i] == '--update' and i + 1 < len(args):
+            update_dir = args[i + 1]
+            i += 2
+        elif args[i] in ('--from-stage', '--only-stage') and i + 1 < len(args):
+            if args[i + 1] not in WORKFLOW_STAGES:
+                print(f"Unknown stage: {args[i + 1]}. Stages: {', '.join(WORKFLOW_STAGES)}")
+                return
+            stage_options[args[i][2:].replace('-', '_')] = args[i + 1]
+            i += 2
+        elif args[i] == '--list' and i + 1 < len(args):
+            list_file = args[i + 1]
+            i += 2
+        else:
+            positional.append(args[i])
+            i += 1
+    
+    if positional and positional[0] == "import-template":
+        if len(positional) != 3:
+            print("Usage: python academic_paper_writer.py import-template <template> <kit.zip>")
+            return
+        writer.import_template(positional[1], positional[2])
+        return
+    
+    if positional and positional[0] == "prefetch-templates":
+        writer.prefetch_templates(positional[1:] or None,
+                                  jobs=jobs if jobs is not None else DEFAULT_FETCH_JOBS, force=force)
+        return
+    
+    if positional and positional[0] == "build":
+        if len(positional) != 2:
+            print("Usage: python academic_paper_writer.py build <paper_dir> [--force]")
+            return
+        writer.build_paper(Path(positional[1]), force=force)
+        return
+    
+    if positional and positional[0] == "review-all":
+        writer.review_all(positional[1] if len(positional) > 1 else None,
+                          jobs=jobs if jobs is not None else 0, force=force)
+        return
+    
+    if jobs is None:
+        jobs = 1
+    
+    if positional and positional[0] == "batch":
+        project_paths = positional[1:]
+        if list_file:
+            with open(list_file, 'r', encoding='utf-8') as f:
+                project_paths += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+        writer.batch_workflow(project_paths, template or "ieee", paper_type or "conference",
+                              jobs=jobs, use_processes=use_processes,
+                              exclude=exclude, max_file_size=max_file_size)
         return
     
-    project_path = sys.argv[1]
-    template = sys.argv[2] if len(sys.argv) > 2 else "ieee"
-    paper_type = sys.argv[3] if len(sys.argv) > 3 else "conference"
+    project_path = positional[0]
+    template = template or (positional[1] if len(positional) > 1 else "ieee")
+    paper_type = paper_type or (positional[2] if len(positional) > 2 else "conference")
     
-    writer.full_workflow(project_path, template, paper_type)
+    writer.full_workflow(project_path, template, paper_type, exclude=exclude,
+                         jobs=jobs, use_processes=use_processes, max_file_size=max_file_size,
+                         paper_dir=update_dir, profile=profile, **stage_options)
 
 
 if __name__ == "__main__":
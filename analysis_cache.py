@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+增量分析缓存
+以 (path, size, mtime_ns) 为键，把每个文件的分析结果（行数、语言、预览等）
+保存为工作区下的 JSON Lines 索引；重复运行时只重新读取发生变化的文件
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+from code_scanner import FileEntry
+
+
+class AnalysisCache:
+    """单个项目的文件级分析缓存"""
+
+    VERSION = 2
+
+    def __init__(self, cache_file: Union[str, Path]):
+        self.cache_file = Path(cache_file)
+        self.records: Dict[str, Dict] = {}
+        self.touched = set()
+        self.dirty = False
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    @classmethod
+    def for_project(cls, cache_dir: Union[str, Path], project_path: Union[str, Path]) -> "AnalysisCache":
+        """按项目绝对路径定位缓存文件"""
+        root = str(Path(project_path).resolve())
+        key = hashlib.sha1(root.encode("utf-8")).hexdigest()[:16]
+        return cls(Path(cache_dir) / "analysis" / f"{key}.jsonl")
+
+    def _load(self):
+        """加载索引；版本不一致或文件损坏时视为空缓存"""
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                header = json.loads(f.readline() or "{}")
+                if header.get("version") != self.VERSION:
+                    self.dirty = True
+                    return
+                for line in f:
+                    record = json.loads(line)
+                    self.records[record["path"]] = record
+        except (OSError, ValueError, KeyError):
+            self.records = {}
+
+    def get(self, entry: FileEntry) -> Optional[Dict]:
+        """
+        查询文件的缓存记录
+
+        Args:
+            entry: 扫描得到的文件条目
+
+        Returns:
+            Dict: 文件未变化时返回缓存记录，否则返回 None
+        """
+        self.touched.add(entry.rel_path)
+        record = self.records.get(entry.rel_path)
+        if record and record["size"] == entry.size and record["mtime_ns"] == entry.mtime_ns:
+            self.hits += 1
+            return record
+        self.misses += 1
+        return None
+
+    def peek(self, entry: FileEntry) -> Optional[Dict]:
+        """返回文件的旧记录（不校验 size/mtime），用于按内容哈希复用结果"""
+        return self.records.get(entry.rel_path)
+
+    def put(self, entry: FileEntry, fields: Dict):
+        """写入（合并）文件的分析结果"""
+        self.touched.add(entry.rel_path)
+        record = self.records.get(entry.rel_path)
+        if not record or record["size"] != entry.size or record["mtime_ns"] != entry.mtime_ns:
+            record = {"path": entry.rel_path, "size": entry.size, "mtime_ns": entry.mtime_ns}
+            self.records[entry.rel_path] = record
+        record.update(fields)
+        self.dirty = True
+
+    def save(self):
+        """
+        写回索引
+
+        只保留本次运行访问过的文件，已删除或被忽略的文件随之清理；
+        先写临时文件再原子替换，避免中断时留下损坏的索引
+        """
+        stale = set(self.records) - self.touched
+        if not self.dirty and not stale:
+            return
+
+        for path in stale:
+            del self.records[path]
+
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.cache_file.with_suffix(".tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({"version": self.VERSION}) + "\n")
+            for path in sorted(self.records):
+                f.write(json.dumps(self.records[path], ensure_ascii=False) + "\n")
+        os.replace(tmp_file, self.cache_file)
+        self.dirty = False
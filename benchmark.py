@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Academic Paper Writer - 性能基准
+生成可伸缩的合成项目（1k/10k/100k 个文件，混合语言、深层嵌套、大文件），
+计时 analyze_code、generate_latex、review_paper 和完整工作流，输出 JSON 结果，便于跨提交比较
+
+用法：
+    python benchmark.py [--sizes 1k,10k] [--repeat 3] [--out results.json]
+                        [--workdir dir] [--jobs n] [--compare baseline.json]
+"""
+
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import redirect_stdout
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from academic_paper_writer import AcademicPaperWriter
+
+
+# 预设规模：名称 -> 文件数
+SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000}
+
+# 合成文件的后缀及权重（大致模拟多语言项目的构成）
+LANGUAGE_MIX = [
+    (".py", 30), (".js", 12), (".ts", 10), (".java", 8), (".go", 6), (".rs", 5),
+    (".cpp", 5), (".h", 4), (".md", 6), (".json", 6), (".yaml", 4), (".txt", 4),
+]
+
+BIG_FILE_BYTES = 8 * 1024 * 1024
+DEEP_NESTING = 40
+
+# 比较结果时视为回归的耗时比例；差值小于 REGRESSION_MIN_SECONDS 的视为噪声
+REGRESSION_RATIO = 1.2
+REGRESSION_MIN_SECONDS = 0.01
+
+_WORDS = ("model", "data", "loss", "train", "graph", "cache", "tensor", "layer", "batch", "index",
+          "parser", "token", "stream", "buffer", "query", "node", "edge", "score", "vector", "state")
+
+
+def _source(suffix: str, rng: random.Random, modules: List[str], lines: int) -> str:
+    """生成一个合成源文件的内容"""
+    out = []
+    if suffix == ".py":
+        for module in rng.sample(modules, min(3, len(modules))):
+            out.append(f"import {module}\n")
+        for i in range(max(1, lines // 8)):
+            a, b = rng.choice(_WORDS), rng.choice(_WORDS)
+            out.append(f"\n\ndef {a}_{b}_{i}(x, y=None):\n    \"\"\"{a} {b}\"\"\"\n"
+                       f"    # {a}\n    value = x * {i}\n    return value + (y or 0)\n")
+    elif suffix in (".md", ".txt"):
+        for _ in range(lines):
+            out.append(" ".join(rng.choice(_WORDS) for _ in range(12)) + "\n")
+    elif suffix in (".json", ".yaml"):
+        for i in range(lines):
+            key = rng.choice(_WORDS)
+            out.append(f'"{key}_{i}": {i},\n' if suffix == ".json" else f"{key}_{i}: {i}\n")
+    else:
+        for i in range(lines):
+            if i % 10 == 0:
+                out.append(f"// {rng.choice(_WORDS)} {rng.choice(_WORDS)}\n")
+            elif i % 7 == 0:
+                out.append("\n")
+            else:
+                out.append(f"    int {rng.choice(_WORDS)}_{i} = {i};\n")
+    return "".join(out)
+
+
+def generate_synthetic_repo(root: Path, files: int, seed: int = 0) -> Dict:
+    """
+    生成合成项目
+
+    目录树按包/子包随机嵌套（1-6 层），另有一条 DEEP_NESTING 层深的目录链；
+    每 5000 个文件（至少 2 个）包含一个 BIG_FILE_BYTES 的大文件。结果只由 files 和 seed 决定，
+    相同规格的项目已存在时直接复用
+
+    Returns:
+        Dict: 规格和统计：files/bytes/seed
+    """
+    spec = {"files": files, "seed": seed, "big_file_bytes": BIG_FILE_BYTES, "deep_nesting": DEEP_NESTING}
+    marker = root / ".bench_spec.json"
+    try:
+        with open(marker, 'r', encoding='utf-8') as f:
+            existing = json.load(f)
+        if existing.get("spec") == spec:
+            return existing
+    except (OSError, ValueError):
+        pass
+
+    shutil.rmtree(root, ignore_errors=True)
+    root.mkdir(parents=True)
+    rng = random.Random(seed)
+    suffixes = [s for s, _ in LANGUAGE_MIX]
+    weights = [w for _, w in LANGUAGE_MIX]
+
+    big_files = max(2, files // 5000)
+    deep_files = min(50, files // 20)
+    regular = files - big_files - deep_files - 2
+
+    packages = [f"pkg_{i}" for i in range(max(1, regular // 200))]
+    modules = []
+    total = 0
+
+    def write(rel_path: str, text: str):
+        nonlocal total
+        path = root / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = text.encode("utf-8")
+        with open(path, 'wb') as f:
+            f.write(data)
+        total += len(data)
+
+    write("README.md", "# Synthetic Benchmark Project\n\n## Overview\n\n"
+                       "A synthetic graph neural network and data pipeline project.\n")
+    write("requirements.txt", "numpy\ntorch\n")
+
+    for i in range(regular):
+        depth = rng.randint(1, 6)
+        parts = [rng.choice(packages)] + [f"sub_{rng.randint(0, 9)}" for _ in range(depth - 1)]
+        suffix = rng.choices(suffixes, weights)[0]
+        rel_path = "/".join(parts) + f"/{rng.choice(_WORDS)}_{i}{suffix}"
+        if suffix == ".py":
+            modules.append(rel_path[:-3].replace("/", "."))
+        write(rel_path, _source(suffix, rng, modules[-50:] or ["os"], rng.randint(20, 200)))
+
+    deep = "/".join(f"level_{d}" for d in range(DEEP_NESTING))
+    for i in range(deep_files):
+        write(f"{deep}/deep_{i}.py", _source(".py", rng, modules[-50:] or ["os"], 40))
+
+    # 大文件：重复的源码块，按块写入
+    chunk = _source(".cpp", rng, modules, 200).encode("utf-8")
+    for i in range(big_files):
+        path = root / "data" / f"big_{i}.cpp"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'wb') as f:
+            written = 0
+            while written < BIG_FILE_BYTES:
+                f.write(chunk)
+                written += len(chunk)
+        total += written
+
+    info = {"spec": spec, "files": files, "bytes": total, "seed": seed}
+    with open(marker, 'w', encoding='utf-8') as f:
+        json.dump(info, f)
+    return info
+
+
+def _time(func: Callable, repeat: int, setup: Callable = None) -> Dict:
+    """多次计时，返回每次耗时及中位数/最小值；被测函数的输出不打印"""
+    runs = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        with redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            func()
+            runs.append(round(time.perf_counter() - start, 4))
+    return {"runs": runs, "median": round(statistics.median(runs), 4), "min": min(runs)}
+
+
+def run_size(name: str, workdir: Path, repeat: int = 3, jobs: int = 1, seed: int = 0) -> Dict:
+    """在一个规模的合成项目上运行所有基准"""
+    files = SIZES[name]
+    repo = workdir / f"repo_{name}"
+    start = time.perf_counter()
+    info = generate_synthetic_repo(repo, files, seed)
+    print(f"[{name}] repo ready ({info['files']} files, {info['bytes'] / 1e6:.0f} MB) "
+          f"in {time.perf_counter() - start:.1f}s")
+
+    workspace = workdir / f"workspace_{name}"
+    shutil.rmtree(workspace, ignore_errors=True)
+    workspace.mkdir(parents=True)
+    writer = AcademicPaperWriter(str(workspace))
+
+    def clear_cache():
+        shutil.rmtree(writer.cache_dir, ignore_errors=True)
+
+    def analyze():
+        return writer.analyze_code(str(repo), jobs=jobs)
+
+    results = {}
+    results["analyze_code_cold"] = _time(analyze, repeat, setup=clear_cache)
+    results["analyze_code_warm"] = _time(analyze, repeat)
+
+    with redirect_stdout(io.StringIO()):
+        analysis = analyze()
+        outline = writer.design_outline(analysis, "conference")
+        template_dir = writer.download_template("ieee")
+    results["generate_latex"] = _time(
+        lambda: writer.generate_latex(outline, template_dir, writer.output_dir), repeat)
+
+    with redirect_stdout(io.StringIO()):
+        paper_dir = writer.generate_latex(outline, template_dir, writer.output_dir)
+    results["review_paper"] = _time(lambda: writer.review_paper(paper_dir), repeat)
+
+    # 完整工作流：每次清空阶段缓存和分析缓存，测量从零开始的运行
+    results["full_workflow"] = _time(lambda: writer.full_workflow(str(repo), "ieee", jobs=jobs),
+                                     repeat, setup=clear_cache)
+
+    for key, value in results.items():
+        print(f"[{name}] {key:<18} median {value['median']:.3f}s  min {value['min']:.3f}s")
+    return {"size": name, "files": info["files"], "bytes": info["bytes"], "benchmarks": results}
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=Path(__file__).parent,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(results: Dict, baseline: Dict) -> List[Dict]:
+    """
+    与基准结果比较中位数
+
+    Returns:
+        List[Dict]: 每个基准的 size/benchmark/baseline/current/ratio/regression
+    """
+    old = {(r["size"], key): value["median"]
+           for r in baseline.get("results", []) for key, value in r["benchmarks"].items()}
+    rows = []
+    for result in results["results"]:
+        for key, value in result["benchmarks"].items():
+            before = old.get((result["size"], key))
+            if not before:
+                continue
+            ratio = value["median"] / before
+            rows.append({"size": result["size"], "benchmark": key, "baseline": before,
+                         "current": value["median"], "ratio": round(ratio, 3),
+                         "regression": ratio > REGRESSION_RATIO
+                                       and value["median"] - before >= REGRESSION_MIN_SECONDS})
+    return rows
+
+
+def main():
+    sizes = ["1k"]
+    repeat = 3
+    jobs = 1
+    out_file = None
+    compare_file = None
+    workdir = Path(".bench")
+
+    args = sys.argv[1:]
+    i = 0
+    while i < len(args):
+        if args[i] == '--sizes' and i + 1 < len(args):
+            sizes = [s.strip() for s in args[i + 1].split(",") if s.strip()]
+            i += 2
+        elif args[i] == '--repeat' and i + 1 < len(args):
+            repeat = max(1, int(args[i + 1]))
+            i += 2
+        elif args[i] == '--jobs' and i + 1 < len(args):
+            jobs = int(args[i + 1])
+            i += 2
+        elif args[i] == '--out' and i + 1 < len(args):
+            out_file = args[i + 1]
+            i += 2
+        elif args[i] == '--compare' and i + 1 < len(args):
+            compare_file = args[i + 1]
+            i += 2
+        elif args[i] == '--workdir' and i + 1 < len(args):
+            workdir = Path(args[i + 1])
+            i += 2
+        else:
+            print(f"Unknown argument: {args[i]}")
+            print(__doc__)
+            return
+    unknown = [s for s in sizes if s not in SIZES]
+    if unknown:
+        print(f"Unknown sizes: {', '.join(unknown)}. Sizes: {', '.join(SIZES)}")
+        return
+
+    results = {
+        "benchmark": "Academic Paper Writer",
+        "timestamp": datetime.now().isoformat(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "repeat": repeat,
+        "jobs": jobs,
+        "results": [run_size(name, workdir, repeat, jobs) for name in sizes],
+    }
+
+    out_file = Path(out_file) if out_file else workdir / f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    out_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(out_file, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"\nResults saved to: {out_file}")
+
+    if compare_file:
+        with open(compare_file, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"\nCompared with {compare_file} (commit {baseline.get('commit')}):")
+        for row in compare(results, baseline):
+            flag = "  REGRESSION" if row["regression"] else ""
+            print(f"  [{row['size']}] {row['benchmark']:<18} {row['baseline']:.3f}s -> "
+                  f"{row['current']:.3f}s  x{row['ratio']:.2f}{flag}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+BibTeX 索引
+逐行流式解析 .bib 文件，建立 键 -> 条目 的索引，检查重复的键和缺失的必填字段；
+索引按文件内容哈希缓存在工作区，文件未变化时再次审稿不需要重新解析
+"""
+
+import json
+import re
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from template_store import sha256_file, write_atomic
+
+
+# 各条目类型的必填字段，"a|b" 表示任一即可（year|date 兼容 biblatex）
+REQUIRED_FIELDS = {
+    "article": ("author", "title", "journal|journaltitle", "year|date"),
+    "book": ("author|editor", "title", "publisher", "year|date"),
+    "inbook": ("author|editor", "title", "chapter|pages", "publisher", "year|date"),
+    "booklet": ("title",),
+    "inproceedings": ("author", "title", "booktitle", "year|date"),
+    "conference": ("author", "title", "booktitle", "year|date"),
+    "incollection": ("author", "title", "booktitle", "publisher", "year|date"),
+    "manual": ("title",),
+    "mastersthesis": ("author", "title", "school|institution", "year|date"),
+    "phdthesis": ("author", "title", "school|institution", "year|date"),
+    "proceedings": ("title", "year|date"),
+    "techreport": ("author", "title", "institution", "year|date"),
+    "unpublished": ("author", "title", "note"),
+    "online": ("title", "url|doi|eprint"),
+}
+
+_ENTRY_START = re.compile(r"@\s*(\w+)\s*([{(])")
+_FIELD_NAME = re.compile(r"\s*([A-Za-z][\w\-:.+]*)\s*=\s*")
+_BARE_VALUE = re.compile(r"[^\s,#{}\"]+")
+_BRACE = re.compile(r"\\.|[{}]")
+_QUOTE = re.compile(r"\\.|[{}\"]")
+_SPACE = re.compile(r"\s*")
+
+# 内置的月份缩写宏
+_MONTHS = {m: m.capitalize() for m in ("jan", "feb", "mar", "apr", "may", "jun",
+                                        "jul", "aug", "sep", "oct", "nov", "dec")}
+
+
+def iter_blocks(lines: Iterable[str]) -> Iterator[Tuple[int, str]]:
+    """
+    从行流中切出 @type{...} 块，不需要把整个文件读入内存
+
+    Yields:
+        (起始行号, 块文本)
+    """
+    buffer: List[str] = []
+    start_line = 0
+    depth = 0
+    closer = "}"
+    for lineno, line in enumerate(lines, 1):
+        while line:
+            if not buffer:
+                match = _ENTRY_START.search(line)
+                if match is None:
+                    break
+                line = line[match.start():]
+                start_line = lineno
+                closer = "}" if match.group(2) == "{" else ")"
+                depth = 0
+            opener = "{" if closer == "}" else "("
+            # 大多数行不会结束当前块，只用 count 计数
+            delta = line.count(opener) - line.count(closer)
+            if closer == "}":
+                delta += line.count("\\}") - line.count("\\{")
+            if closer not in line or (depth + delta > 0 and "@" not in line):
+                buffer.append(line)
+                depth += delta
+                break
+            # 块可能在本行结束：逐字符找到结束位置，剩余部分可能是下一个块
+            end = None
+            i = 0
+            while i < len(line):
+                c = line[i]
+                if c == "\\" and closer == "}":
+                    i += 2
+                    continue
+                if c == opener:
+                    depth += 1
+                elif c == closer:
+                    depth -= 1
+                    if depth == 0:
+                        end = i + 1
+                        break
+                i += 1
+            if end is None:
+                buffer.append(line)
+                break
+            buffer.append(line[:end])
+            yield start_line, "".join(buffer)
+            buffer = []
+            line = line[end:]
+    if buffer:
+        yield start_line, "".join(buffer)
+
+
+def _balanced(text: str, pos: int, pattern: re.Pattern, closing: str) -> int:
+    """pos 为开头字符之后的位置，返回对应结束字符之后的位置"""
+    depth = 0
+    for match in pattern.finditer(text, pos):
+        token = match.group()
+        if token == "{":
+            depth += 1
+        elif token == "}":
+            if depth == 0 and closing == "}":
+                return match.end()
+            depth -= 1
+        elif token == closing and depth == 0:
+            return match.end()
+    raise ValueError("Unbalanced value")
+
+
+def _parse_value(text: str, pos: int, macros: Dict[str, str]) -> Tuple[str, int]:
+    """解析字段值（含 # 拼接），返回 (值, 结束位置)"""
+    parts = []
+    while True:
+        pos = _SPACE.match(text, pos).end()
+        if pos >= len(text):
+            raise ValueError("Missing value")
+        c = text[pos]
+        if c == "{":
+            end = _balanced(text, pos + 1, _BRACE, "}")
+            parts.append(text[pos + 1:end - 1])
+        elif c == '"':
+            end = _balanced(text, pos + 1, _QUOTE, '"')
+            parts.append(text[pos + 1:end - 1])
+        else:
+            match = _BARE_VALUE.match(text, pos)
+            if match is None:
+                raise ValueError(f"Unexpected character {c!r}")
+            end = match.end()
+            word = match.group()
+            parts.append(macros.get(word.lower(), word))
+        pos = _SPACE.match(text, end).end()
+        if pos < len(text) and text[pos] == "#":
+            pos += 1
+            continue
+        return "".join(parts), pos
+
+
+def parse_block(block: str, macros: Dict[str, str]) -> Optional[Dict]:
+    """
+    解析一个 @type{key, field = value, ...} 块
+
+    Returns:
+        Dict: {"type", "key", "fields"}；@string 定义的宏写入 macros，@comment/@preamble 返回 None
+    """
+    match = _ENTRY_START.match(block)
+    entry_type = match.group(1).lower()
+    body = block[match.end():].rstrip()
+    body = body[:-1] if body.endswith(("}", ")")) else body
+    if entry_type in ("comment", "preamble"):
+        return None
+
+    pos = 0
+    key = None
+    if entry_type != "string":
+        comma = body.find(",")
+        key = (body if comma < 0 else body[:comma]).strip()
+        if not key:
+            raise ValueError("Missing entry key")
+        pos = len(body) if comma < 0 else comma + 1
+
+    fields = {}
+    while pos < len(body):
+        field = _FIELD_NAME.match(body, pos)
+        if field is None:
+            if body[pos:].strip(" \t\r\n,"):
+                raise ValueError(f"Cannot parse field near {body[pos:pos + 30]!r}")
+            break
+        value, pos = _parse_value(body, field.end(), macros)
+        fields[field.group(1).lower()] = " ".join(value.split())
+        pos = _SPACE.match(body, pos).end()
+        if pos < len(body) and body[pos] == ",":
+            pos += 1
+
+    if entry_type == "string":
+        for name, value in fields.items():
+            macros[name] = value
+        return None
+    return {"type": entry_type, "key": key, "fields": fields}
+
+
+def missing_fields(entry: Dict) -> List[str]:
+    """条目缺少的必填字段"""
+    required = REQUIRED_FIELDS.get(entry["type"], ())
+    fields = entry["fields"]
+    return [names for names in required
+            if not any(fields.get(name) for name in names.split("|"))]
+
+
+class BibIndex:
+    """一个 .bib 文件的索引"""
+
+    VERSION = 1
+
+    def __init__(self, entries: Dict[str, Dict] = None, duplicates: List[Dict] = None,
+                 errors: List[Dict] = None, sha256: str = None):
+        self.entries = entries or {}             # 键 -> {"type", "line", "fields"}
+        self.duplicates = duplicates or []       # {"key", "line", "first_line"}
+        self.errors = errors or []               # {"line", "error"}
+        self.sha256 = sha256
+        self._lower = {key.lower(): key for key in self.entries}
+
+    @classmethod
+    def parse(cls, lines: Iterable[str], sha256: str = None) -> "BibIndex":
+        """从行流建立索引"""
+        macros = dict(_MONTHS)
+        entries: Dict[str, Dict] = {}
+        seen: Dict[str, str] = {}
+        duplicates = []
+        errors = []
+        for line, block in iter_blocks(lines):
+            try:
+                entry = parse_block(block, macros)
+            except ValueError as e:
+                errors.append({"line": line, "error": str(e)})
+                continue
+            if entry is None:
+                continue
+            key = entry.pop("key")
+            # BibTeX 的键不区分大小写
+            first = seen.get(key.lower())
+            if first is not None:
+                duplicates.append({"key": key, "line": line, "first_line": entries[first]["line"]})
+                continue
+            seen[key.lower()] = key
+            entry["line"] = line
+            entries[key] = entry
+        return cls(entries, duplicates, errors, sha256)
+
+    def resolve(self, key: str) -> Optional[str]:
+        """引用键对应的条目键（不区分大小写），不存在时返回 None"""
+        return key if key in self.entries else self._lower.get(key.lower())
+
+    def keys(self) -> List[str]:
+        return list(self.entries)
+
+    def incomplete(self) -> List[Dict]:
+        """缺少必填字段的条目：{"key", "type", "line", "missing"}"""
+        result = []
+        for key, entry in self.entries.items():
+            missing = missing_fields(entry)
+            if missing:
+                result.append({"key": key, "type": entry["type"], "line": entry["line"], "missing": missing})
+        return result
+
+    def check_citations(self, cited: Iterable[str]) -> Dict[str, List[str]]:
+        """
+        与正文的引用键交叉检查
+
+        Returns:
+            Dict: {"unresolved": 正文引用但索引中没有的键, "uncited": 索引中从未被引用的键}
+        """
+        cited = set(cited)
+        resolved = {self.resolve(key) for key in cited}
+        return {
+            "unresolved": sorted(key for key in cited if key != "*" and self.resolve(key) is None),
+            "uncited": [] if "*" in cited else sorted(key for key in self.entries if key not in resolved),
+        }
+
+    def to_dict(self) -> Dict:
+        return {"version": self.VERSION, "sha256": self.sha256, "entries": self.entries,
+                "duplicates": self.duplicates, "errors": self.errors}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "BibIndex":
+        return cls(data["entries"], data["duplicates"], data["errors"], data["sha256"])
+
+
+def load_bib_index(bib_file: Union[str, Path], cache_dir: Union[str, Path] = None) -> BibIndex:
+    """
+    加载 .bib 文件的索引
+
+    Args:
+        bib_file: .bib 文件
+        cache_dir: 索引缓存目录（<sha256>.json），为空时不缓存
+
+    Returns:
+        BibIndex: 索引；文件不存在时为空索引
+    """
+    bib_file = Path(bib_file)
+    try:
+        digest = sha256_file(bib_file)
+    except OSError:
+        return BibIndex()
+
+    cache_file = Path(cache_dir) / f"{digest}.json" if cache_dir else None
+    if cache_file is not None:
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == BibIndex.VERSION:
+                return BibIndex.from_dict(data)
+        except (OSError, ValueError, KeyError):
+            pass
+
+    with open(bib_file, 'r', encoding='utf-8', errors='replace') as f:
+        index = BibIndex.parse(f, digest)
+    if cache_file is not None:
+        write_atomic(cache_file, json.dumps(index.to_dict(), ensure_ascii=False).encode("utf-8"))
+    return index
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+项目文件扫描器
+使用 os.scandir 对项目目录做一次遍历，记录每个文件的名称、后缀、大小和修改时间，
+analyze_code 的各个阶段共享同一份快照，避免重复遍历和重复 stat
+
+遍历时按 .gitignore / .git/info/exclude 规则和自定义排除模式剪枝，
+被忽略的目录不会被进入
+"""
+
+import os
+import re
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterable, List, NamedTuple, Optional, Sequence, Union
+
+
+# 默认排除：版本控制、虚拟环境、依赖、缓存和构建产物、数据集
+DEFAULT_EXCLUDES = [
+    ".git/", ".hg/", ".svn/",
+    ".venv/", "venv/", "node_modules/",
+    "__pycache__/", ".mypy_cache/", ".pytest_cache/", ".ruff_cache/",
+    ".tox/", ".nox/", ".ipynb_checkpoints/", ".idea/", ".vscode/",
+    "build/", "dist/", "*.egg-info/",
+    "dataset/", "datasets/",
+]
+
+
+class IgnorePattern(NamedTuple):
+    """一条编译后的 gitignore 规则"""
+    regex: "re.Pattern"
+    negate: bool
+    dir_only: bool
+
+
+def _glob_to_regex(glob: str) -> str:
+    """把 gitignore 风格的 glob 转换为正则（不含锚点）"""
+    out = []
+    i, n = 0, len(glob)
+    while i < n:
+        c = glob[i]
+        if glob.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif glob.startswith("/**", i) and i + 3 == n:
+            out.append("/.*")
+            i += 3
+        elif glob.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif c == "*":
+            out.append("[^/]*")
+            i += 1
+        elif c == "?":
+            out.append("[^/]")
+            i += 1
+        elif c == "[":
+            j = glob.find("]", i + 2)
+            if j == -1:
+                out.append(re.escape(c))
+                i += 1
+            else:
+                body = glob[i + 1:j]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append("[" + body.replace("\\", "\\\\") + "]")
+                i = j + 1
+        elif c == "\\" and i + 1 < n:
+            out.append(re.escape(glob[i + 1]))
+            i += 2
+        else:
+            out.append(re.escape(c))
+            i += 1
+    return "".join(out)
+
+
+def compile_ignore_pattern(line: str, base: str = "") -> Optional[IgnorePattern]:
+    """
+    编译一行 gitignore 规则
+
+    Args:
+        line: 规则文本
+        base: 规则文件所在目录（相对项目根目录），根目录为 ""
+
+    Returns:
+        IgnorePattern: 编译结果；空行和注释返回 None
+    """
+    line = line.rstrip("\n").rstrip("\r")
+    if not line.endswith("\\ "):
+        line = line.rstrip(" ")
+    if not line or line.startswith("#"):
+        return None
+
+    negate = line.startswith("!")
+    if negate:
+        line = line[1:]
+    elif line.startswith("\\!") or line.startswith("\\#"):
+        line = line[1:]
+
+    dir_only = line.endswith("/")
+    line = line.rstrip("/")
+    if not line:
+        return None
+
+    # 含有斜杠的规则相对于规则文件所在目录；否则匹配任意层级的名称
+    anchored = "/" in line
+    line = line.lstrip("/")
+    prefix = re.escape(base + "/") if base else ""
+    if anchored:
+        regex = f"^{prefix}{_glob_to_regex(line)}$"
+    else:
+        regex = f"^{prefix}(?:.*/)?{_glob_to_regex(line)}$"
+
+    return IgnorePattern(re.compile(regex), negate, dir_only)
+
+
+def parse_ignore_lines(lines: Iterable[str], base: str = "") -> List[IgnorePattern]:
+    """编译多行规则，跳过空行和注释"""
+    patterns = []
+    for line in lines:
+        pattern = compile_ignore_pattern(line, base)
+        if pattern is not None:
+            patterns.append(pattern)
+    return patterns
+
+
+class IgnoreRules:
+    """
+    遍历剪枝规则
+
+    优先级（从低到高）：默认排除 → .git/info/exclude → 各级 .gitignore → 自定义排除模式；
+    与 git 一致，同一层级内后出现的规则覆盖先出现的规则，被排除的目录不再进入
+    """
+
+    def __init__(self, root: Union[str, Path], exclude: List[str] = None,
+                 use_gitignore: bool = True, use_defaults: bool = True):
+        self.root = Path(root)
+        self.use_gitignore = use_gitignore
+
+        self.base_rules = parse_ignore_lines(DEFAULT_EXCLUDES) if use_defaults else []
+        if use_gitignore:
+            self.base_rules += self._read_rules(self.root / ".git" / "info" / "exclude", "")
+        self.override_rules = parse_ignore_lines(exclude or [])
+
+    def _read_rules(self, path: Path, base: str) -> List[IgnorePattern]:
+        """读取规则文件，不存在时返回空列表"""
+        try:
+            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                return parse_ignore_lines(f, base)
+        except OSError:
+            return []
+
+    def rules_for_dir(self, dir_path: str, rel_dir: str,
+                      parent_rules: List[IgnorePattern]) -> List[IgnorePattern]:
+        """叠加目录下 .gitignore 的规则；没有新规则时直接复用父目录的列表"""
+        if not self.use_gitignore:
+            return parent_rules
+        own = self._read_rules(Path(dir_path) / ".gitignore", rel_dir)
+        return parent_rules + own if own else parent_rules
+
+    def is_ignored(self, rel_path: str, is_dir: bool, rules: List[IgnorePattern]) -> bool:
+        """按最后匹配的规则判断路径是否被忽略"""
+        for group in (self.override_rules, rules):
+            for pattern in reversed(group):
+                if pattern.dir_only and not is_dir:
+                    continue
+                if pattern.regex.match(rel_path):
+                    return not pattern.negate
+        return False
+
+
+class FileEntry(NamedTuple):
+    """单个文件的快照信息"""
+    path: str        # 绝对路径
+    rel_path: str    # 相对项目根目录的 POSIX 路径
+    name: str
+    suffix: str      # 小写后缀，如 ".py"
+    size: int
+    mtime_ns: int
+
+
+class ProjectSnapshot:
+    """项目目录的一次性快照"""
+
+    def __init__(self, root: Path, files: List[FileEntry], dirs: List[str],
+                 pruned: List[str] = None):
+        self.root = root
+        self.files = files
+        self.dirs = dirs  # 目录的相对路径
+        self.pruned = pruned or []  # 被剪枝（未进入）的目录
+
+    def names(self) -> List[str]:
+        """所有条目（文件和目录）的小写名称"""
+        names = [d.rsplit("/", 1)[-1].lower() for d in self.dirs]
+        names.extend(f.name.lower() for f in self.files)
+        return names
+
+    def top_level_files(self) -> List[FileEntry]:
+        """项目根目录下的文件"""
+        return [f for f in self.files if "/" not in f.rel_path]
+
+    def files_with_suffix(self, *suffixes: str) -> List[FileEntry]:
+        """按后缀筛选文件"""
+        return [f for f in self.files if f.suffix in suffixes]
+
+
+def scan_project(root: Union[str, Path], ignore_rules: IgnoreRules = None) -> ProjectSnapshot:
+    """
+    遍历项目目录，每个文件只 stat 一次
+
+    目录按名称排序后深度优先遍历，保证结果顺序稳定；不跟随目录符号链接，避免循环
+
+    Args:
+        root: 项目根目录
+        ignore_rules: 剪枝规则，默认使用 IgnoreRules(root)
+
+    Returns:
+        ProjectSnapshot: 项目快照
+    """
+    root = Path(root)
+    if ignore_rules is None:
+        ignore_rules = IgnoreRules(root)
+
+    files: List[FileEntry] = []
+    dirs: List[str] = []
+    pruned: List[str] = []
+
+    stack = [(str(root), "", ignore_rules.base_rules)]
+    while stack:
+        dir_path, rel_dir, parent_rules = stack.pop()
+        try:
+            with os.scandir(dir_path) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
+
+        rules = parent_rules
+        if any(e.name == ".gitignore" for e in entries):
+            rules = ignore_rules.rules_for_dir(dir_path, rel_dir, parent_rules)
+
+        subdirs = []
+        for entry in entries:
+            rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if ignore_rules.is_ignored(rel_path, True, rules):
+                        pruned.append(rel_path)
+                        continue
+                    dirs.append(rel_path)
+                    subdirs.append((entry.path, rel_path, rules))
+                elif ignore_rules.is_ignored(rel_path, False, rules):
+                    continue
+                elif entry.is_file():
+                    st = entry.stat()
+                    files.append(FileEntry(
+                        path=entry.path,
+                        rel_path=rel_path,
+                        name=entry.name,
+                        suffix=os.path.splitext(entry.name)[1].lower(),
+                        size=st.st_size,
+                        mtime_ns=st.st_mtime_ns
+                    ))
+            except OSError:
+                continue
+
+        # 逆序入栈，使子目录按名称顺序出栈
+        stack.extend(reversed(subdirs))
+
+    return ProjectSnapshot(root, files, dirs, pruned)
+
+
+# 行数统计的读缓冲大小
+LINE_COUNT_BUFFER = 64 * 1024
+
+
+def count_lines(path: str) -> Optional[int]:
+    """
+    统计文件行数，读取失败时返回 None
+
+    以二进制方式分块读入固定缓冲区并统计换行符，不解码、不为每行分配字符串，
+    内存占用与文件大小无关；最后一行没有换行符时同样计为一行（与 readlines 一致）
+    """
+    buf = bytearray(LINE_COUNT_BUFFER)
+    view = memoryview(buf)
+    lines = 0
+    last = b""
+    try:
+        with open(path, 'rb', buffering=0) as f:
+            while True:
+                n = f.readinto(view)
+                if not n:
+                    break
+                chunk = buf if n == len(buf) else buf[:n]
+                lines += chunk.count(b"\n")
+                last = chunk[-1:]
+    except OSError:
+        return None
+
+    if last and last != b"\n":
+        lines += 1
+    return lines
+
+
+def resolve_jobs(jobs: int) -> int:
+    """jobs <= 0 表示使用全部 CPU"""
+    if jobs is None or jobs <= 0:
+        return os.cpu_count() or 1
+    return jobs
+
+
+def create_executor(jobs: int = 1, use_processes: bool = False) -> Optional[Executor]:
+    """
+    创建可在多次分析之间共享的执行器
+
+    Returns:
+        Executor: jobs 解析后为 1 时返回 None（串行）
+    """
+    jobs = resolve_jobs(jobs)
+    if jobs <= 1:
+        return None
+    if use_processes:
+        return ProcessPoolExecutor(max_workers=jobs)
+    return ThreadPoolExecutor(max_workers=jobs)
+
+
+def run_pool(func: Callable, items: Sequence, jobs: int = 1, use_processes: bool = False,
+             executor: Executor = None) -> List:
+    """
+    把 func 映射到 items 上，结果顺序与输入一致
+
+    线程池适合 I/O 密集的文件读取；进程池适合 CPU 密集的解析，此时 func 必须是模块级函数
+
+    Args:
+        func: 处理单个元素的函数
+        items: 待处理元素
+        jobs: 并发数，1 为串行，<= 0 为 CPU 核数
+        use_processes: 是否使用进程池
+        executor: 复用已有的执行器（忽略 jobs 和 use_processes）
+
+    Returns:
+        List: 与 items 一一对应的结果
+    """
+    if executor is not None:
+        # chunksize 只对进程池生效，线程池会忽略
+        return list(executor.map(func, items, chunksize=max(1, len(items) // 64)))
+
+    jobs = resolve_jobs(jobs)
+    if jobs <= 1 or len(items) < 2:
+        return [func(item) for item in items]
+
+    if use_processes:
+        chunksize = max(1, len(items) // (jobs * 4))
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            return list(pool.map(func, items, chunksize=chunksize))
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(func, items))
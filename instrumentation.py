@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+工作流阶段计量
+记录每个阶段的墙钟时间、CPU 时间、读取字节数和峰值内存，可选地为每个阶段保存 cProfile 数据；
+结果写入 workflow_report.json，并追加到工作区的 trace 文件，便于跨运行比较性能回归
+
+进程级计数（CPU 时间、读取字节数、峰值 RSS）在并发执行的阶段之间会重叠；
+需要精确归因时使用 profile 模式，此时各阶段串行执行
+"""
+
+import cProfile
+import sys
+import json
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Union
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def io_read_bytes() -> Optional[int]:
+    """进程累计通过 read 系统调用读取的字节数（Linux /proc/self/io 的 rchar），不可用时返回 None"""
+    try:
+        with open("/proc/self/io", 'r') as f:
+            for line in f:
+                if line.startswith("rchar:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """进程的峰值常驻内存，不可用时返回 None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 为单位，macOS 以字节为单位
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class StageProfiler:
+    """按阶段收集计量数据"""
+
+    def __init__(self, profile_dir: Union[str, Path] = None):
+        """
+        Args:
+            profile_dir: 提供时为每个阶段保存 <stage>.prof（cProfile/pstats 格式），
+                         并用 tracemalloc 统计各阶段的 Python 内存峰值
+        """
+        self.profile_dir = Path(profile_dir) if profile_dir else None
+        self.stages: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        self._io_start = io_read_bytes()
+        if self.profile_dir is not None:
+            self.profile_dir.mkdir(parents=True, exist_ok=True)
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+
+    def run(self, name: str, func: Callable[[], Any]) -> Any:
+        """执行 func 并记录为阶段 name 的数据"""
+        io_start = io_read_bytes()
+        cpu_start = time.process_time()
+        thread_cpu_start = time.thread_time()
+        start = time.perf_counter()
+        profile = None
+        if self.profile_dir is not None:
+            tracemalloc.reset_peak()
+            profile = cProfile.Profile()
+            profile.enable()
+        try:
+            return func()
+        finally:
+            if profile is not None:
+                profile.disable()
+            io_end = io_read_bytes()
+            metrics = {
+                "wall_seconds": round(time.perf_counter() - start, 4),
+                "cpu_seconds": round(time.process_time() - cpu_start, 4),
+                "thread_cpu_seconds": round(time.thread_time() - thread_cpu_start, 4),
+                "bytes_read": io_end - io_start if io_start is not None and io_end is not None else None,
+                "peak_rss_bytes": peak_rss_bytes(),
+            }
+            if profile is not None:
+                metrics["peak_traced_bytes"] = tracemalloc.get_traced_memory()[1]
+                profile_file = self.profile_dir / f"{name}.prof"
+                profile.dump_stats(str(profile_file))
+                metrics["profile"] = str(profile_file)
+            self.record(name, **metrics)
+
+    def record(self, name: str, **values):
+        """合并阶段的计量数据（如分析阶段扫描的文件数）"""
+        with self._lock:
+            self.stages.setdefault(name, {}).update(values)
+
+    def summary(self) -> Dict:
+        """汇总：各阶段数据和整个运行的总计"""
+        io_end = io_read_bytes()
+        return {
+            "stages": dict(self.stages),
+            "total": {
+                "wall_seconds": round(time.perf_counter() - self._start, 4),
+                "cpu_seconds": round(time.process_time() - self._cpu_start, 4),
+                "bytes_read": io_end - self._io_start if self._io_start is not None and io_end is not None else None,
+                "peak_rss_bytes": peak_rss_bytes(),
+            },
+        }
+
+    def close(self):
+        """profile 模式下停止 tracemalloc"""
+        if self.profile_dir is not None and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+def append_trace(trace_file: Union[str, Path], record: Dict):
+    """向 trace 文件（JSON Lines）追加一条运行记录"""
+    trace_file = Path(trace_file)
+    trace_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(trace_file, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def format_summary(summary: Dict) -> str:
+    """阶段计量的文本表格"""
+    lines = [f"  {'stage':<10} {'wall(s)':>9} {'cpu(s)':>9} {'read(MB)':>10} {'rss(MB)':>9}"]
+
+    def row(name: str, m: Dict) -> str:
+        read = f"{m['bytes_read'] / 1e6:.1f}" if m.get("bytes_read") is not None else "-"
+        rss = f"{m['peak_rss_bytes'] / 1e6:.0f}" if m.get("peak_rss_bytes") is not None else "-"
+        return (f"  {name:<10} {m.get('wall_seconds', 0):>9.3f} {m.get('cpu_seconds', 0):>9.3f} "
+                f"{read:>10} {rss:>9}")
+
+    for name, metrics in summary["stages"].items():
+        lines.append(row(name, metrics))
+    lines.append(row("total", summary["total"]))
+    return "\n".join(lines)
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+关键文件发现与预览
+
+发现：按打包配置声明的入口、__main__ 入口、导入中心度、文件名和大小为源文件打分，
+候选文件流经固定大小的 top-k 堆，额外内存只有 k 个条目
+
+预览：只读取预览所需的字符预算，而不是把整个文件读入内存再截断；
+可选的智能模式会提取 README 的核心章节或源码的模块文档和类/函数签名
+"""
+
+import heapq
+import re
+from typing import Iterable, List, Set
+
+from code_scanner import FileEntry, ProjectSnapshot
+from python_model import module_name
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    tomllib = None
+
+
+# 智能预览最多读取的字符数，超大文件只看开头部分
+SMART_WINDOW = 64 * 1024
+
+# README 中优先保留的章节
+PREFERRED_SECTIONS = (
+    "overview", "introduction", "abstract", "about", "summary", "description",
+    "features", "method", "approach", "architecture", "results",
+)
+
+_BADGE_LINE = re.compile(r"^\s*(\[!\[|!\[|<img\b|<p\s+align|<a\s+href=.*<img)", re.IGNORECASE)
+_HTML_COMMENT = re.compile(r"<!--.*?-->", re.DOTALL)
+_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_DOCSTRING = re.compile(r'\A(?:\s*#[^\n]*\n|\s*\n)*\s*[rRuU]?("""|\'\'\')(.*?)\1', re.DOTALL)
+_SIGNATURE = re.compile(r"^(?: {4}|\t)?(?:async\s+def|def|class)\s+\w+[^\n]*", re.MULTILINE)
+
+
+def read_preview(path: str, max_chars: int) -> str:
+    """
+    读取文件开头最多 max_chars 个字符
+
+    文本模式下 read(n) 按块解码、读够 n 个字符即停止，不会读取整个文件；
+    UTF-8 多字节字符跨块时由解码器正确拼接，换行符与 read() 一样统一为 \\n
+    """
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        return f.read(max_chars)
+
+
+def readme_preview(path: str, max_chars: int) -> str:
+    """
+    README 的智能预览：去掉徽章、图片和 HTML 注释，保留标题、导语和核心章节
+
+    找不到核心章节时退化为清理后的开头文本
+    """
+    text = _HTML_COMMENT.sub("", read_preview(path, SMART_WINDOW))
+    lines = [line for line in text.split("\n") if not _BADGE_LINE.match(line)]
+
+    # 按标题切分章节：[(标题, [行])]，第一个元素是首个标题之前的内容
+    sections: List[tuple] = [("", [])]
+    for line in lines:
+        match = _HEADING.match(line)
+        if match:
+            sections.append((match.group(2), [line]))
+        else:
+            sections[-1][1].append(line)
+
+    # 标题 + 导语（第一个章节），再加上优先章节
+    kept = [sections[0][1]]
+    if len(sections) > 1:
+        kept.append(sections[1][1])
+    for title, body in sections[2:]:
+        if any(key in title.lower() for key in PREFERRED_SECTIONS):
+            kept.append(body)
+
+    preview = "\n\n".join("\n".join(body).strip() for body in kept if "".join(body).strip())
+    if not preview:
+        preview = "\n".join(lines).strip()
+    return preview[:max_chars]
+
+
+def source_preview(path: str, max_chars: int) -> str:
+    """
+    Python 源码的智能预览：模块文档字符串 + 顶层和类内的 class/def 签名行
+
+    两者都没有时退化为普通预览
+    """
+    text = read_preview(path, SMART_WINDOW)
+
+    parts = []
+    match = _DOCSTRING.match(text)
+    if match:
+        parts.append(match.group(2).strip())
+
+    # 保留一层缩进，类方法显示在所属类下方
+    signatures = [sig.rstrip() for sig in _SIGNATURE.findall(text)]
+    if signatures:
+        parts.append("\n".join(signatures))
+
+    if not parts:
+        return text[:max_chars]
+    return "\n\n".join(parts)[:max_chars]
+
+
+# 打分权重
+SCORE_DECLARED_ENTRY = 10.0   # setup.py / setup.cfg / pyproject.toml 中声明的脚本入口
+SCORE_MAIN_GUARD = 4.0        # if __name__ == "__main__" 或 __main__.py
+SCORE_NAME_HINT = 3.0         # 文件名包含 main / train
+SCORE_PER_IMPORTER = 0.5      # 每个导入该模块的项目内模块
+MAX_IMPORTER_SCORE = 5.0
+MAX_SIZE_SCORE = 2.0          # 每 10KB 加 1 分
+PENALTY_TEST = 5.0            # 测试文件
+
+
+NAME_HINTS = ("main", "train")
+
+# 打包配置中 "name = package.module:function" 形式的入口
+_ENTRY_SPEC = re.compile(r"""["']?[\w.-]+["']?\s*=\s*["']?([A-Za-z_][\w.]*)\s*:\s*[A-Za-z_][\w.]*""")
+
+
+def _entry_modules_from_text(text: str) -> Set[str]:
+    """从任意配置文本中提取 module:function 入口的模块名"""
+    return set(_ENTRY_SPEC.findall(text))
+
+
+def declared_entry_modules(snapshot: ProjectSnapshot) -> Set[str]:
+    """
+    读取项目根目录打包配置中声明的脚本入口模块
+
+    支持 pyproject.toml 的 [project.scripts] / [project.gui-scripts] / Poetry scripts，
+    以及 setup.py / setup.cfg 中的 console_scripts
+
+    Returns:
+        Set[str]: 模块名，如 {"mypkg.cli"}
+    """
+    modules: Set[str] = set()
+    for entry in snapshot.top_level_files():
+        if entry.name not in ("pyproject.toml", "setup.py", "setup.cfg"):
+            continue
+        try:
+            text = read_preview(entry.path, SMART_WINDOW)
+        except OSError:
+            continue
+
+        if entry.name == "pyproject.toml" and tomllib is not None:
+            try:
+                data = tomllib.loads(text)
+            except ValueError:
+                data = {}
+            project = data.get("project", {})
+            poetry = data.get("tool", {}).get("poetry", {})
+            for table in (project.get("scripts", {}), project.get("gui-scripts", {}),
+                          poetry.get("scripts", {})):
+                for spec in table.values():
+                    if isinstance(spec, str) and ":" in spec:
+                        modules.add(spec.split(":", 1)[0].strip())
+        else:
+            modules |= _entry_modules_from_text(text)
+    return modules
+
+
+def _is_test_file(entry: FileEntry) -> bool:
+    parts = entry.rel_path.lower().split("/")
+    return (entry.name.startswith("test_") or entry.name.endswith("_test.py")
+            or any(p in ("test", "tests", "testing") for p in parts[:-1]))
+
+
+def score_source_file(entry: FileEntry, declared: Set[str], python_model=None,
+                      in_degree=None) -> float:
+    """
+    计算源文件作为关键文件的得分
+
+    Args:
+        entry: 文件条目
+        declared: 打包配置声明的入口模块名
+        python_model: PythonProjectModel，可选
+        in_degree: python_model.in_degree() 的结果，可选
+    """
+    score = 0.0
+    name = module_name(entry.rel_path)
+    if name in declared or (name.startswith("src.") and name[4:] in declared):
+        score += SCORE_DECLARED_ENTRY
+
+    summary = python_model.summaries.get(entry.rel_path) if python_model else None
+    if entry.name == "__main__.py" or (summary and summary["main_guard"]):
+        score += SCORE_MAIN_GUARD
+
+    lower = entry.name.lower()
+    if any(hint in lower for hint in NAME_HINTS):
+        score += SCORE_NAME_HINT
+
+    if in_degree:
+        score += min(in_degree.get(entry.rel_path, 0) * SCORE_PER_IMPORTER, MAX_IMPORTER_SCORE)
+
+    score += min(entry.size / 10000, MAX_SIZE_SCORE)
+
+    if _is_test_file(entry):
+        score -= PENALTY_TEST
+    return score
+
+
+def rank_key_sources(candidates: Iterable[FileEntry], declared: Set[str], python_model=None,
+                     k: int = 3, min_score: float = SCORE_NAME_HINT) -> List[FileEntry]:
+    """
+    流式选出得分最高的 k 个源文件
+
+    只维护大小为 k 的最小堆；每个候选都会打分，结果是精确的前 k 个
+    （任何候选都可能因导入中心度和大小超过已入堆的文件，不存在可提前结束的上界）
+
+    Args:
+        candidates: 候选文件（按快照顺序）
+        declared: 打包配置声明的入口模块名
+        python_model: PythonProjectModel，可选
+        k: 返回的文件数
+        min_score: 入选所需的最低得分，默认要求至少具备一个强信号
+
+    Returns:
+        List[FileEntry]: 按得分从高到低排序；同分时路径层级浅、顺序靠前的优先
+    """
+    in_degree = python_model.in_degree() if python_model else None
+    heap: List[tuple] = []
+
+    for index, entry in enumerate(candidates):
+        score = score_source_file(entry, declared, python_model, in_degree)
+        if score < min_score:
+            continue
+        item = (score, -entry.rel_path.count("/"), -index, entry)
+        if len(heap) < k:
+            heapq.heappush(heap, item)
+        elif item[:3] > heap[0][:3]:
+            heapq.heapreplace(heap, item)
+
+    return [item[3] for item in sorted(heap, key=lambda x: x[:3], reverse=True)]
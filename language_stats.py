@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+多语言代码行统计
+把源文件的每一行分类为代码行、注释行或空行，支持 Python、C/C++、CUDA、Java、
+JavaScript/TypeScript、Rust、Go 和 Jupyter Notebook；可通过 register_language 扩展
+
+每种语言的字符串和注释被编译成一个组合正则，每块文本一次 finditer 完成切分，
+而不是逐字符扫描；源文件按块读取，跨块的注释和字符串与下一块拼接后继续；
+Notebook 按单元格流式解析，不会一次性把整个 JSON 载入内存
+"""
+
+import json
+import re
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from code_scanner import count_lines
+
+
+# 超过该大小的文件不做分类，只用 count_lines 统计行数（全部计为代码行），超大的生成文件不值得逐行分类
+CLASSIFY_MAX_BYTES = 16 * 1024 * 1024
+
+# 分类时每次读取的字符数
+CLASSIFY_CHUNK = 1024 * 1024
+
+# Notebook 流式解析的读块大小
+NOTEBOOK_CHUNK = 64 * 1024
+
+
+class LanguageSpec(NamedTuple):
+    """语言的注释和字符串语法"""
+    name: str
+    suffixes: Tuple[str, ...]
+    line_comments: Tuple[str, ...] = ()
+    block_comments: Tuple[Tuple[str, str], ...] = ()
+    strings: Tuple[str, ...] = ()          # 字符串字面量的正则片段
+    docstrings: bool = False               # 独占一行开头的三引号字符串计为注释（Python）
+
+
+_DQ = r'"(?:[^"\\\n]|\\.)*"'
+_SQ = r"'(?:[^'\\\n]|\\.)*'"
+_TRIPLE_DQ = r'"""(?:[^\\]|\\.)*?(?:"""|\Z)'
+_TRIPLE_SQ = r"'''(?:[^\\]|\\.)*?(?:'''|\Z)"
+_BACKTICK = r"`(?:[^`\\]|\\.)*`"
+_C_BLOCK = (("/*", "*/"),)
+
+LANGUAGES: Dict[str, LanguageSpec] = {}
+LANGUAGE_BY_SUFFIX: Dict[str, str] = {}
+_TOKENIZERS: Dict[str, "re.Pattern"] = {}
+# 分块统计用的变体：未结束的字符串也匹配到块末尾，由调用方留给下一块
+_OPEN_TOKENIZERS: Dict[str, "re.Pattern"] = {}
+
+
+def _open_ended(pattern: str) -> str:
+    """字符串正则片段以字面量结束符结尾：把结束符改为 结束符或文本末尾"""
+    if pattern.endswith("\\Z)"):
+        return pattern
+    return f"{pattern[:-1]}(?:{pattern[-1]}|\\Z)"
+
+
+def _build_tokenizer(spec: LanguageSpec, open_ended: bool = False) -> "re.Pattern":
+    """
+    把语言的字符串和注释语法编译为一个组合正则
+
+    字符串分支在前，匹配到的分组序号小于 len(spec.strings) 即为字符串，否则为注释；
+    开头的前瞻字符集让正则引擎快速跳过不可能开始字符串或注释的位置
+    """
+    strings = [_open_ended(pattern) for pattern in spec.strings] if open_ended else spec.strings
+    parts = [f"({pattern})" for pattern in strings]
+    for start, end in spec.block_comments:
+        parts.append(f"({re.escape(start)}.*?(?:{re.escape(end)}|\\Z))")
+    for marker in spec.line_comments:
+        parts.append(f"({re.escape(marker)}[^\\n]*)")
+    if not parts:
+        return re.compile(r"(?!x)x")
+
+    # 字符串正则片段都以字面量字符开头
+    first_chars = {pattern[0] for pattern in spec.strings}
+    first_chars |= {start[0] for start, _ in spec.block_comments}
+    first_chars |= {marker[0] for marker in spec.line_comments}
+    lookahead = "".join(re.escape(c) for c in sorted(first_chars))
+    return re.compile(f"(?=[{lookahead}])(?:{'|'.join(parts)})", re.DOTALL)
+
+
+def register_language(spec: LanguageSpec):
+    """注册（或覆盖）一种语言"""
+    LANGUAGES[spec.name] = spec
+    for suffix in spec.suffixes:
+        LANGUAGE_BY_SUFFIX[suffix] = spec.name
+    _TOKENIZERS[spec.name] = _build_tokenizer(spec)
+    _OPEN_TOKENIZERS[spec.name] = _build_tokenizer(spec, open_ended=True)
+
+
+for _spec in (
+    LanguageSpec("Python", (".py", ".pyi"), ("#",), (), (_TRIPLE_DQ, _TRIPLE_SQ, _DQ, _SQ), docstrings=True),
+    LanguageSpec("C", (".c",), ("//",), _C_BLOCK, (_DQ, _SQ)),
+    LanguageSpec("C++", (".cpp", ".cc", ".cxx", ".c++"), ("//",), _C_BLOCK, (_DQ, _SQ)),
+    LanguageSpec("C/C++ Header", (".h", ".hpp", ".hh", ".hxx"), ("//",), _C_BLOCK, (_DQ, _SQ)),
+    LanguageSpec("CUDA", (".cu", ".cuh"), ("//",), _C_BLOCK, (_DQ, _SQ)),
+    LanguageSpec("Java", (".java",), ("//",), _C_BLOCK, (_DQ, _SQ)),
+    LanguageSpec("JavaScript", (".js", ".jsx", ".mjs", ".cjs"), ("//",), _C_BLOCK, (_BACKTICK, _DQ, _SQ)),
+    LanguageSpec("TypeScript", (".ts", ".tsx"), ("//",), _C_BLOCK, (_BACKTICK, _DQ, _SQ)),
+    LanguageSpec("Rust", (".rs",), ("//",), _C_BLOCK, (_DQ,)),
+    LanguageSpec("Go", (".go",), ("//",), _C_BLOCK, (r"`[^`]*`", _DQ, _SQ)),
+    LanguageSpec("Jupyter Notebook", (".ipynb",)),
+):
+    register_language(_spec)
+
+
+def classify_text(text: str, language: str) -> Tuple[int, int, int]:
+    """
+    统计文本的代码行、注释行和空行
+
+    同时含有代码和注释的行计为代码行；多行字符串的每一行计为代码行，
+    Python 中独占一行开头的三引号字符串（文档字符串）计为注释行
+
+    Args:
+        text: 文件内容（换行符未转换，\\r 视为空白）
+        language: LANGUAGES 中的语言名
+
+    Returns:
+        Tuple[int, int, int]: (code, comment, blank)
+    """
+    return _classify(text, language, final=True)[:3]
+
+
+def _classify(text: str, language: str, final: bool) -> Tuple[int, int, int, int]:
+    """
+    classify_text 的分块版本
+
+    final 为 False 时 text 之后还有内容：只统计到最后一个安全的行边界为止，
+    即完整的行中、不被跨越边界的字符串或注释截断的部分；其余部分由调用方与下一块拼接后再统计。
+    此时使用 _OPEN_TOKENIZERS：在块末尾仍未结束的字符串会匹配到末尾，从而被识别为跨越边界，
+    不会因为匹配失败而把字符串内部的内容当作代码或注释
+
+    Returns:
+        Tuple[int, int, int, int]: (code, comment, blank, 已统计的字符数)
+    """
+    if not text:
+        return 0, 0, 0, 0
+
+    spec = LANGUAGES[language]
+    tokenizer = _TOKENIZERS[language] if final else _OPEN_TOKENIZERS[language]
+    n_strings = len(spec.strings)
+
+    if final:
+        cut = len(text)
+        total = text.count("\n") + (0 if text.endswith("\n") else 1)
+    else:
+        cut = text.rfind("\n") + 1
+        if cut == 0:
+            return 0, 0, 0, 0
+        total = text.count("\n", 0, cut)
+    flags = bytearray(total + 1)  # bit 1: 代码，bit 2: 注释
+
+    def mark_code(start: int, end: int, line: int):
+        for offset, piece in enumerate(text[start:end].split("\n")):
+            if piece.strip():
+                flags[line + offset] |= 1
+
+    pos = 0
+    line = 0
+    safe = 0  # 最近一个不在字符串或注释内部的行首
+    for match in tokenizer.finditer(text):
+        start, end = match.start(), match.end()
+        if not final:
+            newline = text.rfind("\n", pos, start)
+            if newline >= 0:
+                safe = newline + 1
+            if end >= cut:
+                # 跨越（或可能跨越）切分点的字符串/注释：从它之前最近的安全行首开始留给下一块
+                if start < cut:
+                    cut = safe
+                    total = text.count("\n", 0, cut)
+                break
+        index = match.lastindex - 1
+        is_comment = index >= n_strings
+
+        # Python 文档字符串：行首（允许字符串前缀）开始的三引号字符串
+        if not is_comment and spec.docstrings and text.startswith(('"""', "'''"), start):
+            line_start = text.rfind("\n", 0, start) + 1
+            prefix = text[line_start:start].strip()
+            if not prefix or (len(prefix) <= 2 and prefix.isalpha()):
+                if line_start >= pos:
+                    start = line_start
+                    is_comment = True
+
+        mark_code(pos, start, line)
+        line += text.count("\n", pos, start)
+
+        span = text.count("\n", start, end)
+        bit = 2 if is_comment else 1
+        for offset in range(span + 1):
+            flags[line + offset] |= bit
+        line += span
+        pos = end
+
+    if cut > pos:
+        mark_code(pos, cut, line)
+
+    # 在 C 层面批量计数：1/3 为代码行，2 为纯注释行
+    flags = flags[:total]
+    code = flags.count(1) + flags.count(3)
+    comment = flags.count(2)
+    return code, comment, total - code - comment, cut
+
+
+def classify_file(path: str, language: str) -> Tuple[int, int, int]:
+    """
+    分块读取并统计文件，内存占用取决于块大小而不是文件大小
+
+    每块补齐到行尾，只统计到安全的行边界，剩余部分（跨块的块注释或多行字符串）
+    与下一块拼接后继续，结果与整体读入后调用 classify_text 相同
+    """
+    code = comment = blank = 0
+    buf = ""
+    chunk_size = CLASSIFY_CHUNK
+    # newline='' 保留原始换行符，与按字节解码的 classify_text 输入一致
+    with open(path, 'r', encoding='utf-8', errors='ignore', newline='') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if chunk and not chunk.endswith("\n"):
+                # 块以完整的行结束：未结束的字符串只可能因为跨行而到达块末尾
+                chunk += f.readline()
+            buf += chunk
+            c, m, b, consumed = _classify(buf, language, final=not chunk)
+            code += c
+            comment += m
+            blank += b
+            if not chunk:
+                return code, comment, blank
+            buf = buf[consumed:]
+            # 无法切分（如跨越整个缓冲区的块注释）时按倍增的块大小继续读取，避免平方复杂度
+            chunk_size = CLASSIFY_CHUNK if consumed else max(chunk_size, len(buf)) * 2
+
+
+_CELLS_KEY = re.compile(r'"cells"\s*:\s*\[')
+
+
+def iter_notebook_cells(path: str) -> Iterator[Dict]:
+    """
+    流式读取 Notebook 的单元格
+
+    定位 "cells" 数组后用 raw_decode 逐个解码单元格对象，已解码的部分随即丢弃，
+    内存占用取决于最大的单元格（含输出），而不是整个文件
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        buf = ""
+        while True:
+            match = _CELLS_KEY.search(buf)
+            if match:
+                buf = buf[match.end():]
+                break
+            chunk = f.read(NOTEBOOK_CHUNK)
+            if not chunk:
+                return
+            # 保留末尾几个字符，防止键名跨块
+            buf = buf[-16:] + chunk
+
+        pos = 0
+        chunk_size = NOTEBOOK_CHUNK
+        eof = False
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buf) and buf[pos] == "]":
+                return
+            if pos < len(buf):
+                try:
+                    cell, pos = decoder.raw_decode(buf, pos)
+                except ValueError:
+                    cell = None
+                if cell is not None:
+                    if isinstance(cell, dict):
+                        yield cell
+                    buf = buf[pos:]
+                    pos = 0
+                    continue
+            if eof:
+                return
+            # 单元格不完整：按倍增的块大小继续读取，避免反复重试造成平方复杂度
+            chunk = f.read(max(chunk_size, len(buf)))
+            if not chunk:
+                eof = True
+            buf += chunk
+            chunk_size *= 2
+
+
+def notebook_line_stats(path: str) -> Dict:
+    """统计 Notebook：代码单元格按 Python 分类，Markdown 单元格的非空行计为注释行"""
+    code = comment = blank = 0
+    for cell in iter_notebook_cells(path):
+        source = cell.get("source", cell.get("input", ""))
+        if isinstance(source, list):
+            source = "".join(source)
+        if not isinstance(source, str):
+            continue
+        cell_type = cell.get("cell_type")
+        if cell_type == "code":
+            c, m, b = classify_text(source, "Python")
+        elif cell_type == "markdown":
+            lines = source.split("\n")
+            if source.endswith("\n"):
+                lines.pop()
+            b = sum(1 for line in lines if not line.strip())
+            c, m = 0, len(lines) - b
+        else:
+            continue
+        code += c
+        comment += m
+        blank += b
+    return {"lines": code + comment + blank, "code": code, "comment": comment, "blank": blank}
+
+
+def file_line_stats(task: Tuple[str, str, int]) -> Optional[Dict]:
+    """
+    统计单个文件（可在进程池中运行）
+
+    Args:
+        task: (文件路径, 小写后缀, 文件大小)
+
+    Returns:
+        Dict: lines/code/comment/blank；读取失败时返回 None
+    """
+    path, suffix, size = task
+    language = LANGUAGE_BY_SUFFIX.get(suffix)
+    if language is None:
+        return None
+
+    try:
+        if language == "Jupyter Notebook":
+            return notebook_line_stats(path)
+
+        if size > CLASSIFY_MAX_BYTES:
+            lines = count_lines(path)
+            if lines is None:
+                return None
+            return {"lines": lines, "code": lines, "comment": 0, "blank": 0}
+
+        code, comment, blank = classify_file(path, language)
+    except OSError:
+        return None
+    return {"lines": code + comment + blank, "code": code, "comment": comment, "blank": blank}
+
+
+def summarize_languages(per_file: List[Tuple[str, Dict]]) -> Dict[str, Dict]:
+    """
+    按语言汇总
+
+    Args:
+        per_file: [(语言名, file_line_stats 结果)]
+
+    Returns:
+        Dict: 语言名 -> {"files", "code", "comment", "blank"}，按代码行数降序
+    """
+    totals: Dict[str, Dict] = {}
+    for language, stats in per_file:
+        entry = totals.setdefault(language, {"files": 0, "code": 0, "comment": 0, "blank": 0})
+        entry["files"] += 1
+        entry["code"] += stats["code"]
+        entry["comment"] += stats["comment"]
+        entry["blank"] += stats["blank"]
+    return dict(sorted(totals.items(), key=lambda item: (-item[1]["code"], item[0])))
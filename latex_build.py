@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+本地 LaTeX 编译
+在推送到 Overleaf 之前于本地编译论文，尽早发现错误：
+- 每篇论文一个持久的编译目录，.aux/.bbl 在多次编译之间保留，通常只需一遍编译
+- 论文输入（.tex/.bib/图片等）未变化时直接复用上次的结果
+- 参考文献的引用和 .bib 未变化时不运行 bibtex
+- 导言区预编译为格式文件（.fmt），编译时跳过加载宏包。格式文件按 导言区 + 论文目录中的 .cls/.sty +
+  引擎版本 的哈希命名，可放在模板仓库中由同一模板生成的所有论文共享；
+  主文件中的 \\csname endofdump\\endcsname（mylatexformat 的约定）之前的部分进入格式文件，
+  之后的导言区（标题、作者、hyperref 等）仍在每次编译时处理
+
+有 pdflatex 时由本模块驱动各遍编译；也可指定 latexmk。都不可用时返回 unavailable，不视为错误
+"""
+
+import hashlib
+import json
+import os
+import re
+import secrets
+import shutil
+import subprocess
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from latex_review import REVIEW_INPUT_SUFFIXES, paper_fingerprint
+from template_store import sha256_file, write_atomic
+
+
+BUILD_ENGINES = ("auto", "pdflatex", "latexmk", "none")
+
+# 编译读取的文件类型（审稿输入加上图片）
+BUILD_INPUT_SUFFIXES = REVIEW_INPUT_SUFFIXES + (".png", ".jpg", ".jpeg", ".pdf", ".eps")
+
+# 单次编译最多的 pdflatex 遍数
+MAX_PASSES = 4
+
+# 单个命令的超时（秒）
+BUILD_TIMEOUT = 300
+
+_BEGIN_DOCUMENT = "\\begin{document}"
+# 格式文件的截止标记：之前的导言区转储进格式文件；未加载 mylatexformat 时展开为 \relax，不影响普通编译
+DUMP_MARKER = "\\csname endofdump\\endcsname"
+# 没有标记时导言区在第一个 \title/\author/\date 之前截止：这些命令每篇论文不同，不能进入共享的格式文件
+_PAPER_METADATA = re.compile(r"\\(?:title|author|date)\b")
+_RERUN = re.compile(r"Rerun to get|Label\(s\) may have changed|Please rerun")
+_FILE_LINE_ERROR = re.compile(r"^(\S[^:\n]*\.\w+):(\d+): (.+)$", re.M)
+_ERROR = re.compile(r"^! (.+)$", re.M)
+_ERROR_LINE = re.compile(r"^l\.(\d+)", re.M)
+_WARNING = re.compile(r"^(?:LaTeX|Package \S+|Class \S+) Warning", re.M)
+_BIB_AUX = re.compile(r"^\\(?:citation|bibdata|bibstyle)\{[^\n]*\}$", re.M)
+
+
+def split_preamble(text: str) -> Optional[Dict[str, str]]:
+    """
+    把主文件拆为转储进格式文件的导言区和其余部分
+
+    导言区中有 DUMP_MARKER 时在标记处拆分，否则在第一个 \\title/\\author/\\date
+    （都没有时在 \\begin{document}）处拆分
+
+    Returns:
+        Dict: {"preamble", "body"}；没有 \\begin{document} 时返回 None
+    """
+    begin = text.find(_BEGIN_DOCUMENT)
+    if begin < 0:
+        return None
+    marker = text.find(DUMP_MARKER, 0, begin)
+    if marker >= 0:
+        return {"preamble": text[:marker], "body": text[marker + len(DUMP_MARKER):]}
+    metadata = _PAPER_METADATA.search(text, 0, begin)
+    end = metadata.start() if metadata else begin
+    return {"preamble": text[:end], "body": text[end:]}
+
+
+@lru_cache(maxsize=None)
+def engine_version(tool: str) -> str:
+    """编译器版本（格式文件只能被生成它的同一版本加载）"""
+    try:
+        result = subprocess.run([tool, "--version"], stdin=subprocess.DEVNULL, capture_output=True,
+                                text=True, timeout=30)
+    except (OSError, subprocess.SubprocessError):
+        return ""
+    return result.stdout.split("\n", 1)[0].strip()
+
+
+def format_key(preamble: str, paper_dir: Union[str, Path], tool: str = "pdflatex") -> str:
+    """格式文件的哈希：导言区、论文目录中的 .cls/.sty（模板包自带的类和宏包）和引擎版本"""
+    digest = hashlib.sha1(preamble.encode("utf-8"))
+    digest.update(engine_version(tool).encode("utf-8"))
+    paper_dir = Path(paper_dir)
+    for path in sorted(paper_dir.glob("*.cls")) + sorted(paper_dir.glob("*.sty")):
+        digest.update(f"{path.name}:{_file_hash(path)}".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def parse_log(log: str) -> Dict:
+    """
+    从编译日志中提取错误、警告数量和是否需要再编译一遍
+
+    Returns:
+        Dict: {"errors": [{"file", "line", "message"}], "warnings": int, "rerun": bool}
+    """
+    errors = [{"file": m.group(1), "line": int(m.group(2)), "message": m.group(3).strip()}
+              for m in _FILE_LINE_ERROR.finditer(log)]
+    if not errors:
+        # 没有 -file-line-error 格式时的经典格式：! 消息 ... l.行号
+        for match in _ERROR.finditer(log):
+            line = _ERROR_LINE.search(log, match.end(), match.end() + 2000)
+            errors.append({"file": None, "line": int(line.group(1)) if line else None,
+                           "message": match.group(1).strip()})
+    return {"errors": errors, "warnings": len(_WARNING.findall(log)), "rerun": bool(_RERUN.search(log))}
+
+
+def _read(path: Path) -> str:
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            return f.read()
+    except OSError:
+        return ""
+
+
+def _file_hash(path: Path) -> Optional[str]:
+    try:
+        return sha256_file(path)
+    except OSError:
+        return None
+
+
+class LatexBuilder:
+    """编译单篇论文"""
+
+    def __init__(self, build_dir: Union[str, Path], engine: str = "auto", use_format: bool = True,
+                 format_dir: Union[str, Path] = None, timeout: float = BUILD_TIMEOUT):
+        """
+        Args:
+            build_dir: 持久的编译目录（.aux/.bbl/.log/.pdf）
+            engine: auto/pdflatex/latexmk/none
+            use_format: 把导言区预编译为 .fmt（仅 pdflatex 驱动）
+            format_dir: 格式文件目录，默认在编译目录中
+            timeout: 单个命令的超时（秒）
+        """
+        if engine not in BUILD_ENGINES:
+            raise ValueError(f"Unsupported LaTeX engine: {engine}. Supported: {', '.join(BUILD_ENGINES)}")
+        self.build_dir = Path(build_dir)
+        self.engine = engine
+        self.use_format = use_format
+        self.format_dir = Path(format_dir) if format_dir else self.build_dir
+        self.timeout = timeout
+        self.state_file = self.build_dir / "build_state.json"
+        self.passes: List[Dict] = []
+
+    def resolve_engine(self) -> Optional[str]:
+        """实际使用的编译方式，不可用时返回 None"""
+        if self.engine == "none":
+            return None
+        if self.engine in ("auto", "pdflatex") and shutil.which("pdflatex"):
+            return "pdflatex"
+        if self.engine in ("auto", "latexmk") and shutil.which("latexmk"):
+            return "latexmk"
+        return None
+
+    def _env(self, paper_dir: Path) -> Dict[str, str]:
+        """让 TeX 在论文目录中查找 .cls/.sty/.bst/.bib；末尾的分隔符保留系统默认路径"""
+        env = dict(os.environ)
+        for name in ("TEXINPUTS", "BIBINPUTS", "BSTINPUTS"):
+            env[name] = str(paper_dir) + os.pathsep + env.get(name, "")
+        env["TEXFORMATS"] = str(self.format_dir) + os.pathsep + env.get("TEXFORMATS", "")
+        return env
+
+    def _run(self, tool: str, args: List[str], cwd: Path, env: Dict[str, str]) -> int:
+        """运行一个编译命令，记录耗时；超时视为失败"""
+        start = time.perf_counter()
+        try:
+            result = subprocess.run([tool] + args, cwd=cwd, env=env, stdin=subprocess.DEVNULL,
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                    timeout=self.timeout)
+            code = result.returncode
+        except subprocess.TimeoutExpired:
+            code = -1
+        self.passes.append({"tool": tool, "seconds": round(time.perf_counter() - start, 3), "returncode": code})
+        return code
+
+    def load_state(self) -> Dict:
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def build(self, paper_dir: Union[str, Path], main: str = "main.tex", force: bool = False) -> Dict:
+        """
+        编译论文
+
+        Args:
+            paper_dir: 论文目录（\\input 路径相对于它解析）
+            main: 主文件
+            force: 忽略上次的结果重新编译
+
+        Returns:
+            Dict: status(ok/failed/up-to-date/unavailable)/engine/seconds/passes/format/pdf/errors/warnings
+        """
+        start = time.perf_counter()
+        paper_dir = Path(paper_dir)
+        self.passes = []
+        engine = self.resolve_engine()
+        if engine is None:
+            return {"status": "unavailable", "engine": self.engine,
+                    "reason": "no pdflatex/latexmk on PATH" if self.engine != "none" else "disabled"}
+
+        self.build_dir.mkdir(parents=True, exist_ok=True)
+        jobname = Path(main).stem
+        pdf = self.build_dir / f"{jobname}.pdf"
+        fingerprint = paper_fingerprint(paper_dir, BUILD_INPUT_SUFFIXES, exclude=(f"{jobname}.pdf",))
+        config = {"engine": engine, "format": self.use_format, "main": main}
+        state = self.load_state()
+        if (not force and state.get("fingerprint") == fingerprint and state.get("config") == config
+                and state.get("status") == "ok" and pdf.exists()):
+            return {"status": "up-to-date", "engine": engine, "seconds": round(time.perf_counter() - start, 3),
+                    "passes": [], "pdf": str(pdf), "errors": [], "warnings": state.get("warnings", 0)}
+
+        # \include 会在输出目录的对应子目录中写 .aux，需要先建好
+        for current, dirs, _ in os.walk(paper_dir):
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            for name in dirs:
+                (self.build_dir / Path(current, name).relative_to(paper_dir)).mkdir(parents=True, exist_ok=True)
+
+        env = self._env(paper_dir)
+        result = {"engine": engine}
+        if engine == "latexmk":
+            code = self._run("latexmk", ["-pdf", "-interaction=nonstopmode", "-halt-on-error", "-file-line-error",
+                                         f"-outdir={self.build_dir}", main], paper_dir, env)
+        else:
+            code, format_info, bib_key = self._build_pdflatex(paper_dir, main, jobname, env, state)
+            result["format"] = format_info
+            state["bib_key"] = bib_key
+
+        log = parse_log(_read(self.build_dir / f"{jobname}.log"))
+        ok = code == 0 and pdf.exists()
+        result.update({
+            "status": "ok" if ok else "failed",
+            "seconds": round(time.perf_counter() - start, 3),
+            "passes": self.passes,
+            "pdf": str(pdf) if ok else None,
+            "errors": log["errors"] if not ok or log["errors"] else [],
+            "warnings": log["warnings"],
+        })
+        if not ok and not result["errors"]:
+            result["errors"] = [{"file": None, "line": None,
+                                 "message": "timed out" if code == -1 else f"exit code {code}"}]
+
+        state.update({"fingerprint": fingerprint, "config": config, "status": result["status"],
+                      "warnings": log["warnings"]})
+        write_atomic(self.state_file, json.dumps(state, indent=1).encode("utf-8"))
+        return result
+
+    def _build_pdflatex(self, paper_dir: Path, main: str, jobname: str, env: Dict[str, str],
+                        state: Dict):
+        """
+        pdflatex 驱动：必要时预编译导言区，编译一遍，按需运行 bibtex，再按日志提示补编译
+
+        Returns:
+            (返回码, 格式文件信息, 参考文献状态键)
+        """
+        source = paper_dir / main
+        format_info = None
+        format_name = None
+        if self.use_format:
+            parts = split_preamble(_read(source))
+            if parts is not None:
+                format_info = self.prepare_format(parts["preamble"], paper_dir, env)
+                if format_info["status"] in ("built", "cached"):
+                    format_name = format_info["name"]
+                    # 格式文件之后的部分单独成文件，之前的导言区由格式文件提供
+                    source = self.build_dir / f"{jobname}.body.tex"
+                    body = parts["body"]
+                    if _read(source) != body:
+                        write_atomic(source, body.encode("utf-8"))
+
+        args = ["-interaction=nonstopmode", "-halt-on-error", "-file-line-error",
+                f"-output-directory={self.build_dir}", f"-jobname={jobname}"]
+        if format_name:
+            args.append(f"-fmt={format_name}")
+        args.append(str(source))
+
+        def compile_once() -> int:
+            return self._run("pdflatex", args, paper_dir, env)
+
+        code = compile_once()
+        bib_key = state.get("bib_key")
+        if code != 0:
+            return code, format_info, bib_key
+
+        # 引用、参考文献样式和 .bib 内容都未变化时沿用已有的 .bbl
+        aux = _read(self.build_dir / f"{jobname}.aux")
+        bbl = self.build_dir / f"{jobname}.bbl"
+        bib_lines = _BIB_AUX.findall(aux)
+        rerun = parse_log(_read(self.build_dir / f"{jobname}.log"))["rerun"]
+        if any(line.startswith("\\bibdata") for line in bib_lines):
+            bib_files = []
+            for line in bib_lines:
+                if line.startswith("\\bibdata"):
+                    for name in line[len("\\bibdata{"):-1].split(","):
+                        name = name.strip()
+                        bib_files.append(name if name.endswith(".bib") else name + ".bib")
+            digest = hashlib.sha1("\n".join(sorted(bib_lines)).encode("utf-8"))
+            for name in bib_files:
+                digest.update(f"{name}:{_file_hash(paper_dir / name)}".encode("utf-8"))
+            if digest.hexdigest() != bib_key or not bbl.exists():
+                before = _file_hash(bbl)
+                self._run("bibtex", [jobname], self.build_dir, env)
+                bib_key = digest.hexdigest()
+                rerun = rerun or _file_hash(bbl) != before
+
+        passes = 1
+        while rerun and passes < MAX_PASSES:
+            code = compile_once()
+            passes += 1
+            if code != 0:
+                break
+            rerun = parse_log(_read(self.build_dir / f"{jobname}.log"))["rerun"]
+        return code, format_info, bib_key
+
+    def prepare_format(self, preamble: str, paper_dir: Path, env: Dict[str, str]) -> Dict:
+        """
+        把导言区预编译为格式文件 preamble-<哈希>.fmt
+
+        导言区无法转储（如某些宏包不支持）时记录失败标记，之后不再重试，直接按普通方式编译
+
+        Returns:
+            Dict: {"name", "status": built/cached/failed, "seconds"}
+        """
+        start = time.perf_counter()
+        name = f"preamble-{format_key(preamble, paper_dir)}"
+        fmt = self.format_dir / f"{name}.fmt"
+        failed = self.format_dir / f"{name}.failed"
+        if fmt.exists():
+            return {"name": name, "status": "cached", "seconds": 0.0}
+        if failed.exists():
+            return {"name": name, "status": "failed", "seconds": 0.0}
+
+        # 在私有临时目录中生成，完成后 rename 到位：多篇论文并发编译时不会读到写了一半的格式文件
+        work = self.format_dir / f".{name}.{secrets.token_hex(4)}"
+        work.mkdir(parents=True)
+        try:
+            source = work / f"{name}.tex"
+            write_atomic(source, (preamble + "\n\\dump\n").encode("utf-8"))
+            code = self._run("pdflatex", ["-ini", "-interaction=nonstopmode", "-halt-on-error",
+                                          f"-output-directory={work}", f"-jobname={name}",
+                                          "&pdflatex", str(source)], paper_dir, env)
+            if code != 0 or not (work / f"{name}.fmt").exists():
+                write_atomic(failed, _read(work / f"{name}.log").encode("utf-8"))
+                return {"name": name, "status": "failed", "seconds": round(time.perf_counter() - start, 3)}
+            os.replace(work / f"{name}.fmt", fmt)
+        finally:
+            shutil.rmtree(work, ignore_errors=True)
+        return {"name": name, "status": "built", "seconds": round(time.perf_counter() - start, 3)}
+
+    def precompile(self, paper_dir: Union[str, Path], main: str = "main.tex") -> Optional[Dict]:
+        """
+        只预编译主文件的导言区（如模板准备完成后），不编译正文
+
+        Returns:
+            Dict: prepare_format 的结果；没有 pdflatex 或未启用格式文件时返回 None
+        """
+        paper_dir = Path(paper_dir)
+        if not self.use_format or self.resolve_engine() != "pdflatex":
+            return None
+        parts = split_preamble(_read(paper_dir / main))
+        if parts is None:
+            return None
+        return self.prepare_format(parts["preamble"], paper_dir, self._env(paper_dir))
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+LaTeX 片段模板
+模板只解析一次，编译为渲染函数；渲染时把各部分追加到一个列表，最后 ''.join 成完整文本，
+调用方一次写入文件
+
+语法（与 LaTeX 的花括号不冲突）：
+    \\VAR{name}              插入变量，默认做 LaTeX 转义；\\VAR{name|raw} 原样插入
+    \\BLOCK{for x in items}  循环，\\BLOCK{endfor} 结束
+    \\BLOCK{if name}         条件（真值判断），\\BLOCK{endif} 结束
+BLOCK 标签后紧跟的换行会被去掉，独占一行的控制标签不会在输出中留下空行
+"""
+
+import hashlib
+import json
+import re
+from typing import Callable, Dict, List, Optional
+
+
+# LaTeX 特殊字符，一次 translate 完成转义
+_LATEX_ESCAPES = str.maketrans({
+    "\\": r"\textbackslash{}",
+    "{": r"\{",
+    "}": r"\}",
+    "$": r"\$",
+    "&": r"\&",
+    "#": r"\#",
+    "^": r"\textasciicircum{}",
+    "_": r"\_",
+    "%": r"\%",
+    "~": r"\textasciitilde{}",
+})
+
+
+def latex_escape(text) -> str:
+    """转义 LaTeX 特殊字符"""
+    return str(text).translate(_LATEX_ESCAPES)
+
+
+_TAG = re.compile(r"\\VAR\{([^}]*)\}|\\BLOCK\{([^}]*)\}\n?")
+_FOR = re.compile(r"for\s+(\w+)\s+in\s+([\w.]+)$")
+_IF = re.compile(r"if\s+([\w.]+)$")
+
+# 渲染节点：(上下文, 输出列表) -> None
+Node = Callable[[Dict, List[str]], None]
+
+
+def _lookup(context: Dict, name: str):
+    """按点分名称取值，支持字典键和属性"""
+    parts = name.split(".")
+    value = context[parts[0]]
+    for part in parts[1:]:
+        value = value[part] if isinstance(value, dict) else getattr(value, part)
+    return value
+
+
+def _text_node(text: str) -> Node:
+    def emit(context, out):
+        out.append(text)
+    return emit
+
+
+def _var_node(expression: str) -> Node:
+    name, _, filter_name = (part.strip() for part in expression.partition("|"))
+    if filter_name not in ("", "raw"):
+        raise ValueError(f"Unknown filter: {filter_name}")
+    convert = str if filter_name == "raw" else latex_escape
+
+    def emit(context, out):
+        out.append(convert(_lookup(context, name)))
+    return emit
+
+
+def _for_node(var: str, items: str, body: List[Node]) -> Node:
+    def emit(context, out):
+        scope = dict(context)
+        for item in _lookup(context, items) or ():
+            scope[var] = item
+            for node in body:
+                node(scope, out)
+    return emit
+
+
+def _if_node(name: str, body: List[Node]) -> Node:
+    def emit(context, out):
+        if context.get(name.split(".", 1)[0]) is not None and _lookup(context, name):
+            for node in body:
+                node(context, out)
+    return emit
+
+
+def compile_template(source: str) -> Callable[..., str]:
+    """
+    把模板源码编译为渲染函数
+
+    Returns:
+        Callable: render(**context) -> str
+    """
+    # 栈中每层为 (开始标签, 参数, 节点列表)
+    stack = [("root", None, [])]
+    pos = 0
+    for match in _TAG.finditer(source):
+        if match.start() > pos:
+            stack[-1][2].append(_text_node(source[pos:match.start()]))
+        pos = match.end()
+
+        if match.group(1) is not None:
+            stack[-1][2].append(_var_node(match.group(1)))
+            continue
+
+        block = match.group(2).strip()
+        for_match = _FOR.match(block)
+        if_match = _IF.match(block)
+        if for_match:
+            stack.append(("for", for_match.groups(), []))
+        elif if_match:
+            stack.append(("if", if_match.group(1), []))
+        elif block in ("endfor", "endif"):
+            kind, args, body = stack.pop()
+            if kind != block[3:]:
+                raise ValueError(f"Unexpected \\BLOCK{{{block}}}")
+            node = _for_node(*args, body) if kind == "for" else _if_node(args, body)
+            stack[-1][2].append(node)
+        else:
+            raise ValueError(f"Unknown block: {block}")
+
+    if pos < len(source):
+        stack[-1][2].append(_text_node(source[pos:]))
+    if len(stack) != 1:
+        raise ValueError(f"Unclosed \\BLOCK{{{stack[-1][0]}}}")
+    nodes = stack[0][2]
+
+    def render(**context) -> str:
+        out: List[str] = []
+        for node in nodes:
+            node(context, out)
+        return "".join(out)
+
+    return render
+
+
+SECTION_TEMPLATE = r"""% \VAR{title}
+\section{\VAR{heading}}
+
+\BLOCK{for subsection in subsections}
+\subsection{\VAR{subsection}}
+
+[Content to be added...]
+
+\BLOCK{endfor}
+\BLOCK{if content_points}
+\textbf{Key Points}:
+\begin{itemize}
+\BLOCK{for point in content_points}
+    \item \VAR{point}
+\BLOCK{endfor}
+\end{itemize}
+
+\BLOCK{endif}
+"""
+
+render_section_template = compile_template(SECTION_TEMPLATE)
+
+# 大纲章节名与模板章节文件名不一致时的映射
+SECTION_FILE_ALIASES = {
+    "methodology": "method",
+    "methods": "method",
+    "experiment": "experiments",
+    "conclusions": "conclusion",
+}
+
+_SECTION_NUMBER = re.compile(r"^\s*\d+(?:\.\d+)*\.?\s*")
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def section_heading(title: str) -> str:
+    """去掉编号的章节标题：1. Introduction -> Introduction"""
+    return _SECTION_NUMBER.sub("", title)
+
+
+def section_slug(title: str) -> str:
+    """章节文件名：1. Introduction -> introduction，2. Related Work -> related_work"""
+    slug = _NON_WORD.sub("_", section_heading(title).lower()).strip("_")
+    return SECTION_FILE_ALIASES.get(slug, slug)
+
+
+def render_section(section: Dict) -> str:
+    """渲染大纲中的一个章节"""
+    return render_section_template(
+        title=section["title"],
+        heading=section_heading(section["title"]),
+        subsections=section.get("subsections", []),
+        content_points=section.get("content_points"),
+    )
+
+
+# 生成区域标记：增量更新只替换标记之间的内容，标记之外的用户内容保持不变
+GENERATED_BEGIN = "% >>> generated: {name} (content between these markers is regenerated)\n"
+GENERATED_END = "% <<< generated: {name}\n"
+
+
+def wrap_generated(name: str, text: str) -> str:
+    """用生成区域标记包裹文本"""
+    if not text.endswith("\n"):
+        text += "\n"
+    return GENERATED_BEGIN.format(name=name) + text + GENERATED_END.format(name=name)
+
+
+def replace_generated(existing: str, name: str, text: str) -> Optional[str]:
+    """
+    替换已有文件中的生成区域
+
+    Returns:
+        str: 替换后的完整文本；找不到完整的标记时返回 None（文件视为用户所有）
+    """
+    begin = GENERATED_BEGIN.format(name=name)
+    end = GENERATED_END.format(name=name)
+    start = existing.find(begin)
+    if start < 0:
+        return None
+    stop = existing.find(end, start + len(begin))
+    if stop < 0:
+        return None
+    return existing[:start] + wrap_generated(name, text) + existing[stop + len(end):]
+
+
+_SECTION_TEMPLATE_HASH = hashlib.sha1(SECTION_TEMPLATE.encode("utf-8")).hexdigest()
+
+
+def section_fingerprint(section: Dict) -> str:
+    """章节的输入指纹：大纲内容或章节模板变化时改变"""
+    data = json.dumps(section, sort_keys=True, ensure_ascii=False) + _SECTION_TEMPLATE_HASH
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()[:16]
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+LaTeX 审稿引擎
+用一个正则词法器对 main.tex 做单遍扫描，遇到 \\input/\\include 时就地展开被引用的文件，
+按文档顺序收集：
+- 各章节的字数（只统计正文，不含命令参数、注释和导言区）
+- 标签与 \\ref、引用键与 \\cite，找出无法解析的引用
+- 占位文本（[Content to be added...]、TODO 等）
+- 图、表数量，缺失的 \\input 文件和参考文献文件
+"""
+
+import bisect
+import hashlib
+import os
+import re
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple, Union
+
+from bibtex_index import BibIndex, load_bib_index
+
+
+# 词法单元：命令（含转义字符 \% \{ 等，因此注释只会匹配未转义的 %）、注释、花括号、
+# 方括号占位文本和连续的正文片段；正文片段内的单词用 findall 一次计数，不逐词进入 Python 循环
+_TOKEN = re.compile(
+    r"(?P<command>\\(?:[A-Za-z@]+\*?|.))"
+    r"|(?P<comment>%[^\n]*)"
+    r"|(?P<placeholder>\[(?:[^\[\]\n]*?(?:\.\.\.|to be added|TODO|TBD)|Your [^\[\]\n]*"
+    r"|Author Name|Affiliation|Email|Institution|Keywords)\])"
+    r"|(?P<text>[^\\%{}\[]+)"
+    r"|(?P<other>.)",
+    re.S,
+)
+_WORD = re.compile(r"[A-Za-z0-9][A-Za-z0-9'\-]*|[\u4e00-\u9fff]")
+# 正文中的待办标记
+_MARKER = re.compile(r"\b(?:TODO|TBD|FIXME)\b")
+
+SECTION_LEVELS = {"chapter": 0, "section": 1, "subsection": 2, "subsubsection": 3}
+REF_COMMANDS = {"ref", "eqref", "autoref", "cref", "Cref", "pageref", "vref", "nameref"}
+CITE_COMMANDS = {"cite", "citep", "citet", "citealp", "citeauthor", "citeyear", "nocite",
+                 "parencite", "textcite", "autocite", "footcite"}
+INPUT_COMMANDS = {"input", "include", "subfile"}
+BIB_COMMANDS = {"bibliography", "addbibresource"}
+FIGURE_ENVIRONMENTS = {"figure", "figure*", "wrapfigure", "subfigure"}
+TABLE_ENVIRONMENTS = {"table", "table*", "longtable"}
+# 内容原样跳过的环境
+VERBATIM_ENVIRONMENTS = {"verbatim", "verbatim*", "lstlisting", "minted", "comment"}
+# 参数不计入字数的命令（参数被整体跳过）
+SKIP_ARGUMENT_COMMANDS = {
+    "documentclass", "usepackage", "RequirePackage", "bibliographystyle", "includegraphics",
+    "url", "href", "hypersetup", "setlength", "setcounter", "newcommand", "renewcommand",
+    "providecommand", "DeclareMathOperator", "pagestyle", "thispagestyle", "vspace", "hspace",
+    "graphicspath", "label",
+}
+
+# 审稿读取的论文文件类型，用于判断论文自上次审稿后是否变化
+REVIEW_INPUT_SUFFIXES = (".tex", ".bib", ".cls", ".sty", ".bst")
+
+_SECTION_TITLE_COMMAND = re.compile(r"\\[A-Za-z@]+\*?|[{}]")
+
+
+class _Lines:
+    """偏移量 -> 行号（只在需要报告位置时构建）"""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.starts: Optional[List[int]] = None
+
+    def line(self, pos: int) -> int:
+        if self.starts is None:
+            self.starts = [0] + [m.end() for m in re.finditer(r"\n", self.text)]
+        return bisect.bisect_right(self.starts, pos)
+
+
+def _read_group(text: str, pos: int) -> Tuple[Optional[str], int]:
+    """
+    读取 pos 处命令的参数：跳过 * 和 [可选参数]，返回第一个花括号组的内容
+
+    Returns:
+        (内容, 结束位置)；没有花括号参数时返回 (None, pos)
+    """
+    n = len(text)
+    i = pos
+    while i < n:
+        c = text[i]
+        if c in " \t\n*":
+            i += 1
+        elif c == "[":
+            depth = 0
+            while i < n:
+                if text[i] == "[":
+                    depth += 1
+                elif text[i] == "]":
+                    depth -= 1
+                    if depth == 0:
+                        break
+                i += 1
+            i += 1
+        else:
+            break
+    if i >= n or text[i] != "{":
+        return None, pos
+    depth = 0
+    start = i + 1
+    while i < n:
+        c = text[i]
+        if c == "\\":
+            i += 2
+            continue
+        if c == "{":
+            depth += 1
+        elif c == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start:i], i + 1
+        i += 1
+    return text[start:], n
+
+
+def _keys(argument: str) -> List[str]:
+    return [key.strip() for key in argument.split(",") if key.strip()]
+
+
+def _plain(title: str) -> str:
+    """章节标题去掉命令和花括号"""
+    return " ".join(_SECTION_TITLE_COMMAND.sub(" ", title).split())
+
+
+class LatexReview:
+    """一次审稿扫描的结果"""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.files: List[str] = []
+        self.missing_inputs: List[Dict] = []
+        self.sections: List[Dict] = []
+        self.labels: Set[str] = set()
+        self.refs: List[Dict] = []
+        self.citations: List[Dict] = []
+        self.bibliographies: List[str] = []
+        self.placeholders: List[Dict] = []
+        self.figures = 0
+        self.tables = 0
+        self.words = 0
+        self.ended = False
+        self._current: Optional[Dict] = None
+        # abstract 环境结束后恢复的章节
+        self._resume: Optional[Dict] = None
+
+    def _location(self, rel_path: str, lines: _Lines, pos: int) -> Dict:
+        return {"file": rel_path, "line": lines.line(pos)}
+
+    def _open_section(self, title: str, level: int, rel_path: str, lines: _Lines, pos: int):
+        self._current = dict(title=title, level=level, words=0, placeholders=0,
+                             **self._location(rel_path, lines, pos))
+        self.sections.append(self._current)
+
+    def _placeholder(self, text: str, rel_path: str, lines: _Lines, pos: int):
+        entry = {"text": text, **self._location(rel_path, lines, pos)}
+        if self._current is not None:
+            entry["section"] = self._current["title"]
+            self._current["placeholders"] += 1
+        self.placeholders.append(entry)
+
+    def scan(self, path: Path, stack: Tuple[Path, ...] = (), in_document: bool = False) -> bool:
+        """
+        扫描一个文件，\\input 的文件在当前位置递归展开
+
+        Returns:
+            bool: 扫描结束时是否在 document 环境中
+        """
+        try:
+            rel_path = path.relative_to(self.root).as_posix()
+        except ValueError:
+            rel_path = str(path)
+        try:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                text = f.read()
+        except OSError:
+            self.missing_inputs.append({"file": rel_path})
+            return in_document
+        self.files.append(rel_path)
+        lines = _Lines(text)
+        # 被 \input 的文件（没有 \begin{document}）视为正文
+        in_document = in_document or bool(stack)
+        stack = stack + (path,)
+
+        pos = 0
+        search = _TOKEN.search
+        while True:
+            match = search(text, pos)
+            if match is None:
+                break
+            pos = match.end()
+            kind = match.lastgroup
+
+            if kind == "text":
+                run = match.group()
+                if in_document:
+                    count = len(_WORD.findall(run))
+                    self.words += count
+                    if self._current is not None:
+                        self._current["words"] += count
+                if "TODO" in run or "TBD" in run or "FIXME" in run:
+                    for marker in _MARKER.finditer(run):
+                        self._placeholder(marker.group(), rel_path, lines, match.start() + marker.start())
+                continue
+            if kind == "placeholder":
+                # 导言区的占位文本（如 [Your Paper Title]）同样需要报告
+                self._placeholder(match.group(), rel_path, lines, match.start())
+                continue
+            if kind != "command":
+                continue
+
+            name = match.group()[1:].rstrip("*")
+            if name in ("begin", "end"):
+                argument, end = _read_group(text, pos)
+                if argument is None:
+                    continue
+                pos = end
+                environment = argument.strip()
+                if name == "end":
+                    if environment == "document":
+                        self.ended = True
+                        return False
+                    if environment == "abstract":
+                        self._current = self._resume
+                    continue
+                if environment == "document":
+                    in_document = True
+                elif environment in FIGURE_ENVIRONMENTS:
+                    self.figures += 1
+                elif environment in TABLE_ENVIRONMENTS:
+                    self.tables += 1
+                elif environment == "abstract":
+                    self._resume = self._current
+                    self._open_section("Abstract", 1, rel_path, lines, match.start())
+                elif environment in VERBATIM_ENVIRONMENTS:
+                    stop = text.find(f"\\end{{{environment}}}", pos)
+                    pos = len(text) if stop < 0 else stop
+                continue
+
+            if name in SECTION_LEVELS:
+                argument, end = _read_group(text, pos)
+                if argument is not None:
+                    pos = end
+                    self._open_section(_plain(argument), SECTION_LEVELS[name], rel_path, lines, match.start())
+                continue
+            if name in REF_COMMANDS or name in CITE_COMMANDS:
+                argument, end = _read_group(text, pos)
+                if argument is not None:
+                    pos = end
+                    target = self.refs if name in REF_COMMANDS else self.citations
+                    location = self._location(rel_path, lines, match.start())
+                    target.extend({"key": key, **location} for key in _keys(argument))
+                continue
+            if name in INPUT_COMMANDS or name in BIB_COMMANDS or name in SKIP_ARGUMENT_COMMANDS:
+                argument, end = _read_group(text, pos)
+                if argument is None:
+                    continue
+                pos = end
+                if name == "label":
+                    self.labels.update(_keys(argument))
+                elif name in BIB_COMMANDS:
+                    for bib in _keys(argument):
+                        self.bibliographies.append(bib if bib.endswith(".bib") else bib + ".bib")
+                elif name in INPUT_COMMANDS:
+                    child = (path.parent if name == "subfile" else self.root) / argument.strip()
+                    if not child.suffix:
+                        child = child.with_suffix(".tex")
+                    if child in stack:
+                        continue
+                    if not child.is_file():
+                        self.missing_inputs.append({"input": argument.strip(),
+                                                    **self._location(rel_path, lines, match.start())})
+                        continue
+                    self.scan(child, stack, in_document)
+                    if self.ended:
+                        return False
+        return in_document
+
+    def unresolved_refs(self) -> List[Dict]:
+        return [ref for ref in self.refs if ref["key"] not in self.labels]
+
+    def to_dict(self, load_index: Callable[[Path], BibIndex] = load_bib_index) -> Dict:
+        """
+        可 JSON 序列化的结果
+
+        Args:
+            load_index: 加载 .bib 索引的函数（可传入带缓存的版本）
+        """
+        indexes = {bib: load_index(self.root / bib) for bib in self.bibliographies
+                   if (self.root / bib).is_file()}
+        cited = {cite["key"] for cite in self.citations}
+        bibliography = {}
+        for bib, index in indexes.items():
+            bibliography[bib] = {
+                "entries": len(index.entries),
+                "duplicates": index.duplicates,
+                "incomplete": index.incomplete(),
+                "errors": index.errors,
+                "uncited": index.check_citations(cited)["uncited"],
+            }
+        unresolved = [cite for cite in self.citations if cite["key"] != "*"
+                      and not any(index.resolve(cite["key"]) for index in indexes.values())]
+        return {
+            "files": self.files,
+            "words": self.words,
+            "sections": self.sections,
+            "figures": self.figures,
+            "tables": self.tables,
+            "labels": len(self.labels),
+            "citations": sorted(cited),
+            "unresolved_refs": self.unresolved_refs(),
+            "unresolved_citations": unresolved,
+            "placeholders": self.placeholders,
+            "bibliographies": self.bibliographies,
+            "bibliography": bibliography,
+            "missing_bibliographies": [bib for bib in self.bibliographies if bib not in indexes],
+            "missing_inputs": self.missing_inputs,
+        }
+
+
+def review_latex(main_tex: Union[str, Path], load_index: Callable[[Path], BibIndex] = load_bib_index) -> Dict:
+    """
+    审阅一篇 LaTeX 论文
+
+    Args:
+        main_tex: 主文件，\\input 路径相对于它所在的目录解析
+        load_index: 加载 \\bibliography 引用的 .bib 索引的函数
+
+    Returns:
+        Dict: files/words/sections/figures/tables/labels/citations/unresolved_refs/unresolved_citations/
+              placeholders/bibliographies/bibliography（各 .bib 的条目数、重复键、缺字段条目、未引用条目）/
+              missing_bibliographies/missing_inputs
+    """
+    main_tex = Path(main_tex)
+    review = LatexReview(main_tex.parent)
+    review.scan(main_tex)
+    return review.to_dict(load_index)
+
+
+def paper_fingerprint(paper_dir: Union[str, Path], suffixes: Tuple[str, ...] = REVIEW_INPUT_SUFFIXES,
+                      exclude: Tuple[str, ...] = ()) -> str:
+    """
+    论文输入文件的 路径/大小/mtime 指纹，只 stat 不读取内容
+
+    Args:
+        paper_dir: 论文目录
+        suffixes: 参与指纹的文件类型
+        exclude: 不参与指纹的相对路径（如编译生成的 main.pdf）
+    """
+    paper_dir = Path(paper_dir)
+    items = []
+    for current, dirs, names in os.walk(paper_dir):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in names:
+            if name.endswith(suffixes):
+                path = os.path.join(current, name)
+                rel_path = Path(path).relative_to(paper_dir).as_posix()
+                if rel_path in exclude:
+                    continue
+                stat = os.stat(path)
+                items.append(f"{rel_path}\0{stat.st_size}\0{stat.st_mtime_ns}")
+    items.sort()
+    return hashlib.sha1("\n".join(items).encode("utf-8")).hexdigest()
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Python 项目模型
+用 ast 解析每个 Python 文件一次，提取导入、类、函数和调用点，
+构建模块间的导入图，用于项目类型识别、主模块排序和创新点提示
+
+解析结果按文件内容哈希缓存：文件内容未变化时（即使 mtime 变化）不会重新解析
+"""
+
+import ast
+import hashlib
+import sys
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+
+
+# 按导入的顶层包识别技术栈
+DEEP_LEARNING_PACKAGES = {
+    "torch", "torchvision", "tensorflow", "keras", "jax", "flax", "haiku", "optax",
+    "transformers", "pytorch_lightning", "lightning", "mxnet", "paddle", "onnx", "onnxruntime",
+}
+MACHINE_LEARNING_PACKAGES = {
+    "sklearn", "xgboost", "lightgbm", "catboost", "statsmodels",
+}
+SCIENTIFIC_PACKAGES = {
+    "numpy", "scipy", "pandas", "numba", "cupy", "sympy", "matplotlib",
+}
+PARALLEL_PACKAGES = {
+    "multiprocessing", "concurrent", "threading", "asyncio", "ray", "dask", "mpi4py",
+}
+
+# 技术栈判定阈值：导入相关包的模块占比，避免个别脚本决定整个项目的类型
+FRAMEWORK_SHARE_THRESHOLD = 0.05
+
+# 标准库模块名（Python 3.10+），统计第三方依赖时排除
+STDLIB_MODULES = set(getattr(sys, "stdlib_module_names", ())) | {"__future__"}
+
+# 手写神经网络的典型函数名（例如只依赖 numpy 的实现）
+NEURAL_NETWORK_FUNCTIONS = {"forward", "backward", "train", "fit", "predict", "loss"}
+
+# 单个模块保留的调用点上限，避免生成代码撑大缓存
+MAX_CALLS_PER_MODULE = 200
+
+
+def _dotted_name(node: ast.AST) -> Optional[str]:
+    """把 Name/Attribute 链还原为点分名称，如 nn.Linear"""
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if isinstance(node, ast.Name):
+        parts.append(node.id)
+        return ".".join(reversed(parts))
+    return None
+
+
+def summarize_source(source: bytes) -> Dict:
+    """
+    解析 Python 源码，提取结构摘要
+
+    Args:
+        source: 文件内容（bytes，由 ast 处理编码声明）
+
+    Returns:
+        Dict: imports/classes/functions/calls/main_guard/docstring；语法错误时包含 error
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError, RecursionError, MemoryError) as e:
+        return {"error": type(e).__name__}
+
+    imports: List[str] = []
+    classes: List[Dict] = []
+    functions: List[str] = []
+    calls: Counter = Counter()
+    main_guard = False
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imports.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            # 相对导入以前导点号记录层级，在建图时解析
+            prefix = "." * node.level
+            module = node.module or ""
+            if module:
+                imports.append(prefix + module)
+            else:
+                imports.extend(prefix + alias.name for alias in node.names)
+        elif isinstance(node, ast.ClassDef):
+            bases = [b for b in (_dotted_name(base) for base in node.bases) if b]
+            classes.append({"name": node.name, "bases": bases})
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            functions.append(node.name)
+        elif isinstance(node, ast.Call):
+            name = _dotted_name(node.func)
+            if name:
+                calls[name] += 1
+
+    for node in tree.body:
+        if isinstance(node, ast.If) and isinstance(node.test, ast.Compare):
+            operands = [node.test.left] + node.test.comparators
+            names = {
+                o.id if isinstance(o, ast.Name) else getattr(o, "value", None)
+                for o in operands
+            }
+            if "__name__" in names and "__main__" in names:
+                main_guard = True
+
+    docstring = ast.get_docstring(tree) or ""
+
+    return {
+        "imports": sorted(set(imports)),
+        "classes": classes,
+        "functions": functions,
+        "calls": dict(calls.most_common(MAX_CALLS_PER_MODULE)),
+        "main_guard": main_guard,
+        "docstring": docstring.strip().split("\n", 1)[0],
+    }
+
+
+def summarize_python_file(task: Tuple[str, Optional[str]]) -> Optional[Dict]:
+    """
+    读取并解析单个文件（可在进程池中运行）
+
+    Args:
+        task: (文件路径, 上次解析时的内容哈希)
+
+    Returns:
+        Dict: {"sha1": 内容哈希, "summary": 摘要}；内容哈希未变化时 summary 为 None；
+              读取失败时返回 None
+    """
+    path, known_sha1 = task
+    try:
+        with open(path, 'rb') as f:
+            source = f.read()
+    except OSError:
+        return None
+
+    sha1 = hashlib.sha1(source).hexdigest()
+    if sha1 == known_sha1:
+        return {"sha1": sha1, "summary": None}
+    return {"sha1": sha1, "summary": summarize_source(source)}
+
+
+def module_name(rel_path: str) -> str:
+    """相对路径转换为模块名：pkg/sub/mod.py -> pkg.sub.mod，pkg/__init__.py -> pkg"""
+    parts = rel_path[:-3].split("/") if rel_path.endswith(".py") else rel_path.split("/")
+    if parts and parts[-1] == "__init__":
+        parts = parts[:-1]
+    return ".".join(parts)
+
+
+class PythonProjectModel:
+    """项目内所有 Python 模块的结构摘要和导入图"""
+
+    def __init__(self, summaries: Dict[str, Dict]):
+        """
+        Args:
+            summaries: 相对路径 -> summarize_source 的结果
+        """
+        self.summaries = {path: s for path, s in summaries.items() if "error" not in s}
+        self.failed = sorted(path for path, s in summaries.items() if "error" in s)
+
+        self.modules: Dict[str, str] = {}  # 模块名 -> 相对路径
+        for path in sorted(self.summaries):
+            name = module_name(path)
+            self.modules.setdefault(name, path)
+            # src 布局：src/pkg/mod.py 也可以以 pkg.mod 被导入
+            if name.startswith("src."):
+                self.modules.setdefault(name[4:], path)
+
+        self.graph: Dict[str, Set[str]] = {}         # 相对路径 -> 依赖的项目内相对路径
+        self.external: Counter = Counter()           # 顶层第三方/标准库包 -> 导入它的模块数
+        self._build_graph()
+
+    def _resolve(self, importer: str, name: str) -> Optional[str]:
+        """把导入名解析为项目内模块的相对路径，外部包返回 None"""
+        if name.startswith("."):
+            level = len(name) - len(name.lstrip("."))
+            package = module_name(importer).split(".")
+            if not importer.endswith("__init__.py"):
+                package = package[:-1]
+            if level > 1:
+                package = package[:-(level - 1)] if level - 1 <= len(package) else []
+            rest = name.lstrip(".")
+            name = ".".join(package + ([rest] if rest else []))
+
+        parts = name.split(".")
+        while parts:
+            path = self.modules.get(".".join(parts))
+            if path is not None:
+                return path
+            parts.pop()
+        return None
+
+    def _build_graph(self):
+        """构建项目内导入图，并统计外部依赖"""
+        for path, summary in self.summaries.items():
+            deps = set()
+            packages = set()
+            for name in summary["imports"]:
+                target = self._resolve(path, name)
+                if target is not None:
+                    if target != path:
+                        deps.add(target)
+                elif not name.startswith("."):
+                    packages.add(name.split(".", 1)[0])
+            self.graph[path] = deps
+            self.external.update(packages)
+
+    def in_degree(self) -> Counter:
+        """每个模块被项目内其他模块导入的次数"""
+        counts: Counter = Counter()
+        for deps in self.graph.values():
+            counts.update(deps)
+        return counts
+
+    def uses(self, packages: Set[str]) -> int:
+        """导入了给定包集合之一的模块数"""
+        return sum(
+            1 for s in self.summaries.values()
+            if any(name.split(".", 1)[0] in packages for name in s["imports"])
+        )
+
+    def _share(self, packages: Set[str]) -> float:
+        """导入给定包集合的模块占比"""
+        return self.uses(packages) / len(self.summaries) if self.summaries else 0.0
+
+    def detect_project_type(self) -> Optional[str]:
+        """根据导入的技术栈判断项目类型，无法判断时返回 None"""
+        if not self.summaries:
+            return None
+        if self._share(DEEP_LEARNING_PACKAGES) >= FRAMEWORK_SHARE_THRESHOLD:
+            return "Deep Learning / AI"
+        if self._share(MACHINE_LEARNING_PACKAGES) >= FRAMEWORK_SHARE_THRESHOLD:
+            return "ML / Data Science"
+        if self._share(SCIENTIFIC_PACKAGES) >= FRAMEWORK_SHARE_THRESHOLD:
+            defined = {
+                f.lower() for s in self.summaries.values()
+                if any(name.split(".", 1)[0] in SCIENTIFIC_PACKAGES for name in s["imports"])
+                for f in s["functions"]
+            }
+            if len(defined & NEURAL_NETWORK_FUNCTIONS) >= 2:
+                return "Deep Learning / AI"
+            return "Scientific Computing"
+        return None
+
+    def rank_modules(self, limit: int = 10) -> List[str]:
+        """
+        按重要性排序模块
+
+        被导入次数（导入图中心度）权重最高，其次是入口（__main__）和定义数量
+
+        Returns:
+            List[str]: 模块文件的相对路径
+        """
+        in_degree = self.in_degree()
+
+        def score(path: str) -> Tuple:
+            summary = self.summaries[path]
+            definitions = len(summary["classes"]) + len(summary["functions"])
+            return (-(in_degree[path] * 3 + (2 if summary["main_guard"] else 0) + min(definitions, 20) / 10), path)
+
+        ranked = sorted((p for p in self.summaries if not p.endswith("__init__.py")), key=score)
+        return ranked[:limit]
+
+    def entry_points(self) -> List[str]:
+        """包含 if __name__ == "__main__" 的模块"""
+        return sorted(p for p, s in self.summaries.items() if s["main_guard"])
+
+    def innovation_hints(self) -> List[str]:
+        """从代码结构中提取可作为创新点的线索"""
+        hints = []
+
+        # 只统计导入了深度学习框架的模块中继承 Module/Model/Layer 的类
+        nn_modules = [
+            c["name"] for s in self.summaries.values()
+            if any(name.split(".", 1)[0] in DEEP_LEARNING_PACKAGES for name in s["imports"])
+            for c in s["classes"]
+            if any(b.split(".")[-1] in ("Module", "Model", "Layer") for b in c["bases"])
+        ]
+        if nn_modules:
+            hints.append(f"Custom neural network architecture ({len(nn_modules)} model components, "
+                         f"e.g. {', '.join(sorted(nn_modules)[:3])})")
+
+        frameworks = sorted(
+            name for name in self.external
+            if name in DEEP_LEARNING_PACKAGES | MACHINE_LEARNING_PACKAGES
+        )
+        if frameworks:
+            hints.append(f"End-to-end pipeline built on {', '.join(frameworks[:3])}")
+
+        if self._share(PARALLEL_PACKAGES) >= FRAMEWORK_SHARE_THRESHOLD:
+            hints.append("Parallel / concurrent execution for improved throughput")
+
+        hubs = [p for p, count in self.in_degree().most_common(3) if count >= 3]
+        if hubs:
+            hints.append(f"Modular design centered on {', '.join(module_name(p) for p in hubs)}")
+
+        return hints
+
+    def stats(self) -> Dict:
+        """汇总统计，写入 code_stats"""
+        return {
+            "modules": len(self.summaries),
+            "classes": sum(len(s["classes"]) for s in self.summaries.values()),
+            "functions": sum(len(s["functions"]) for s in self.summaries.values()),
+            "import_edges": sum(len(d) for d in self.graph.values()),
+            "external_packages": [
+                name for name, _ in sorted(self.external.items(), key=lambda x: (-x[1], x[0]))
+                if name not in STDLIB_MODULES
+            ][:10],
+            "entry_points": self.entry_points()[:10],
+            "parse_errors": len(self.failed),
+        }
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+模板包预取
+用有界线程池并发下载 supported_templates 中的模板包，中断后通过 HTTP Range 续传，
+下载完成后校验 SHA-256 再放入本地模板包目录
+
+传输层可替换：任何实现 open(url, start) 并返回类似 HTTP 响应对象的类都可以，
+测试时可指向本地 http.server；本地已有模板包时不会访问网络
+"""
+
+import http.client
+import json
+import os
+import posixpath
+import re
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from code_scanner import run_pool
+from template_kits import KitCache, ingest_kit
+from template_store import TemplateStore, sha256_file, write_atomic
+
+
+USER_AGENT = "academic-paper-writer/1.0"
+
+# 默认并发下载数（网络 I/O 密集，与 CPU 核数无关）
+DEFAULT_FETCH_JOBS = 4
+
+# 单个模板包的最大尝试次数，每次从已下载的位置续传
+FETCH_ATTEMPTS = 3
+
+FETCH_CHUNK = 256 * 1024
+
+_CONTENT_RANGE = re.compile(r"bytes\s+(\d+)-(\d+)/(\d+|\*)")
+
+
+class UrllibTransport:
+    """基于 urllib 的 HTTP(S) 传输"""
+
+    def __init__(self, timeout: float = 30.0):
+        self.timeout = timeout
+
+    def open(self, url: str, start: int = 0):
+        """
+        打开下载流
+
+        Args:
+            url: 地址
+            start: 续传起点，大于 0 时发送 Range 请求
+
+        Returns:
+            响应对象：status、headers、read(n)，支持 with 语句；416 也作为响应返回
+        """
+        request = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
+        if start:
+            request.add_header("Range", f"bytes={start}-")
+        try:
+            return urllib.request.urlopen(request, timeout=self.timeout)
+        except urllib.error.HTTPError as e:
+            if e.code == 416:
+                return e
+            raise
+
+
+def kit_filename(url: str) -> str:
+    """下载地址中的文件名"""
+    return posixpath.basename(url.split("?", 1)[0]) or "kit.zip"
+
+
+def fetch_archive(url: str, target: Union[str, Path], transport=None,
+                  expected_sha256: str = None, attempts: int = FETCH_ATTEMPTS) -> Dict:
+    """
+    下载单个文件，支持断点续传和校验
+
+    数据先写入 <target>.part，校验通过后原子重命名为 target；
+    服务器忽略 Range 时从头下载，校验失败时删除 .part 以免续传损坏的数据
+
+    Args:
+        url: 地址
+        target: 目标文件
+        transport: 传输层，默认 UrllibTransport
+        expected_sha256: 期望的哈希，为空时不校验
+        attempts: 最大尝试次数
+
+    Returns:
+        Dict: {"bytes", "resumed_from", "sha256"}
+    """
+    target = Path(target)
+    transport = transport or UrllibTransport()
+    part = target.with_name(target.name + ".part")
+    target.parent.mkdir(parents=True, exist_ok=True)
+
+    resumed_from = part.stat().st_size if part.exists() else 0
+    error: Optional[BaseException] = None
+    for _ in range(attempts):
+        start = part.stat().st_size if part.exists() else 0
+        total = None
+        try:
+            with transport.open(url, start) as response:
+                status = getattr(response, "status", None) or response.getcode()
+                if status == 416:
+                    # 已下载完整
+                    total = start
+                else:
+                    if status == 206 and start:
+                        match = _CONTENT_RANGE.match(response.headers.get("Content-Range", ""))
+                        if match and int(match.group(1)) != start:
+                            raise OSError(f"Unexpected Content-Range: {match.group(0)}")
+                        if match and match.group(3) != "*":
+                            total = int(match.group(3))
+                        mode = 'ab'
+                    else:
+                        # 服务器不支持 Range：从头下载
+                        start = 0
+                        length = response.headers.get("Content-Length")
+                        total = int(length) if length and length.isdigit() else None
+                        mode = 'wb'
+                    with open(part, mode) as f:
+                        for chunk in iter(lambda: response.read(FETCH_CHUNK), b""):
+                            f.write(chunk)
+        except (OSError, http.client.HTTPException) as e:
+            error = e
+            continue
+
+        size = part.stat().st_size if part.exists() else 0
+        if total is None or size >= total:
+            break
+        error = OSError(f"Incomplete download: {size}/{total} bytes")
+    else:
+        raise error or OSError(f"Download failed: {url}")
+
+    digest = sha256_file(part)
+    if expected_sha256 and digest != expected_sha256.lower():
+        part.unlink()
+        raise ValueError(f"Checksum mismatch for {url}: expected {expected_sha256}, got {digest}")
+
+    os.replace(part, target)
+    return {"bytes": target.stat().st_size, "resumed_from": resumed_from, "sha256": digest}
+
+
+class ChecksumPins:
+    """首次下载时记录的模板包哈希（url -> sha256），之后的下载必须一致"""
+
+    def __init__(self, pins_file: Union[str, Path]):
+        self.pins_file = Path(pins_file)
+        try:
+            with open(self.pins_file, 'r', encoding='utf-8') as f:
+                self.pins: Dict[str, str] = json.load(f)
+        except (OSError, ValueError):
+            self.pins = {}
+
+    def get(self, url: str) -> Optional[str]:
+        return self.pins.get(url)
+
+    def pin(self, url: str, digest: str):
+        if self.pins.get(url) != digest:
+            self.pins[url] = digest
+            write_atomic(self.pins_file, json.dumps(self.pins, indent=1, sort_keys=True).encode("utf-8"))
+
+
+def prefetch_templates(templates: Dict[str, Dict], kits_dir: Union[str, Path], store: TemplateStore,
+                       names: List[str] = None, jobs: int = DEFAULT_FETCH_JOBS, transport=None,
+                       force: bool = False) -> List[Dict]:
+    """
+    并发下载模板包到本地模板包目录，并导入模板仓库
+
+    本地已有且哈希与记录一致的模板包直接跳过，不发起任何请求（哈希按 size/mtime 缓存）；
+    只处理 zip 格式的模板包。下载并发进行，哈希记录和导入在主线程中依次完成
+
+    Args:
+        templates: supported_templates
+        kits_dir: 本地模板包目录
+        store: 模板仓库
+        names: 需要预取的模板，默认全部
+        jobs: 并发下载数
+        transport: 传输层
+        force: 忽略本地已有的模板包重新下载
+
+    Returns:
+        List[Dict]: 每个模板的结果：name/status(cached/downloaded/skipped/error)/path/...
+    """
+    kits_dir = Path(kits_dir)
+    kit_cache = KitCache(store)
+    pins = ChecksumPins(kit_cache.kits_dir / "checksums.json")
+    names = names or list(templates)
+
+    results: Dict[str, Dict] = {}
+    pending = []
+    for name in names:
+        info = templates.get(name)
+        if info is None:
+            results[name] = {"name": name, "status": "error", "error": "Unsupported template"}
+            continue
+        if info.get("format") != "zip":
+            results[name] = {"name": name, "status": "skipped",
+                             "reason": f"{info.get('format')} is not a LaTeX kit archive"}
+            continue
+
+        url = info["url"]
+        target = kits_dir / kit_filename(url)
+        expected = info.get("sha256") or pins.get(url)
+        if target.exists() and not force and (not expected or kit_cache.archive_digest(target) == expected):
+            results[name] = {"name": name, "status": "cached", "path": str(target)}
+        else:
+            pending.append((name, url, target, expected))
+
+    transport = transport or UrllibTransport()
+
+    def fetch(task) -> Dict:
+        name, url, target, expected = task
+        try:
+            result = fetch_archive(url, target, transport, expected)
+        except (OSError, ValueError, http.client.HTTPException) as e:
+            return {"name": name, "status": "error", "error": str(e)}
+        result.update({"name": name, "status": "downloaded", "path": str(target), "url": url})
+        return result
+
+    for result in run_pool(fetch, pending, jobs=jobs):
+        results[result["name"]] = result
+        if result["status"] == "downloaded":
+            pins.pin(result["url"], result["sha256"])
+
+    for name in names:
+        result = results[name]
+        if result["status"] in ("cached", "downloaded"):
+            try:
+                kit = ingest_kit(store, result["path"], name)
+            except ValueError as e:
+                result.update({"status": "error", "error": str(e)})
+                continue
+            result["files"] = len(kit["files"])
+    return [results[name] for name in names]
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+会议模板包（author kit）导入
+把本地的模板压缩包逐个成员流式解压到模板仓库，索引其中的 .cls/.sty/.bst 文件；
+结果按压缩包的 SHA-256 缓存，同一个压缩包之后的导入直接读取索引，不再解压
+"""
+
+import json
+import posixpath
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from template_store import TemplateStore, sha256_file, write_atomic
+
+
+# 需要索引的 LaTeX 支持文件：后缀 -> 索引字段
+INDEXED_SUFFIXES = {
+    ".cls": "classes",
+    ".sty": "styles",
+    ".bst": "bibstyles",
+}
+
+# 压缩包中忽略的目录和文件
+IGNORED_PARTS = {"__MACOSX", ".git", ".DS_Store", "Thumbs.db"}
+
+
+def _member_path(name: str) -> Optional[str]:
+    """规范化压缩包成员路径；绝对路径、.. 越界和忽略的文件返回 None"""
+    path = posixpath.normpath(name.replace("\\", "/"))
+    if path.startswith("/") or path == "." or path.startswith("../") or path == "..":
+        return None
+    parts = path.split("/")
+    if any(part in IGNORED_PARTS or part.startswith("._") for part in parts):
+        return None
+    return path
+
+
+def _common_root(paths: List[str]) -> str:
+    """所有成员共同的顶层目录（如 author-kit-main/），没有时返回空字符串"""
+    roots = {path.split("/", 1)[0] for path in paths}
+    if len(roots) == 1 and all("/" in path for path in paths):
+        return roots.pop() + "/"
+    return ""
+
+
+class KitCache:
+    """
+    模板包索引缓存
+
+    kits/<archive_sha256>.json  模板包索引
+    kits/sources.json           压缩包路径 -> size/mtime/哈希
+    kits/templates.json         模板名称 -> 导入的模板包哈希
+    """
+
+    def __init__(self, store: TemplateStore):
+        self.store = store
+        self.kits_dir = store.root / "kits"
+        self.sources_file = self.kits_dir / "sources.json"
+        self.templates_file = self.kits_dir / "templates.json"
+
+    @staticmethod
+    def _load_json(path: Path) -> Dict:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _load_sources(self) -> Dict[str, Dict]:
+        return self._load_json(self.sources_file)
+
+    def assign(self, name: str, digest: str):
+        """把模板名称绑定到已导入的模板包"""
+        templates = self._load_json(self.templates_file)
+        if templates.get(name) != digest:
+            templates[name] = digest
+            write_atomic(self.templates_file, json.dumps(templates, indent=1, sort_keys=True).encode("utf-8"))
+
+    def assigned(self, name: str) -> Optional[Dict]:
+        """模板名称绑定的模板包索引，没有时返回 None"""
+        digest = self._load_json(self.templates_file).get(name)
+        return self.load(digest) if digest else None
+
+    def archive_digest(self, archive: Path) -> str:
+        """压缩包的 SHA-256；size 和 mtime 未变化时直接使用记录的哈希"""
+        key = str(archive.resolve())
+        st = archive.stat()
+        sources = self._load_sources()
+        known = sources.get(key)
+        if known and known["size"] == st.st_size and known["mtime_ns"] == st.st_mtime_ns:
+            return known["sha256"]
+
+        digest = sha256_file(archive)
+        sources[key] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+        write_atomic(self.sources_file, json.dumps(sources, indent=1, sort_keys=True).encode("utf-8"))
+        return digest
+
+    def load(self, digest: str) -> Optional[Dict]:
+        """读取索引；索引引用的 blob 缺失时视为未缓存"""
+        try:
+            with open(self.kits_dir / f"{digest}.json", 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not all(self.store.has_blob(blob) for blob in index.get("files", {}).values()):
+            return None
+        return index
+
+    def save(self, index: Dict):
+        write_atomic(self.kits_dir / f"{index['archive_sha256']}.json",
+                      json.dumps(index, indent=2, ensure_ascii=False).encode("utf-8"))
+
+
+def index_files(files: Dict[str, str]) -> Dict[str, Dict[str, str]]:
+    """
+    索引 LaTeX 支持文件
+
+    Returns:
+        Dict: {"classes": {名称: 相对路径}, "styles": {...}, "bibstyles": {...}, "tex": [相对路径]}
+    """
+    index: Dict = {field: {} for field in INDEXED_SUFFIXES.values()}
+    index["tex"] = []
+    for rel_path in sorted(files):
+        stem, suffix = posixpath.splitext(posixpath.basename(rel_path))
+        suffix = suffix.lower()
+        field = INDEXED_SUFFIXES.get(suffix)
+        if field:
+            # 同名文件保留路径最浅的一个，与 TeX 搜索时的优先级一致
+            current = index[field].get(stem)
+            if current is None or current.count("/") > rel_path.count("/"):
+                index[field][stem] = rel_path
+        elif suffix == ".tex":
+            index["tex"].append(rel_path)
+    return index
+
+
+def ingest_kit(store: TemplateStore, archive: Union[str, Path], name: str = None) -> Dict:
+    """
+    导入本地模板包
+
+    每个成员用 ZipFile.open 按块读取并直接写入仓库 blob，内存占用与压缩包大小无关；
+    单一顶层目录会被去掉，使 .cls 等文件位于模板根目录
+
+    Args:
+        store: 模板仓库
+        archive: 压缩包路径（.zip，也包括 .docx 这类 zip 容器）
+        name: 模板名称，提供时把该名称绑定到这个模板包
+
+    Returns:
+        Dict: 索引，files 为清单（相对路径 -> 哈希），另含 classes/styles/bibstyles/tex；
+              cached 表示命中缓存
+    """
+    archive = Path(archive)
+    cache = KitCache(store)
+    digest = cache.archive_digest(archive)
+
+    index = cache.load(digest)
+    if index is not None:
+        if name:
+            cache.assign(name, digest)
+        index["cached"] = True
+        return index
+
+    try:
+        zf = zipfile.ZipFile(archive)
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"Not a valid template archive: {archive} ({e})")
+
+    with zf:
+        members = []
+        for info in zf.infolist():
+            if info.is_dir():
+                continue
+            path = _member_path(info.filename)
+            if path is not None:
+                members.append((path, info))
+
+        root = _common_root([path for path, _ in members])
+        files: Dict[str, str] = {}
+        for path, info in members:
+            with zf.open(info) as stream:
+                files[path[len(root):]] = store.put_stream(stream)
+
+    index = {
+        "name": name,
+        "archive": archive.name,
+        "archive_sha256": digest,
+        "imported_at": datetime.now().isoformat(),
+        "files": dict(sorted(files.items())),
+    }
+    index.update(index_files(files))
+    cache.save(index)
+    if name:
+        cache.assign(name, digest)
+    index["cached"] = False
+    return index
+
+
+def find_kit_archive(kits_dir: Union[str, Path], name: str, url: str = None) -> Optional[Path]:
+    """
+    在本地模板包目录中查找模板包
+
+    依次查找 <name>.zip 和下载地址中的 zip 文件名（如 AuthorKit24.zip）
+    """
+    kits_dir = Path(kits_dir)
+    candidates = [f"{name}.zip"]
+    if url:
+        candidates.append(posixpath.basename(url.split("?", 1)[0]))
+    for candidate in candidates:
+        path = kits_dir / candidate
+        if candidate.lower().endswith(".zip") and path.is_file():
+            return path
+    return None
+
@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""
+内容寻址的模板仓库
+模板文件按 SHA-256 存为不可变的 blob，每个模板/版本一份清单（相对路径 -> 哈希）；
+只有内容变化时才写入，未变化的模板和论文目录不会被重复改写
+
+目录结构：
+    objects/ab/abcdef...        文件内容
+    manifests/<name>/<ver>.json 模板清单
+    refs/<name>.json            模板当前版本
+    checkouts/<key>.json        已检出目录的文件状态（用于识别用户修改、跳过重复哈希）
+
+blob 是只读的，生成论文目录时可以直接硬链接或 reflink（写时复制）到 blob，
+大量论文共享同一份模板文件的存储
+"""
+
+import errno
+import fnmatch
+import hashlib
+import json
+import os
+import shutil
+import stat
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+# 生成目录的方式：auto 依次尝试 reflink、硬链接，最后退化为复制
+LINK_MODES = ("auto", "reflink", "hardlink", "copy")
+
+# Linux FICLONE ioctl（btrfs、XFS 等支持写时复制的文件系统）
+FICLONE = 0x40049409
+
+# 不支持 reflink/硬链接时的错误码，遇到后退化为下一种方式
+_UNSUPPORTED = {errno.EXDEV, errno.EPERM, errno.EACCES, errno.EINVAL, errno.ENOTTY,
+                errno.EOPNOTSUPP, errno.ENOTSUP, errno.EMLINK, errno.ENOSYS}
+
+_READ_ONLY = stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH
+
+
+def sha256_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def sha256_file(path: Union[str, Path]) -> str:
+    """分块计算文件哈希"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_atomic(path: Path, data: bytes):
+    """写临时文件后原子替换"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def reflink_file(source: Union[str, Path], target: Union[str, Path]):
+    """用 FICLONE 创建写时复制的副本；文件系统不支持时抛出 OSError"""
+    if fcntl is None:
+        raise OSError(errno.ENOTSUP, "reflink is not supported on this platform")
+    with open(source, 'rb') as src, open(target, 'wb') as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            os.unlink(target)
+            raise
+
+
+def link_file(source: Union[str, Path], target: Union[str, Path], mode: str = "auto") -> str:
+    """
+    按指定方式把 source 放到 target（target 不能已存在）
+
+    Args:
+        source: 源文件（只读 blob）
+        target: 目标路径
+        mode: LINK_MODES 之一；auto 时不支持的方式自动退化
+
+    Returns:
+        str: 实际使用的方式：reflink / hardlink / copy
+    """
+    if mode in ("auto", "reflink"):
+        try:
+            reflink_file(source, target)
+            return "reflink"
+        except OSError as e:
+            if mode == "reflink" or e.errno not in _UNSUPPORTED:
+                raise
+    if mode in ("auto", "hardlink"):
+        try:
+            os.link(source, target)
+            return "hardlink"
+        except OSError as e:
+            if mode == "hardlink" or e.errno not in _UNSUPPORTED:
+                raise
+    shutil.copyfile(source, target)
+    return "copy"
+
+
+class TemplateStore:
+    """模板仓库"""
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+        self.manifests_dir = self.root / "manifests"
+        self.refs_dir = self.root / "refs"
+        self.checkouts_dir = self.root / "checkouts"
+        # 预编译的导言区格式文件，按导言区哈希命名，由同一模板生成的论文共享
+        self.formats_dir = self.root / "formats"
+
+    # ---- blob ----
+
+    def blob_path(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / digest
+
+    def has_blob(self, digest: str) -> bool:
+        return self.blob_path(digest).exists()
+
+    def put_bytes(self, data: bytes) -> str:
+        """写入 blob，已存在时不写；返回哈希"""
+        digest = sha256_bytes(data)
+        path = self.blob_path(digest)
+        if not path.exists():
+            write_atomic(path, data)
+            os.chmod(path, _READ_ONLY)
+        return digest
+
+    def put_file(self, source: Union[str, Path], digest: str = None) -> str:
+        """把文件复制为 blob，已存在时不复制；返回哈希"""
+        digest = digest or sha256_file(source)
+        path = self.blob_path(digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f".{digest}.{os.getpid()}.tmp")
+            shutil.copyfile(source, tmp)
+            os.chmod(tmp, _READ_ONLY)
+            os.replace(tmp, path)
+        return digest
+
+    def put_stream(self, stream, chunk_size: int = 1024 * 1024) -> str:
+        """
+        按块读取文件对象并写入 blob，边写边计算哈希，不把内容整体载入内存
+
+        Returns:
+            str: 哈希；内容已存在时丢弃临时文件
+        """
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.objects_dir / f".incoming.{os.getpid()}.{id(stream)}.tmp"
+        digest = hashlib.sha256()
+        try:
+            with open(tmp, 'wb') as f:
+                for chunk in iter(lambda: stream.read(chunk_size), b""):
+                    digest.update(chunk)
+                    f.write(chunk)
+            digest = digest.hexdigest()
+            path = self.blob_path(digest)
+            if path.exists():
+                tmp.unlink()
+            else:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                os.chmod(tmp, _READ_ONLY)
+                os.replace(tmp, path)
+        except BaseException:
+            if tmp.exists():
+                tmp.unlink()
+            raise
+        return digest
+
+    def read_blob(self, digest: str) -> bytes:
+        with open(self.blob_path(digest), 'rb') as f:
+            return f.read()
+
+    # ---- 清单 ----
+
+    @staticmethod
+    def manifest_version(files: Dict[str, str]) -> str:
+        """清单内容的哈希即版本号"""
+        digest = hashlib.sha256()
+        for rel_path in sorted(files):
+            digest.update(f"{rel_path}\0{files[rel_path]}\n".encode("utf-8"))
+        return digest.hexdigest()[:16]
+
+    def commit(self, name: str, files: Dict[str, bytes]) -> str:
+        """
+        提交模板内容
+
+        Args:
+            name: 模板名称
+            files: 相对路径 -> 文件内容
+
+        Returns:
+            str: 版本号；内容与已有版本相同时不写入任何文件
+        """
+        manifest = {rel_path: self.put_bytes(data) for rel_path, data in files.items()}
+        return self.commit_manifest(name, manifest)
+
+    def commit_manifest(self, name: str, files: Dict[str, str]) -> str:
+        """提交已写入 blob 的清单，并把它设为模板的当前版本"""
+        version = self.manifest_version(files)
+        manifest_file = self.manifests_dir / name / f"{version}.json"
+        if not manifest_file.exists():
+            data = {
+                "name": name,
+                "version": version,
+                "created_at": datetime.now().isoformat(),
+                "files": dict(sorted(files.items()))
+            }
+            write_atomic(manifest_file, json.dumps(data, indent=2).encode("utf-8"))
+
+        if self.current_version(name) != version:
+            write_atomic(self.refs_dir / f"{name}.json",
+                          json.dumps({"current": version}).encode("utf-8"))
+        return version
+
+    def current_version(self, name: str) -> Optional[str]:
+        try:
+            with open(self.refs_dir / f"{name}.json", 'r', encoding='utf-8') as f:
+                return json.load(f).get("current")
+        except (OSError, ValueError):
+            return None
+
+    def manifest(self, name: str, version: str = None) -> Dict[str, str]:
+        """读取清单（相对路径 -> 哈希），默认当前版本；不存在时返回空字典"""
+        version = version or self.current_version(name)
+        if not version:
+            return {}
+        try:
+            with open(self.manifests_dir / name / f"{version}.json", 'r', encoding='utf-8') as f:
+                return json.load(f)["files"]
+        except (OSError, ValueError, KeyError):
+            return {}
+
+    # ---- 目录检出与同步 ----
+
+    def _checkout_file(self, directory: Path) -> Path:
+        key = hashlib.sha1(str(directory.resolve()).encode("utf-8")).hexdigest()[:16]
+        return self.checkouts_dir / f"{key}.json"
+
+    def _load_checkout(self, directory: Path) -> Dict[str, Dict]:
+        try:
+            with open(self._checkout_file(directory), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_checkout(self, directory: Path, state: Dict[str, Dict]):
+        if state != self._load_checkout(directory):
+            write_atomic(self._checkout_file(directory),
+                          json.dumps(dict(sorted(state.items())), indent=1).encode("utf-8"))
+
+    @staticmethod
+    def _iter_files(directory: Path) -> Iterable[Path]:
+        """目录下的文件（跳过以 . 开头的文件和目录）"""
+        for current, dirs, files in os.walk(directory):
+            dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+            for name in sorted(files):
+                if not name.startswith("."):
+                    yield Path(current) / name
+
+    @staticmethod
+    def _cached_hash(entry: Optional[Dict], st: os.stat_result) -> Optional[str]:
+        """size 和 mtime 未变化时，上次记录的当前内容哈希"""
+        if entry and entry.get("size") == st.st_size and entry.get("mtime_ns") == st.st_mtime_ns:
+            return entry.get("current", entry.get("sha256"))
+        return None
+
+    def checkout(self, files: Dict[str, str], directory: Union[str, Path]) -> Dict[str, str]:
+        """
+        把清单检出到工作目录，只写入内容不同的文件
+
+        检出状态中每个文件记录两类信息：
+        - sha256：上次检出的内容，只由 checkout 写入，用来判断文件是否被用户修改
+        - current/size/mtime_ns：当前内容哈希的缓存，snapshot_dir 也会更新
+
+        当前内容与上次检出的内容不同的文件视为自定义内容，保留不覆盖
+
+        Args:
+            files: 清单（相对路径 -> 哈希）
+            directory: 工作目录
+
+        Returns:
+            Dict[str, str]: 每个文件的处理结果：written / unchanged / kept
+        """
+        directory = Path(directory)
+        state = self._load_checkout(directory)
+        results = {}
+
+        for rel_path, digest in files.items():
+            target = directory / rel_path
+            previous = state.get(rel_path)
+            try:
+                st = target.stat()
+            except FileNotFoundError:
+                st = None
+
+            if st is not None:
+                current = self._cached_hash(previous, st) or sha256_file(target)
+                if current == digest:
+                    results[rel_path] = "unchanged"
+                    state[rel_path] = {"sha256": digest, "current": digest,
+                                       "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+                    continue
+                baseline = previous.get("sha256") if previous else None
+                if baseline is None or current != baseline:
+                    # 用户自定义的文件：只更新缓存，不移动检出基线
+                    results[rel_path] = "kept"
+                    state[rel_path] = dict(previous or {}, current=current,
+                                           size=st.st_size, mtime_ns=st.st_mtime_ns)
+                    continue
+
+            target.parent.mkdir(parents=True, exist_ok=True)
+            write_atomic(target, self.read_blob(digest))
+            st = target.stat()
+            state[rel_path] = {"sha256": digest, "current": digest, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+            results[rel_path] = "written"
+
+        self._save_checkout(directory, state)
+        return results
+
+    def snapshot_dir(self, directory: Union[str, Path]) -> Dict[str, str]:
+        """
+        把工作目录（含用户自定义内容）收录到仓库，返回其清单
+
+        size 和 mtime 未变化的文件直接使用上次记录的哈希，不重新读取；
+        只更新哈希缓存，上次检出的内容（判断自定义的基线）保持不变
+        """
+        directory = Path(directory)
+        state = self._load_checkout(directory)
+        new_state = {}
+        files = {}
+
+        for path in self._iter_files(directory):
+            rel_path = path.relative_to(directory).as_posix()
+            st = path.stat()
+            previous = state.get(rel_path)
+            digest = self._cached_hash(previous, st)
+            if digest is None or not self.has_blob(digest):
+                digest = self.put_file(path)
+            files[rel_path] = digest
+            entry = {"current": digest, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+            if previous and previous.get("sha256"):
+                entry["sha256"] = previous["sha256"]
+            new_state[rel_path] = entry
+
+        self._save_checkout(directory, new_state)
+        return files
+
+    def materialize(self, files: Dict[str, str], dest: Union[str, Path], skip: Iterable[str] = (),
+                    mode: str = "auto", copy: Iterable[str] = ()) -> Counter:
+        """
+        从 blob 生成一个新目录（例如论文目录）
+
+        不可变的模板文件按 mode 链接到 blob；匹配 copy 模式的文件之后会被改写，
+        总是生成独立的副本，避免改写共享的 blob
+
+        Args:
+            files: 清单
+            dest: 目标目录
+            skip: 不需要生成的相对路径（由调用方另行写入）
+            mode: LINK_MODES 之一
+            copy: 需要独立副本的相对路径 glob 模式，如 "sections/*.tex"
+
+        Returns:
+            Counter: 各方式生成的文件数
+        """
+        if mode not in LINK_MODES:
+            raise ValueError(f"Unsupported link mode: {mode}. Supported: {list(LINK_MODES)}")
+
+        dest = Path(dest)
+        skip = set(skip)
+        copy = tuple(copy)
+        chain = list(LINK_MODES[1:]) if mode == "auto" else [mode]
+        used: Counter = Counter()
+        for rel_path, digest in files.items():
+            if rel_path in skip:
+                continue
+            target = dest / rel_path
+            target.parent.mkdir(parents=True, exist_ok=True)
+            if target.exists() or target.is_symlink():
+                target.unlink()
+
+            if any(fnmatch.fnmatchcase(rel_path, pattern) for pattern in copy):
+                shutil.copyfile(self.blob_path(digest), target)
+                used["copy"] += 1
+                continue
+
+            # auto 模式下某种方式不被支持后，本目录的其余文件不再重试该方式
+            while True:
+                try:
+                    used[link_file(self.blob_path(digest), target, chain[0])] += 1
+                    break
+                except OSError as e:
+                    if len(chain) == 1 or e.errno not in _UNSUPPORTED:
+                        raise
+                    chain.pop(0)
+        return used
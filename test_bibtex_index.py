@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+BibTeX 索引测试：嵌套花括号、@string 宏、@comment/@preamble 和跨行的条目切分
+"""
+
+import pytest
+
+from bibtex_index import BibIndex, iter_blocks, load_bib_index, parse_block
+
+
+def _index(text: str) -> BibIndex:
+    return BibIndex.parse(text.splitlines(keepends=True))
+
+
+def test_nested_braces_and_escaped_braces():
+    index = _index(
+        "@article{knuth84,\n"
+        "  author = {Donald E. {Knuth}},\n"
+        "  title = {Literate {Programming {in \\TeX}} with \\{braces\\}},\n"
+        "  journal = {The Computer Journal},\n"
+        "  year = 1984\n"
+        "}\n"
+    )
+    fields = index.entries["knuth84"]["fields"]
+    assert fields["author"] == "Donald E. {Knuth}"
+    assert fields["title"] == "Literate {Programming {in \\TeX}} with \\{braces\\}"
+    assert fields["year"] == "1984"
+    assert index.incomplete() == []
+
+
+def test_string_macros_and_concatenation():
+    index = _index(
+        '@string{acm = "ACM Press"}\n'
+        "@STRING(pub = {Springer})\n"
+        "@book{b1, author = {A}, title = {T}, publisher = acm # { and } # pub, year = 2001, month = jan}\n"
+    )
+    fields = index.entries["b1"]["fields"]
+    assert fields["publisher"] == "ACM Press and Springer"
+    assert fields["month"] == "Jan"
+
+
+def test_comment_and_preamble_are_skipped():
+    index = _index(
+        "@comment{ @article{fake, title = {not an entry}} }\n"
+        "@preamble{ \"\\newcommand{\\noop}[1]{}\" }\n"
+        "Free text between entries is ignored.\n"
+        "@misc{real, title = {Real}}\n"
+    )
+    assert index.keys() == ["real"]
+    assert index.errors == []
+
+
+def test_entries_sharing_lines_and_parentheses():
+    text = ("@misc{a, title = {A}}@misc{b, title = {B}\n"
+            "}  @misc(c, title = {C (with parens)})\n")
+    blocks = list(iter_blocks(text.splitlines(keepends=True)))
+    assert [line for line, _ in blocks] == [1, 1, 2]
+    index = _index(text)
+    assert index.keys() == ["a", "b", "c"]
+    assert index.entries["c"]["fields"]["title"] == "C (with parens)"
+
+
+def test_duplicates_are_case_insensitive_and_resolve():
+    index = _index("@misc{Smith2020, title = {A}}\n@misc{smith2020, title = {B}}\n")
+    assert index.duplicates == [{"key": "smith2020", "line": 2, "first_line": 1}]
+    assert index.resolve("SMITH2020") == "Smith2020"
+    assert index.check_citations(["smith2020", "missing"]) == {"unresolved": ["missing"], "uncited": []}
+
+
+def test_parse_errors_are_reported_per_entry():
+    # 未闭合的条目吞掉后续内容，错误报告在该条目的起始行
+    index = _index("@article{bad, title = {unbalanced}\n@misc{ok, title = {fine}}\n")
+    assert index.keys() == []
+    assert [error["line"] for error in index.errors] == [1]
+    index = _index("@misc{, title = {no key}}\n@misc{ok, title = {fine}}\n")
+    assert index.keys() == ["ok"]
+    assert index.errors[0]["line"] == 1
+    with pytest.raises(ValueError):
+        parse_block("@misc{k, title = }", {})
+
+
+def test_load_uses_cache_by_content_hash(tmp_path):
+    bib = tmp_path / "refs.bib"
+    bib.write_text("@misc{k, title = {T}}\n", encoding="utf-8")
+    cache = tmp_path / "cache"
+    first = load_bib_index(bib, cache)
+    assert len(list(cache.iterdir())) == 1
+    assert load_bib_index(bib, cache).to_dict() == first.to_dict()
+    bib.write_text("@misc{k2, title = {T}}\n", encoding="utf-8")
+    assert load_bib_index(bib, cache).keys() == ["k2"]
+    assert load_bib_index(tmp_path / "missing.bib", cache).keys() == []
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+遍历剪枝规则测试：gitignore 的否定、锚定和 ** 语义
+"""
+
+import pytest
+
+from code_scanner import IgnoreRules, parse_ignore_lines, scan_project
+
+
+def _ignored(lines, rel_path, is_dir=False, base=""):
+    rules = IgnoreRules(".", use_gitignore=False, use_defaults=False)
+    return rules.is_ignored(rel_path, is_dir, parse_ignore_lines(lines, base))
+
+
+@pytest.mark.parametrize("rel_path, expected", [
+    ("a.log", True),
+    ("sub/b.log", True),
+    ("keep.log", False),
+    ("sub/keep.log", False),
+    ("a.txt", False),
+])
+def test_negation_overrides_earlier_rule(rel_path, expected):
+    assert _ignored(["*.log", "!keep.log"], rel_path) is expected
+
+
+def test_later_rule_wins():
+    assert _ignored(["!keep.log", "*.log"], "keep.log") is True
+
+
+@pytest.mark.parametrize("lines, rel_path, expected", [
+    (["/build"], "build", True),
+    (["/build"], "src/build", False),
+    (["build"], "src/build", True),
+    (["doc/frotz"], "doc/frotz", True),
+    (["doc/frotz"], "a/doc/frotz", False),
+    (["\\!important"], "!important", True),
+    (["\\#hash"], "#hash", True),
+])
+def test_anchoring(lines, rel_path, expected):
+    assert _ignored(lines, rel_path) is expected
+
+
+def test_nested_gitignore_is_relative_to_its_directory():
+    assert _ignored(["/out"], "sub/out", base="sub") is True
+    assert _ignored(["/out"], "out", base="sub") is False
+    assert _ignored(["/out"], "sub/x/out", base="sub") is False
+    assert _ignored(["*.tmp"], "sub/x/a.tmp", base="sub") is True
+    assert _ignored(["*.tmp"], "a.tmp", base="sub") is False
+
+
+@pytest.mark.parametrize("lines, rel_path, expected", [
+    (["**/foo"], "foo", True),
+    (["**/foo"], "a/b/foo", True),
+    (["a/**/b"], "a/b", True),
+    (["a/**/b"], "a/x/y/b", True),
+    (["a/**/b"], "c/a/x/b", False),
+    (["abc/**"], "abc/x/y", True),
+    (["abc/**"], "abc", False),
+    (["*.py"], "a/b.py", True),
+    (["a/*.py"], "a/b/c.py", False),
+    (["file?.txt"], "file1.txt", True),
+    (["file[!0-9].txt"], "file1.txt", False),
+    (["file[!0-9].txt"], "fileA.txt", True),
+])
+def test_double_star_and_globs(lines, rel_path, expected):
+    assert _ignored(lines, rel_path) is expected
+
+
+def test_dir_only_rule_skips_files():
+    assert _ignored(["logs/"], "logs", is_dir=True) is True
+    assert _ignored(["logs/"], "logs", is_dir=False) is False
+
+
+def test_scan_prunes_directories_and_applies_negation(tmp_path):
+    (tmp_path / ".gitignore").write_text("*.log\n!keep.log\nbuild/\n")
+    (tmp_path / "build").mkdir()
+    (tmp_path / "build" / "out.py").write_text("")
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / ".gitignore").write_text("/generated.py\n")
+    for name in ("main.py", "generated.py", "debug.log", "keep.log"):
+        (tmp_path / "src" / name).write_text("")
+    (tmp_path / "src" / "sub").mkdir()
+    (tmp_path / "src" / "sub" / "generated.py").write_text("")
+
+    snapshot = scan_project(tmp_path, IgnoreRules(tmp_path, use_defaults=False))
+    files = {entry.rel_path for entry in snapshot.files}
+    assert files == {".gitignore", "src/.gitignore", "src/main.py", "src/keep.log", "src/sub/generated.py"}
+    assert "build" in snapshot.pruned
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+多语言行统计测试：分块统计与整体统计的结果一致
+"""
+
+import pytest
+
+import language_stats
+from language_stats import classify_file, classify_text
+
+
+SAMPLES = {
+    "Python": '"""Module\ndoc"""\nx = 1  # c\n\ns = "a\\\n b"\n\'\'\'open\n',
+    "C": "/* a\n b */ int x; /* c\n d */\n// line\nchar *s = \"x\\\n y\";\n\n",
+    "JavaScript": "const t = `multi\n// not a comment\nline`;\n/* c */\nlet q = '\\'';\n",
+    "Go": "var r = `raw\n/* not */\n`\n// c\n",
+}
+
+
+@pytest.mark.parametrize("language", sorted(SAMPLES))
+@pytest.mark.parametrize("chunk", [1, 3, 16, 1 << 20])
+def test_chunked_matches_whole_file(tmp_path, monkeypatch, language, chunk):
+    text = SAMPLES[language] * 3
+    path = tmp_path / "sample"
+    path.write_text(text, encoding="utf-8", newline="")
+    monkeypatch.setattr(language_stats, "CLASSIFY_CHUNK", chunk)
+    assert classify_file(str(path), language) == classify_text(text, language)
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+本地编译测试：导言区的拆分决定格式文件能否在同一模板的论文之间共享
+"""
+
+from latex_build import DUMP_MARKER, split_preamble
+
+
+PREAMBLE = "\\documentclass{article}\n\\usepackage{amsmath}\n"
+
+
+def test_split_at_dump_marker():
+    text = PREAMBLE + DUMP_MARKER + "\n\\usepackage{hyperref}\n\\title{A}\n\\begin{document}\nx\n\\end{document}\n"
+    parts = split_preamble(text)
+    assert parts["preamble"] == PREAMBLE
+    assert parts["body"].startswith("\n\\usepackage{hyperref}")
+
+
+def test_split_before_paper_metadata_without_marker():
+    first = split_preamble(PREAMBLE + "\\title{A}\n\\author{B}\n\\begin{document}\nx\n\\end{document}\n")
+    second = split_preamble(PREAMBLE + "\\author{C}\n\\title{D}\n\\begin{document}\ny\n\\end{document}\n")
+    assert first["preamble"] == second["preamble"] == PREAMBLE
+    assert first["body"].startswith("\\title{A}")
+
+
+def test_split_at_begin_document():
+    text = PREAMBLE + "\\newcommand{\\titlefont}{\\bfseries}\n\\begin{document}\nx\n\\end{document}\n"
+    parts = split_preamble(text)
+    assert parts["preamble"].endswith("\\bfseries}\n")
+    assert parts["body"].startswith("\\begin{document}")
+    assert split_preamble("no document") is None
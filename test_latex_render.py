@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+生成区域替换测试：只改写标记之间的内容，用户写在标记之外的内容保持不变
+"""
+
+from latex_render import GENERATED_BEGIN, GENERATED_END, replace_generated, wrap_generated
+
+
+def test_replaces_only_between_markers():
+    existing = ("% my notes\n\\section{Method}\n"
+                + wrap_generated("method", "old text\n")
+                + "My own paragraph.\n")
+    updated = replace_generated(existing, "method", "new text\n")
+    assert updated == ("% my notes\n\\section{Method}\n"
+                       + wrap_generated("method", "new text\n")
+                       + "My own paragraph.\n")
+
+
+def test_user_edits_inside_other_sections_are_kept():
+    existing = wrap_generated("intro", "intro v1\n") + "between\n" + wrap_generated("method", "method v1\n")
+    updated = replace_generated(existing, "method", "method v2\n")
+    assert updated.startswith(wrap_generated("intro", "intro v1\n") + "between\n")
+    assert updated.endswith(wrap_generated("method", "method v2\n"))
+
+
+def test_replacement_is_idempotent():
+    existing = "before\n" + wrap_generated("method", "v1\n") + "after\n"
+    once = replace_generated(existing, "method", "v2\n")
+    assert replace_generated(once, "method", "v2\n") == once
+
+
+def test_incomplete_markers_leave_file_to_user():
+    begin = GENERATED_BEGIN.format(name="method")
+    end = GENERATED_END.format(name="method")
+    assert replace_generated("no markers\n", "method", "x\n") is None
+    assert replace_generated(begin + "text without end\n", "method", "x\n") is None
+    assert replace_generated(end + "end before begin\n", "method", "x\n") is None
+    # 其他章节的标记不算
+    assert replace_generated(wrap_generated("intro", "x\n"), "method", "y\n") is None
+
+
+def test_update_keeps_user_text_outside_markers(tmp_path):
+    from academic_paper_writer import AcademicPaperWriter
+
+    projects = {}
+    for name, source in (("ml", "import torch\n\nclass Net:\n    pass\n"),
+                         ("web", "from flask import Flask\n\napp = Flask(__name__)\n")):
+        projects[name] = tmp_path / name
+        projects[name].mkdir()
+        (projects[name] / "main.py").write_text(source)
+    workspace = tmp_path / "workspace"
+    workspace.mkdir()
+    writer = AcademicPaperWriter(str(workspace))
+    writer.latex_engine = "none"
+
+    paper = writer.full_workflow(str(projects["ml"]))
+    edited = {}
+    for section in sorted((paper / "sections").glob("*.tex")):
+        edited[section] = "% my note\n" + section.read_text(encoding="utf-8") + "My own paragraph.\n"
+        section.write_text(edited[section], encoding="utf-8")
+
+    writer.full_workflow(str(projects["web"]), paper_dir=paper)
+    changed = 0
+    for section, before in edited.items():
+        updated = section.read_text(encoding="utf-8")
+        assert updated.startswith("% my note\n")
+        assert updated.endswith("My own paragraph.\n")
+        changed += updated != before
+    assert changed
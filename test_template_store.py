@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+模板仓库测试：检出时保留用户自定义的模板文件
+"""
+
+from academic_paper_writer import AcademicPaperWriter
+from template_store import TemplateStore
+
+
+def test_snapshot_keeps_checkout_baseline(tmp_path):
+    """snapshot_dir 收录用户修改后，再次检出仍保留修改"""
+    store = TemplateStore(tmp_path / "store")
+    template_dir = tmp_path / "ieee"
+    files = {"main.tex": store.put_bytes(b"original\n")}
+
+    assert store.checkout(files, template_dir) == {"main.tex": "written"}
+    (template_dir / "main.tex").write_text("customized\n")
+
+    for _ in range(2):
+        store.snapshot_dir(template_dir)
+        assert store.checkout(files, template_dir) == {"main.tex": "kept"}
+    assert (template_dir / "main.tex").read_text() == "customized\n"
+
+
+def test_customize_generate_download_again(tmp_path):
+    """自定义模板后生成论文，再次准备模板时不覆盖自定义内容"""
+    project = tmp_path / "project"
+    project.mkdir()
+    (project / "main.py").write_text("def main():\n    print('hello')\n\n\nif __name__ == '__main__':\n    main()\n")
+
+    workspace = tmp_path / "workspace"
+    workspace.mkdir()
+    writer = AcademicPaperWriter(str(workspace))
+    writer.latex_engine = "none"
+    main_tex = writer.download_template("ieee") / "main.tex"
+    customized = main_tex.read_text(encoding="utf-8").replace("[Your Paper Title]", "My Custom Title")
+    main_tex.write_text(customized, encoding="utf-8")
+
+    for _ in range(2):
+        writer.full_workflow(str(project), "ieee")
+        assert main_tex.read_text(encoding="utf-8") == customized
+    writer.download_template("ieee")
+    assert main_tex.read_text(encoding="utf-8") == customized
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+工作流阶段 DAG 测试：读取缓存的阶段同样经过 validate 检查
+"""
+
+from pathlib import Path
+
+from workflow_pipeline import Pipeline, Stage, StageCache
+
+
+def _pipeline(tmp_path, calls):
+    def make(inputs):
+        calls.append("make")
+        out = tmp_path / "out"
+        out.mkdir(exist_ok=True)
+        return {"dir": str(out)}
+
+    def use(inputs):
+        calls.append("use")
+        return Path(inputs["make"]["dir"]).is_dir()
+
+    stages = [
+        Stage("make", make, ("name",), validate=lambda output: Path(output["dir"]).is_dir()),
+        Stage("use", use, ("make",), memoize=False),
+    ]
+    return Pipeline(stages, StageCache(tmp_path / "cache"), jobs=1)
+
+
+def test_only_stage_reruns_invalid_upstream(tmp_path):
+    calls = []
+    _pipeline(tmp_path, calls).run({"name": "a"})
+    (tmp_path / "out").rmdir()
+
+    pipeline = _pipeline(tmp_path, calls)
+    outputs = pipeline.run({"name": "a"}, only_stage="use")
+    assert outputs["use"] is True
+    assert calls == ["make", "use", "make", "use"]
+    assert [e["status"] for e in pipeline.events] == ["ran", "ran"]
+
+
+def test_only_stage_loads_valid_upstream(tmp_path):
+    calls = []
+    _pipeline(tmp_path, calls).run({"name": "a"})
+
+    pipeline = _pipeline(tmp_path, calls)
+    pipeline.run({"name": "a"}, only_stage="use")
+    assert calls == ["make", "use", "use"]
+    assert [e["status"] for e in pipeline.events] == ["loaded", "ran"]
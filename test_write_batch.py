@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+批量原子写入测试：提交前中止或进程崩溃时目标目录保持不变
+"""
+
+import pytest
+
+from write_batch import WriteBatch
+
+
+def _staging_dirs(parent):
+    return [p for p in parent.iterdir() if p.name.endswith(".staging")]
+
+
+def test_commit_creates_target_with_one_rename(tmp_path):
+    target = tmp_path / "paper"
+    with WriteBatch(target) as batch:
+        batch.write_text("main.tex", "main")
+        batch.write_json("meta.json", {"title": "T"})
+        assert not target.exists()
+    assert (target / "main.tex").read_text(encoding="utf-8") == "main"
+    assert (target / "meta.json").exists()
+    assert _staging_dirs(tmp_path) == []
+
+
+def test_exception_aborts_new_target(tmp_path):
+    target = tmp_path / "paper"
+    with pytest.raises(RuntimeError):
+        with WriteBatch(target) as batch:
+            batch.write_text("main.tex", "half")
+            raise RuntimeError("generation failed")
+    assert not target.exists()
+    assert _staging_dirs(tmp_path) == []
+
+
+def test_exception_leaves_existing_target_untouched(tmp_path):
+    target = tmp_path / "paper"
+    target.mkdir()
+    (target / "main.tex").write_text("original", encoding="utf-8")
+    with pytest.raises(RuntimeError):
+        with WriteBatch(target) as batch:
+            batch.write_text("main.tex", "half")
+            batch.write_text("sections/new.tex", "half")
+            raise RuntimeError("generation failed")
+    assert (target / "main.tex").read_text(encoding="utf-8") == "original"
+    assert not (target / "sections").exists()
+    assert _staging_dirs(tmp_path) == []
+
+
+def test_crash_before_commit_leaves_target_untouched(tmp_path):
+    target = tmp_path / "paper"
+    target.mkdir()
+    (target / "main.tex").write_text("original", encoding="utf-8")
+    # 进程在提交前被杀死：既没有 commit 也没有 abort
+    batch = WriteBatch(target)
+    batch.write_text("main.tex", "half")
+    assert (target / "main.tex").read_text(encoding="utf-8") == "original"
+    assert sorted(p.name for p in target.iterdir()) == ["main.tex"]
+    batch.abort()
+
+
+def test_commit_into_existing_target_replaces_only_staged_files(tmp_path):
+    target = tmp_path / "paper"
+    (target / "sections").mkdir(parents=True)
+    (target / "main.tex").write_text("old main", encoding="utf-8")
+    (target / "sections" / "notes.tex").write_text("user notes", encoding="utf-8")
+    with WriteBatch(target) as batch:
+        batch.write_text("main.tex", "new main")
+        batch.write_text("sections/method.tex", "method")
+    assert (target / "main.tex").read_text(encoding="utf-8") == "new main"
+    assert (target / "sections" / "method.tex").read_text(encoding="utf-8") == "method"
+    assert (target / "sections" / "notes.tex").read_text(encoding="utf-8") == "user notes"
+    assert _staging_dirs(tmp_path) == []
+
+
+def test_abort_after_commit_keeps_files(tmp_path):
+    target = tmp_path / "paper"
+    batch = WriteBatch(target)
+    batch.write_text("main.tex", "main")
+    batch.commit()
+    batch.abort()
+    assert (target / "main.tex").exists()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+工作流阶段 DAG
+每个阶段声明自己的输入（上游阶段或运行参数），输出按输入哈希保存在工作区缓存中：
+- 输入未变化的阶段直接复用上次的输出（memoize）
+- 互不依赖的阶段（如模板准备和代码分析）并发执行
+- from_stage 只重新执行某个阶段及其下游，only_stage 只执行单个阶段，
+  其余阶段的输出按输入哈希从缓存读取；读取的输出未通过 validate 时重新执行该阶段
+"""
+
+import hashlib
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set, Tuple, Union
+
+from template_store import write_atomic
+
+
+class Stage(NamedTuple):
+    """工作流阶段"""
+    name: str
+    func: Callable[[Dict[str, Any]], Any]        # 输入名 -> 值，返回可 JSON 序列化的输出
+    inputs: Tuple[str, ...] = ()                 # 上游阶段名或运行参数名
+    memoize: bool = True                         # False：每次执行都重新计算（依赖文件系统等外部状态）
+    validate: Optional[Callable[[Any], bool]] = None  # 缓存的输出是否仍可用（如输出目录仍存在）
+
+
+def value_hash(value: Any) -> str:
+    """可 JSON 序列化的值的稳定哈希"""
+    data = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+class StageCache:
+    """阶段输出缓存：<root>/<stage>/<input_hash>.json"""
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+
+    def load(self, stage: str, input_hash: str) -> Optional[Dict]:
+        try:
+            with open(self.root / stage / f"{input_hash}.json", 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, stage: str, input_hash: str, output: Any):
+        record = {
+            "stage": stage,
+            "input_hash": input_hash,
+            "created_at": datetime.now().isoformat(),
+            "output": output,
+        }
+        write_atomic(self.root / stage / f"{input_hash}.json",
+                     json.dumps(record, ensure_ascii=False, default=str).encode("utf-8"))
+
+
+class Pipeline:
+    """按依赖关系执行阶段"""
+
+    def __init__(self, stages: List[Stage], cache: StageCache, jobs: int = 2,
+                 runner: Callable[[str, Callable[[], Any]], Any] = None):
+        """
+        Args:
+            stages: 阶段列表，须按拓扑顺序给出（输入只能引用前面的阶段）
+            cache: 阶段输出缓存
+            jobs: 并发执行的阶段数
+            runner: 执行阶段函数的包装 runner(stage_name, call)，如 StageProfiler.run（计量和 profile）
+        """
+        self.stages = {stage.name: stage for stage in stages}
+        self.order = [stage.name for stage in stages]
+        self.cache = cache
+        self.jobs = max(1, jobs)
+        self.runner = runner
+        # 每个阶段的执行记录：stage/status(ran/cached/loaded)/input_hash/seconds
+        self.events: List[Dict] = []
+
+        seen: Set[str] = set()
+        for stage in stages:
+            for name in stage.inputs:
+                if name in self.stages and name not in seen:
+                    raise ValueError(f"Stage '{stage.name}' depends on later stage '{name}'")
+            seen.add(stage.name)
+
+    def upstream(self, name: str) -> List[str]:
+        return [i for i in self.stages[name].inputs if i in self.stages]
+
+    def downstream(self, name: str) -> Set[str]:
+        """name 及其所有下游阶段"""
+        result = {name}
+        for other in self.order:
+            if any(dep in result for dep in self.upstream(other)):
+                result.add(other)
+        return result
+
+    def run(self, params: Dict[str, Any], from_stage: str = None, only_stage: str = None) -> Dict[str, Any]:
+        """
+        执行工作流
+
+        Args:
+            params: 运行参数
+            from_stage: 从该阶段开始：重新执行它及其下游（不使用缓存），其他阶段读取缓存
+            only_stage: 只重新执行该阶段，上游读取缓存，下游不执行
+
+        读取缓存的阶段同样经过 validate 检查，未通过时重新执行
+
+        Returns:
+            Dict[str, Any]: 阶段名 -> 输出（未执行也未读取的阶段不在其中）
+        """
+        for name in (from_stage, only_stage):
+            if name is not None and name not in self.stages:
+                raise ValueError(f"Unknown stage: {name}. Stages: {', '.join(self.order)}")
+
+        if only_stage is not None:
+            targets = {only_stage}
+            needed = {only_stage} | self._ancestors(only_stage)
+        else:
+            targets = self.downstream(from_stage) if from_stage else set(self.order)
+            needed = set(self.order)
+
+        outputs: Dict[str, Any] = {}
+        hashes: Dict[str, str] = {}
+
+        def input_hash(name: str) -> str:
+            stage = self.stages[name]
+            parts = {}
+            for key in stage.inputs:
+                parts[key] = hashes[key] if key in self.stages else value_hash(params.get(key))
+            return value_hash([name, parts])
+
+        def inputs_of(name: str) -> Dict[str, Any]:
+            stage = self.stages[name]
+            return {key: outputs[key] if key in self.stages else params.get(key) for key in stage.inputs}
+
+        # 显式指定的阶段总是重新执行，不使用缓存的输出
+        forced = from_stage is not None or only_stage is not None
+
+        def execute(name: str) -> Tuple[str, Any, str, float]:
+            stage = self.stages[name]
+            key = input_hash(name)
+            start = time.perf_counter()
+            if stage.memoize and not forced:
+                record = self.cache.load(name, key)
+                if record is not None and (stage.validate is None or stage.validate(record["output"])):
+                    return name, record["output"], "cached", time.perf_counter() - start
+            inputs = inputs_of(name)
+            if self.runner is not None:
+                output = self.runner(name, lambda: stage.func(inputs))
+            else:
+                output = stage.func(inputs)
+            self.cache.save(name, key, output)
+            return name, output, "ran", time.perf_counter() - start
+
+        def finish(name: str, output: Any, status: str, seconds: float):
+            outputs[name] = output
+            hashes[name] = value_hash(output)
+            self.events.append({"stage": name, "status": status,
+                                "input_hash": input_hash(name)[:12], "seconds": round(seconds, 3)})
+
+        pending = [name for name in self.order if name in needed]
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            while pending or running:
+                for name in list(pending):
+                    if not all(dep in outputs for dep in self.upstream(name)):
+                        continue
+                    pending.remove(name)
+                    if name in targets:
+                        running[pool.submit(execute, name)] = name
+                        continue
+                    # 不执行的阶段：按输入哈希读取上次的输出
+                    record = self.cache.load(name, input_hash(name))
+                    if record is None:
+                        raise ValueError(f"No cached output for stage '{name}' with the current inputs; "
+                                         f"run it first (without --from-stage/--only-stage)")
+                    validate = self.stages[name].validate
+                    if validate is not None and not validate(record["output"]):
+                        # 缓存的输出已失效（如论文目录被删除或已被其他运行更新）：重新执行该阶段
+                        running[pool.submit(execute, name)] = name
+                        continue
+                    finish(name, record["output"], "loaded", 0.0)
+
+                if not running:
+                    if pending:
+                        raise ValueError(f"Unresolvable stages: {', '.join(pending)}")
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    running.pop(future)
+                    finish(*future.result())
+
+        return outputs
+
+    def _ancestors(self, name: str) -> Set[str]:
+        result: Set[str] = set()
+        stack = self.upstream(name)
+        while stack:
+            dep = stack.pop()
+            if dep not in result:
+                result.add(dep)
+                stack.extend(self.upstream(dep))
+        return result
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+论文产物的批量原子写入
+所有文件先写入目标目录旁的临时暂存目录，提交时用一次 rename 让整个目录出现；
+中途失败时删除暂存目录，读者（Overleaf 同步、审稿）不会看到写了一半的论文
+
+目标目录已存在时（例如增量更新），逐个文件用 os.replace 原子替换
+"""
+
+import json
+import os
+import secrets
+import shutil
+from pathlib import Path
+from typing import Dict, List, Union
+
+
+def _fsync_path(path: Union[str, Path], directory: bool = False):
+    """把文件或目录项刷到磁盘；不支持对目录 fsync 的平台忽略"""
+    flags = os.O_RDONLY | (getattr(os, "O_DIRECTORY", 0) if directory else 0)
+    try:
+        fd = os.open(path, flags)
+    except OSError:
+        if directory:
+            return
+        raise
+    try:
+        os.fsync(fd)
+    except OSError:
+        if not directory:
+            raise
+    finally:
+        os.close(fd)
+
+
+class WriteBatch:
+    """
+    一组要一起出现的文件
+
+    用法：
+        with WriteBatch(paper_dir) as batch:
+            batch.write_text("main.tex", content)
+            batch.write_json("meta.json", meta)
+        # 正常退出时提交，异常时丢弃
+    """
+
+    def __init__(self, target: Union[str, Path], durable: bool = False):
+        """
+        Args:
+            target: 最终目录
+            durable: 提交前对所有文件和目录 fsync（网络存储或需要断电安全时使用）
+        """
+        self.target = Path(target)
+        self.durable = durable
+        self.target.parent.mkdir(parents=True, exist_ok=True)
+        # 暂存目录与目标目录在同一文件系统，rename 才是原子的；
+        # 不用 mkdtemp，它创建的 0700 目录会在提交后成为论文目录的权限
+        while True:
+            self.root = self.target.parent / f".{self.target.name}.{secrets.token_hex(4)}.staging"
+            try:
+                self.root.mkdir()
+                break
+            except FileExistsError:
+                continue
+        self.committed = False
+
+    def path(self, rel_path: str) -> Path:
+        """暂存目录中的路径（父目录已创建），供需要直接写文件的调用方使用"""
+        path = self.root / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def write_text(self, rel_path: str, text: str):
+        with open(self.path(rel_path), 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def write_json(self, rel_path: str, data: Dict):
+        self.write_text(rel_path, json.dumps(data, indent=2, ensure_ascii=False))
+
+    def files(self) -> List[str]:
+        """已暂存的文件（相对路径）"""
+        return sorted(
+            (Path(current) / name).relative_to(self.root).as_posix()
+            for current, _, names in os.walk(self.root) for name in names
+        )
+
+    def commit(self) -> Path:
+        """
+        提交
+
+        目标目录不存在时整个暂存目录一次 rename 为目标目录；
+        已存在时逐个文件原子替换，未暂存的文件保持不变
+
+        Returns:
+            Path: 目标目录
+        """
+        if self.committed:
+            return self.target
+
+        if self.durable:
+            for rel_path in self.files():
+                _fsync_path(self.root / rel_path)
+
+        try:
+            os.rename(self.root, self.target)
+        except OSError:
+            if not self.target.is_dir():
+                raise
+            for rel_path in self.files():
+                destination = self.target / rel_path
+                destination.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(self.root / rel_path, destination)
+            shutil.rmtree(self.root, ignore_errors=True)
+
+        if self.durable:
+            _fsync_path(self.target.parent, directory=True)
+        self.committed = True
+        return self.target
+
+    def abort(self):
+        """丢弃暂存的文件"""
+        if not self.committed:
+            shutil.rmtree(self.root, ignore_errors=True)
+
+    def __enter__(self) -> "WriteBatch":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+        return False